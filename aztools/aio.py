@@ -0,0 +1,530 @@
+"""
+An asyncio version of aztools.storage.Connector, built on azure.storage.blob.aio. It uses the same path parsing and
+argument decorators, so methods take the same path, storage_account, container and file_path parameters.
+
+Requires aiohttp.
+"""
+from aztools.args_handler import arguments_decorator, multi_arguments_decorator
+from aztools.credentials import get_auth_mode, service_principal_settings
+from aztools.storage import (
+    UPLOAD_IF_EXISTS,
+    ClientPool,
+    ContainerCache,
+    flat_download_paths,
+    is_azure_path,
+    join_blob_path,
+    parse_azure_path,
+    walk_local_files,
+)
+from aztools.transport import build_async_transport, close_async_transport
+from azure.identity import aio as identity_aio
+from azure.storage.blob.aio import BlobServiceClient, ContainerClient
+from azure.storage.blob import BlobBlock
+import asyncio
+import codecs
+import logging
+import uuid
+import os
+
+# The asyncio equivalents of aztools.credentials.CREDENTIAL_FACTORIES
+CREDENTIAL_FACTORIES = {
+    "default": lambda: identity_aio.DefaultAzureCredential(),
+    "cli": lambda: identity_aio.AzureCliCredential(),
+    "managed_identity": lambda: identity_aio.ManagedIdentityCredential(client_id=os.environ.get("AZURE_CLIENT_ID")),
+    "environment": lambda: identity_aio.EnvironmentCredential(),
+    "service_principal": lambda: identity_aio.ClientSecretCredential(**service_principal_settings()),
+}
+
+
+class AsyncBlobFile:
+    """
+    A file like object for reading or writing a blob from a coroutine, returned by Connector.open. Reads are
+    streamed chunk by chunk, writes are staged as blocks of block_size bytes and committed when the file is closed.
+    If the body of an `async with` raises, nothing written is committed.
+
+    :param blob_client: BlobClient: An asyncio blob client
+    :param mode: str: optional One of "r", "rb", "w" or "wb". Defaults to "r".
+    :param encoding: str: optional The encoding used in text mode. Defaults to "utf-8".
+    :param block_size: int: optional The size of the blocks staged when writing. Defaults to 4 MiB.
+    """
+
+    def __init__(self, blob_client, mode: str = "r", encoding: str = None, block_size: int = 4 * 1024 * 1024):
+        if mode not in ("r", "rb", "w", "wb"):
+            raise ValueError(f"Unsupported mode: {mode}, expected one of r, rb, w or wb")
+        self.blob_client = blob_client
+        self.mode = mode
+        self.block_size = block_size
+        self.closed = False
+        self._binary = "b" in mode
+        self._encoding = encoding or "utf-8"
+        self._decoder = None if self._binary else codecs.getincrementaldecoder(self._encoding)()
+        self._buffer = bytearray()
+        self._chunks = None
+        self._eof = False
+        self._block_ids = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None and "w" in self.mode:
+            await self.terminate()
+        else:
+            await self.close()
+
+    async def _fill(self, size: int):
+        """
+        Reads chunks into the buffer until it holds size bytes or the blob is exhausted
+        """
+        if self._chunks is None:
+            downloader = await self.blob_client.download_blob()
+            self._chunks = downloader.chunks()
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            try:
+                self._buffer += await self._chunks.__anext__()
+            except StopAsyncIteration:
+                self._eof = True
+
+    async def read(self, size: int = -1):
+        """
+        Reads up to size bytes, or the rest of the blob if size is negative. In text mode size is still in bytes.
+        """
+        if "r" not in self.mode:
+            raise ValueError("File not open for reading")
+        await self._fill(size)
+        size = len(self._buffer) if size < 0 else size
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        if self._binary:
+            return data
+        return self._decoder.decode(data, final=self._eof and not self._buffer)
+
+    async def write(self, data) -> int:
+        """
+        Buffers data to be written, staging a block each time block_size bytes are buffered
+        """
+        if "w" not in self.mode:
+            raise ValueError("File not open for writing")
+        self._buffer += data if self._binary else data.encode(self._encoding)
+        while len(self._buffer) >= self.block_size:
+            await self._stage_block(bytes(self._buffer[: self.block_size]))
+            del self._buffer[: self.block_size]
+        return len(data)
+
+    async def _stage_block(self, data: bytes):
+        block_id = uuid.uuid4().hex
+        await self.blob_client.stage_block(block_id=block_id, data=data, length=len(data))
+        self._block_ids.append(block_id)
+
+    async def close(self):
+        """
+        Closes the file, in write mode this commits everything written to the blob
+        """
+        if self.closed:
+            return
+        self.closed = True
+        if "w" in self.mode:
+            if not self._block_ids:
+                await self.blob_client.upload_blob(bytes(self._buffer), overwrite=True)
+            else:
+                if self._buffer:
+                    await self._stage_block(bytes(self._buffer))
+                await self.blob_client.commit_block_list([BlobBlock(block_id=b) for b in self._block_ids])
+        self._buffer = bytearray()
+
+    async def terminate(self):
+        """
+        Closes the file without committing anything written, leaving the blob as it was. Staged blocks that are never
+        committed are discarded by azure.
+        """
+        self.closed = True
+        self._buffer = bytearray()
+        self._block_ids = []
+
+
+class Connector:
+    """
+    An asyncio client for reading and writing blobs in azure storage accounts. Creating it does no I/O, clients are
+    created on first use. Close it with `await connector.close()` or use it with `async with`.
+
+    :param path: str: optional An azure path, the storage account and container are taken from it. Defaults to None.
+    :param storage_account: str: optional The default storage account name. Defaults to None.
+    :param container: str: optional The default container name. Defaults to None.
+    :param max_clients: int: optional The number of clients for other storage accounts to keep open. Defaults to 8.
+    :param container_cache_ttl: float: optional Seconds a container is trusted to exist after it was checked. Defaults to 300.
+    :param credential: optional An asyncio azure credential to use. Defaults to None.
+    :param auth_mode: str: optional The type of credential to create, see aztools.credentials.get_auth_mode. Defaults to None.
+    :param pool_size: int: optional The number of connections kept open per storage account. Defaults to 100.
+    :param max_concurrency: int: optional The number of blobs download_folder and upload_folder transfer at once. Defaults to 32.
+    :param keep_alive: bool: optional If False connections are closed after each request. Defaults to True.
+    :param connection_timeout: float: optional Seconds to wait for a connection. Defaults to the azure default.
+    :param read_timeout: float: optional Seconds to wait between bytes read. Defaults to the azure default.
+    """
+
+    def __init__(
+        self,
+        path=None,
+        storage_account=None,
+        container=None,
+        max_clients=8,
+        container_cache_ttl=300,
+        credential=None,
+        auth_mode=None,
+        pool_size=100,
+        max_concurrency=32,
+        keep_alive=True,
+        connection_timeout=None,
+        read_timeout=None,
+    ):
+        self.storage_account = storage_account
+        self.container = container
+        self.max_concurrency = max_concurrency
+
+        self.logger = logging.getLogger(__name__)
+
+        if path:
+            parsed_path = self.parse_azure_path(path)
+            self.storage_account = parsed_path["storage_account"]
+            self.container = parsed_path["container"]
+
+        if credential is not None and auth_mode is not None:
+            raise ValueError("Pass either a credential or an auth_mode, not both")
+        self.auth_mode = get_auth_mode(auth_mode) if credential is None else None
+        self.transport_options = {
+            "pool_size": pool_size,
+            "keep_alive": keep_alive,
+            "connection_timeout": connection_timeout,
+            "read_timeout": read_timeout,
+        }
+
+        # Evicted clients share the transport, so closing them does not interrupt other requests
+        self.client_pool = ClientPool(max_size=max_clients, close_client=self._close_evicted)
+        # The tasks closing evicted clients, awaited by close
+        self._closing = set()
+        self.container_cache = ContainerCache(ttl=container_cache_ttl)
+
+        self._owns_credential = credential is None
+        self._credential = credential
+        self._transport = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    @property
+    def credential(self):
+        """
+        The asyncio credential used by every client the connector creates
+        """
+        if self._credential is None:
+            self._credential = CREDENTIAL_FACTORIES[self.auth_mode]()
+        return self._credential
+
+    @property
+    def transport(self):
+        """
+        The asyncio HTTP transport shared by every client the connector creates
+        """
+        if self._transport is None:
+            self._transport = build_async_transport(**self.transport_options)
+        return self._transport
+
+    def _close_evicted(self, client):
+        """
+        Starts closing a client evicted from the pool, the pool is used from synchronous code so close awaits it
+        """
+        task = asyncio.ensure_future(client.close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def close(self):
+        """
+        Closes the connector's clients, transport and, if the connector created it, its credential
+        """
+        for client in self.client_pool.clear():
+            await client.close()
+        results = await asyncio.gather(*self._closing, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                self.logger.warning(f"Failed to close an evicted client: {result}")
+        if self._transport is not None:
+            await close_async_transport(self._transport)
+            self._transport = None
+        if self._owns_credential and self._credential is not None:
+            await self._credential.close()
+            self._credential = None
+
+    def parse_azure_path(self, path: str) -> dict:
+        return parse_azure_path(self.storage_account, self.container, path)
+
+    def is_azure_path(self, path: str) -> bool:
+        return is_azure_path(path)
+
+    @arguments_decorator()
+    def get_blob_storage_url(
+        self,
+        path: str = None,
+        storage_account: str = None,
+        container: str = None,
+        file_path: str = None,
+    ) -> str:
+        """
+        Returns the storage account url in the form: https://{storage_account}.blob.core.windows.net/
+        """
+        return f"https://{storage_account}.blob.core.windows.net/"
+
+    @arguments_decorator()
+    def get_blob_service_client(
+        self,
+        path: str = None,
+        storage_account: str = None,
+        container: str = None,
+        file_path: str = None,
+    ) -> BlobServiceClient:
+        """
+        Returns the pooled asyncio blob service client for the storage account. If no parameters are passed the
+        class values are used
+
+        :param path: str: optional An azure path, the storage account will be used to create a client. Defaults to None.
+        :param storage_account: str: optional The name of the storage account to create a client for. Defaults to None.
+        :param container: str: optional Ignored. Defaults to None.
+        :param file_path: str: optional Ignored. Defaults to None.
+
+        :return BlobServiceClient: An asyncio blob service client for the specified storage account
+        """
+        blob_storage_url = self.get_blob_storage_url(storage_account=storage_account)
+        return self.client_pool.get(
+            blob_storage_url,
+            lambda: BlobServiceClient(
+                credential=self.credential,
+                account_url=blob_storage_url,
+                transport=self.transport,
+            ),
+        )
+
+    @arguments_decorator()
+    async def get_container_client(
+        self,
+        path: str = None,
+        storage_account: str = None,
+        container: str = None,
+        file_path: str = None,
+    ) -> ContainerClient:
+        """
+        Returns an asyncio container client, checking the container exists unless it is in the container cache
+
+        :param path: str: optional An Azure path, the container in the path will be used. Defaults to None.
+        :param storage_account: str: optional A storage account name containing the container. Defaults to None.
+        :param container: str: optional The name of the container to create a client for. Defaults to None.
+        :param file_path: str: optional Ignored. Defaults to None.
+
+        :exception ValueError: Raised if the container does not exist in the storage account
+
+        :return ContainerClient: An asyncio client for the container
+        """
+        client = self.get_blob_service_client(storage_account=storage_account)
+        container_client = client.get_container_client(container=container)
+        if not self.container_cache.is_verified(storage_account, container):
+            if not await container_client.exists():
+                raise ValueError(
+                    f"The container: {container} is not in the storage account: {storage_account}"
+                )
+            self.container_cache.add(storage_account, container)
+        return container_client
+
+    @arguments_decorator()
+    async def list_blobs(
+        self,
+        path: str = None,
+        storage_account: str = None,
+        container: str = None,
+        file_path: str = None,
+    ):
+        """
+        Yields the names of the blobs with paths that match the path passed, use with `async for`
+
+        :param path: str: optional An azure path to search for blobs. Defaults to None.
+        :param storage_account: str: optional storage account name. Defaults to None.
+        :param container: str: optional container name. Defaults to None.
+        :param file_path: str: optional the prefix file path. Defaults to None.
+
+        :return AsyncIterator[str]: Blobs in the path passed
+        """
+        container_client = await self.get_container_client(
+            storage_account=storage_account, container=container
+        )
+        async for blob in container_client.list_blobs(name_starts_with=file_path or None):
+            yield blob.name[len(file_path):] if file_path else blob.name
+
+    @arguments_decorator()
+    async def blob_exists(
+        self,
+        path: str = None,
+        storage_account: str = None,
+        container: str = None,
+        file_path: str = None,
+    ) -> bool:
+        """
+        Checks if a file exists in azure, return bool
+
+        :param path: str: optional Azure path to file to check. Defaults to None.
+        :param storage_account: str: optional Storage account. Defaults to None.
+        :param container: str: optional Container. Defaults to None.
+        :param file_path: str: optional path to file. Defaults to None.
+
+        :return [bool]: True if file exists
+        """
+        client = self.get_blob_service_client(storage_account=storage_account)
+        return await client.get_blob_client(container, file_path).exists()
+
+    async def _gather_bounded(self, coroutines):
+        """
+        Runs the coroutines with at most max_concurrency running at once, cancelling the rest if one fails
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(coroutine):
+            async with semaphore:
+                return await coroutine
+
+        tasks = [asyncio.ensure_future(run(coroutine)) for coroutine in coroutines]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    @multi_arguments_decorator(local_support=True)
+    async def download_folder(
+        self,
+        source_path: str = None,
+        source_storage_account: str = None,
+        source_container: str = None,
+        source_file_path: str = None,
+        dest_path: str = None,
+        dest_storage_account: str = None,
+        dest_container: str = None,
+        dest_file_path: str = None,
+    ):
+        """
+        Copy a folder from azure to a local path, downloading up to max_concurrency blobs at once
+
+        :param source_path: str: optional An Azure path to the folder to download. Defaults to None.
+        :param source_storage_account: str: optional The storage account name. Defaults to None.
+        :param source_container: str: optional The container name. Defaults to None.
+        :param source_file_path: str: optional The path to the folder to download. Defaults to None.
+        :param dest_path: str: optional The local path to download the folder to. Defaults to None.
+        :param dest_storage_account: str: optional Ignored. Defaults to None.
+        :param dest_container: str: optional Ignored. Defaults to None.
+        :param dest_file_path: str: optional Ignored. Defaults to None.
+
+        :exception ValueError: Raised when destination path is an azure path, or two blobs have the same base name
+        """
+        container_client = await self.get_container_client(
+            storage_account=source_storage_account, container=source_container
+        )
+
+        if self.is_azure_path(dest_path):
+            raise ValueError(
+                f"Expected destination to be local path got azure path: {dest_path}"
+            )
+        os.makedirs(dest_path, exist_ok=True)
+
+        async def download(blob_name, local_path):
+            self.logger.info(f"Downloading {blob_name} to {local_path}")
+            downloader = await container_client.download_blob(blob_name)
+            with open(local_path, "wb") as f:
+                await downloader.readinto(f)
+
+        blobs = [blob async for blob in container_client.list_blobs(name_starts_with=source_file_path)]
+        # Checks every base name is unique before anything is downloaded
+        downloads = list(flat_download_paths(blobs, dest_path))
+        await self._gather_bounded(download(blob.name, local_path) for blob, local_path in downloads)
+        self.logger.info("Completed Download")
+
+    @multi_arguments_decorator(local_support=True)
+    async def upload_folder(
+        self,
+        source_path: str = None,
+        source_storage_account: str = None,
+        source_container: str = None,
+        source_file_path: str = None,
+        dest_path: str = None,
+        dest_storage_account: str = None,
+        dest_container: str = None,
+        dest_file_path: str = None,
+        if_exists: str = "error",
+    ):
+        """
+        Upload a directory, including its sub-directories, to an azure location, uploading up to max_concurrency
+        files at once. Each file's path relative to the directory is kept under the destination path.
+
+        :param source_path: str: optional Local path to folder to upload. Defaults to None.
+        :param source_storage_account: str: optional Ignored. Defaults to None.
+        :param source_container: str: optional Ignored. Defaults to None.
+        :param source_file_path: str: optional Ignored. Defaults to None.
+        :param dest_path: str: optional Azure path to upload to. Defaults to None.
+        :param dest_storage_account: str: optional Storage account. Defaults to None.
+        :param dest_container: str: optional Container name. Defaults to None.
+        :param dest_file_path: str: optional Path to folder. Defaults to None.
+        :param if_exists: str: optional What to do when a blob already exists: "error" raises, "overwrite" replaces
+            it and "skip" leaves it, checked against one listing of the destination. Defaults to "error".
+
+        :exception ValueError: Raised if source is an Azure path
+        """
+        if self.is_azure_path(source_path):
+            raise ValueError(
+                f"Expected destination to be local path got azure path: {source_path}"
+            )
+        if if_exists not in UPLOAD_IF_EXISTS:
+            raise ValueError(f"if_exists must be one of {UPLOAD_IF_EXISTS}, got: {if_exists}")
+
+        container_client = await self.get_container_client(
+            storage_account=dest_storage_account, container=dest_container
+        )
+
+        existing = set()
+        if if_exists == "skip":
+            existing = {
+                blob.name async for blob in container_client.list_blobs(name_starts_with=dest_file_path or None)
+            }
+
+        async def upload(file_path, blob_path):
+            self.logger.info(f"Uploading {file_path} to {blob_path}")
+            with open(file_path, "rb") as data:
+                await container_client.upload_blob(name=blob_path, data=data, overwrite=if_exists == "overwrite")
+
+        uploads = []
+        for file_path, relative_path in walk_local_files(source_path):
+            blob_path = join_blob_path(dest_file_path, relative_path)
+            if blob_path not in existing:
+                uploads.append(upload(file_path, blob_path))
+        await self._gather_bounded(uploads)
+
+    @arguments_decorator()
+    def open(
+        self,
+        path: str = None,
+        storage_account: str = None,
+        container: str = None,
+        file_path: str = None,
+        mode="r",
+        encoding=None,
+    ) -> AsyncBlobFile:
+        """
+        Opens a blob for reading or writing from a coroutine, use with `async with`. Only azure paths are supported.
+
+        :param path: str: optional An azure path. Defaults to None.
+        :param storage_account: str: optional name of storage account. Defaults to None.
+        :param container: str: optional container name. Defaults to None.
+        :param file_path: str: optional path to file. Defaults to None.
+        :param mode: str: optional One of "r", "rb", "w" or "wb". Defaults to "r".
+        :param encoding: str: optional The encoding used in text mode. Defaults to "utf-8".
+
+        :return AsyncBlobFile: A file like object with async read, write and close methods
+        """
+        client = self.get_blob_service_client(storage_account=storage_account)
+        return AsyncBlobFile(client.get_blob_client(container, file_path), mode=mode, encoding=encoding)
@@ -1,65 +1,89 @@
+from aztools.paths import AzurePath, to_azure_path
+import functools
+import inspect
+
+LOCATION_PARAMETERS = ("path", "storage_account", "container", "file_path")
+SOURCE_PARAMETERS = tuple(f"source_{name}" for name in LOCATION_PARAMETERS)
+DEST_PARAMETERS = tuple(f"dest_{name}" for name in LOCATION_PARAMETERS)
+
+
+def _check_parameters(func, expected: tuple):
+    """
+    Checks at decoration time that the parameters after self are the location parameters the wrapper passes
+    positionally
+    """
+    names = tuple(inspect.signature(func).parameters)[1 : len(expected) + 1]
+    if names != expected:
+        raise ValueError(f"{func.__qualname__} must take the parameters {expected} after self, got {names}")
+
+
+def _location_resolver(local_support: bool, use_defaults: bool, account_error: str, container_error: str):
+    """
+    Builds the function that resolves one location from its path, storage_account, container and file_path
+    arguments. use_defaults fills the storage account and container from the connector when no path is passed.
+    """
+
+    def resolve(inst, path, storage_account, container, file_path) -> tuple:
+        if path:
+            # Path strings are parsed once and cached, an AzurePath is used as it is
+            if isinstance(path, AzurePath):
+                parsed = path.with_storage_account(inst.storage_account)
+            else:
+                parsed = to_azure_path(path, inst.storage_account)
+            if parsed is not None:
+                storage_account = parsed.storage_account or storage_account
+                if storage_account is None:
+                    raise ValueError(
+                        "To use a path of the form azure://container/path you must initialise the connector with the storage account or pass the account name to the function"
+                    )
+                return None, storage_account, parsed.container, parsed.file_path
+            elif local_support:
+                return path, None, None, None
+            raise ValueError(
+                f"Path: {path} is not an azure path and local_support is not enabled. Try enabling for this function in the args handler decorator"
+            )
+
+        if use_defaults:
+            storage_account = storage_account if storage_account else inst.storage_account
+            container = container if container else inst.container
+        if storage_account is None:
+            raise ValueError(account_error)
+        if storage_account and file_path and not container:
+            raise ValueError(container_error)
+        return None, storage_account, container, file_path
+
+    return resolve
+
+
 def arguments_decorator(local_support=False):
     """
     This decorator handles the passing of arguments to azure tools methods. It expects a location to be defined by:
 
-    :param path: str: optional An azure path of the format azure://<container>/path or https://<storage-account>.blob.core.windows.net/<container>/<path>
+    :param path: str: optional An azure path of the format azure://<container>/path or https://<storage-account>.blob.core.windows.net/<container>/<path>, or an AzurePath
     :param storage-account: str: The name of the azure storage account
     :param container: str: The name of a container in the account
     :param file_path: str: path from container to file or directory
 
     The decorator will parse the path if it is passed and ensure the function is always called with the storage-account, container and file_path
-    parameters.
+    parameters. These must be the first parameters after self, and can be passed positionally or by name.
 
     :param local_support: bool: optional If True local paths can be passed to the path parameter, function will be called with other params as None. Defaults to False.
-    """    
+    """
     def decorator(func):
-        def wrapper(*args, **kwargs):
-            inst = args[0]
-            path = kwargs.get("path", None)
-            storage_account = kwargs.get("storage_account", None)
-            container = kwargs.get("container", None)
-            file_path = kwargs.get("file_path", None)
-
-            if path:
-                if inst.is_azure_path(path):
-                    paths = inst.parse_azure_path(path)
-                    storage_account = (
-                        paths["storage_account"]
-                        if paths["storage_account"]
-                        else storage_account
-                    )
-
-                    if storage_account is None:
-                        raise ValueError(
-                            "To use a path of the form azure://container/path you must initialise the connector with the storage account or pass the account name to the function"
-                        )
-                    kwargs["path"] = None
-                    kwargs["storage_account"] = storage_account
-                    kwargs["container"] = paths["container"]
-                    kwargs["file_path"] = paths["file_path"]
-                elif local_support:
-                    kwargs["path"] = path
-                    kwargs["storage_account"] = None
-                    kwargs["container"] = None
-                    kwargs["file_path"] = None
-                else:
-                    raise ValueError(
-                        f"Path: {path} is not an azure path and local_support is not enabled. Try enabling for this function in the args handler decorator"
-                    )
-            else:
-                kwargs["path"] = None
-                kwargs["storage_account"] = (
-                    storage_account if storage_account else inst.storage_account
-                )
-                kwargs["container"] = container if container else inst.container
-                kwargs["file_path"] = file_path
-
-                if kwargs["storage_account"] is None:
-                    raise ValueError("Storage account is None, pass to the function or initialise the connector")
-                if kwargs["storage_account"] and kwargs["file_path"] and not kwargs["container"]:
-                    raise ValueError("Container is None, pass to function or initialise Connector")
-
-            return func(*args, **kwargs)
+        _check_parameters(func, LOCATION_PARAMETERS)
+        resolve = _location_resolver(
+            local_support,
+            True,
+            "Storage account is None, pass to the function or initialise the connector",
+            "Container is None, pass to function or initialise Connector",
+        )
+
+        @functools.wraps(func)
+        def wrapper(inst, path=None, storage_account=None, container=None, file_path=None, *args, **kwargs):
+            if path is None and storage_account and container:
+                # Already resolved, as in calls between decorated methods
+                return func(inst, None, storage_account, container, file_path, *args, **kwargs)
+            return func(inst, *resolve(inst, path, storage_account, container, file_path), *args, **kwargs)
 
         return wrapper
 
@@ -70,111 +94,52 @@ def multi_arguments_decorator(local_support=False):
     """
     This decorator handles the passing of arguments to azure tools methods that require two paths, such as copy/download/upload. It expects a location to be defined by source and destination parameters:
 
-    :param source/dest_path: str: optional An azure path of the format azure://<container>/path or https://<storage-account>.blob.core.windows.net/<container>/<path>
+    :param source/dest_path: str: optional An azure path of the format azure://<container>/path or https://<storage-account>.blob.core.windows.net/<container>/<path>, or an AzurePath
     :param source/dest_storage-account: str: The name of the azure storage account
     :param source/dest_container: str: The name of a container in the account
     :param source/dest_file_path: str: path from container to file or directory
 
     The decorator will parse the path if it is passed and ensure the function is always called with the storage-account, container and file_path
-    parameters.
+    parameters. These must be the first parameters after self, and can be passed positionally or by name.
 
     :param local_support: bool: optional If True local paths can be passed to the path parameter, function will be called with other params as None. Defaults to False.
     """
     def decorator(func):
-        def wrapper(*args, **kwargs):
-            inst = args[0]
-
-            source_path = kwargs.get("source_path", None)
-            source_storage_account = kwargs.get("source_storage_account", None)
-            source_container = kwargs.get("source_container", None)
-            source_file_path = kwargs.get("source_file_path", None)
-
-            dest_path = kwargs.get("dest_path", None)
-            dest_storage_account = kwargs.get("dest_storage_account", None)
-            dest_container = kwargs.get("dest_container", None)
-            dest_file_path = kwargs.get("dest_file_path", None)
-
-            if source_path:
-                if inst.is_azure_path(source_path):
-                    paths = inst.parse_azure_path(source_path)
-                    storage_account = (
-                        paths["storage_account"]
-                        if paths["storage_account"]
-                        else source_storage_account
-                    )
-
-                    if storage_account is None:
-                        raise ValueError(
-                            "To use a path of the form azure://container/path you must initialise the connector with the storage account or pass the account name to the function"
-                        )
-                    kwargs["source_path"] = None
-                    kwargs["source_storage_account"] = storage_account
-                    kwargs["source_container"] = paths["container"]
-                    kwargs["source_file_path"] = paths["file_path"]
-
-                elif local_support:
-                    kwargs["source_path"] = source_path
-                    kwargs["source_storage_account"] = None
-                    kwargs["source_container"] = None
-                    kwargs["source_file_path"] = None
-                else:
-                    raise ValueError(
-                        f"Path: {source_path} is not an azure path and local_support is not enabled. Try enabling for this function in the args handler decorator"
-                    )
-            else:
-                kwargs["source_storage_account"] = (
-                    source_storage_account
-                    if source_storage_account
-                    else inst.storage_account
-                )
-                kwargs["source_container"] = (
-                    source_container if source_container else inst.container
-                )
-                kwargs["source_file_path"] = source_file_path
-                kwargs["source_path"] = None
-                if kwargs["source_storage_account"] is None:
-                    raise ValueError("Source Storage account is None, pass to the function or initialise the connector")
-                if kwargs["source_storage_account"] and kwargs["source_file_path"] and not kwargs["source_container"]:
-                    raise ValueError("Source Container is None, pass to function or initialise Connector")
-
-            if dest_path:
-                if inst.is_azure_path(dest_path):
-                    paths = inst.parse_azure_path(dest_path)
-                    storage_account = (
-                        paths["storage_account"]
-                        if paths["storage_account"]
-                        else dest_storage_account
-                    )
-
-                    if storage_account is None:
-                        raise ValueError(
-                            "To use a path of the form azure://container/path you must initialise the connector with the storage account or pass the account name to the function"
-                        )
-                    kwargs["dest_path"] = None
-                    kwargs["dest_storage_account"] = storage_account
-                    kwargs["dest_container"] = paths["container"]
-                    kwargs["dest_file_path"] = paths["file_path"]
-
-                elif local_support:
-                    kwargs["dest_path"] = dest_path
-                    kwargs["dest_storage_account"] = None
-                    kwargs["dest_container"] = None
-                    kwargs["dest_file_path"] = None
-                else:
-                    raise ValueError(
-                        f"Path: {dest_path} is not an azure path and local_support is not enabled. Try enabling for this function in the args handler decorator"
-                    )
-            else:
-                kwargs["dest_path"] = None
-                kwargs["dest_storage_account"] = dest_storage_account
-                kwargs["dest_container"] = dest_container
-                kwargs["dest_file_path"] = dest_file_path
-                if kwargs["dest_storage_account"] is None:
-                    raise ValueError("Destination Storage account is None, pass to the function")
-                if kwargs["dest_storage_account"] and kwargs["dest_file_path"] and not kwargs["dest_container"]:
-                    raise ValueError("Destinantion Container is None, pass to function")
-
-            return func(*args, **kwargs)
+        _check_parameters(func, SOURCE_PARAMETERS + DEST_PARAMETERS)
+        resolve_source = _location_resolver(
+            local_support,
+            True,
+            "Source Storage account is None, pass to the function or initialise the connector",
+            "Source Container is None, pass to function or initialise Connector",
+        )
+        resolve_dest = _location_resolver(
+            local_support,
+            False,
+            "Destination Storage account is None, pass to the function",
+            "Destination Container is None, pass to function",
+        )
+
+        @functools.wraps(func)
+        def wrapper(
+            inst,
+            source_path=None,
+            source_storage_account=None,
+            source_container=None,
+            source_file_path=None,
+            dest_path=None,
+            dest_storage_account=None,
+            dest_container=None,
+            dest_file_path=None,
+            *args,
+            **kwargs,
+        ):
+            return func(
+                inst,
+                *resolve_source(inst, source_path, source_storage_account, source_container, source_file_path),
+                *resolve_dest(inst, dest_path, dest_storage_account, dest_container, dest_file_path),
+                *args,
+                **kwargs,
+            )
 
         return wrapper
 
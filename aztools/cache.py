@@ -0,0 +1,382 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from collections import OrderedDict
+import threading
+import tempfile
+import hashlib
+import json
+import time
+import os
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+MiB = 1024 * 1024
+GiB = 1024 * MiB
+
+# The fields of a DiskCache index entry and their types
+ENTRY_SCHEMA = {"url": str, "etag": str, "path": str, "size": int, "validated": (int, float)}
+
+
+@contextmanager
+def file_lock(path: str, blocking: bool = True):
+    """
+    Holds an exclusive lock on a lock file, shared between processes. With blocking False the context yields False
+    rather than waiting when another process holds the lock.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            if blocking:
+                raise
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
+
+
+def _hash(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
+def _read_entry(entry_path: str) -> dict:
+    """
+    Returns the DiskCache index entry in a file, or None if it can't be read or is not a valid entry
+    """
+    try:
+        with open(entry_path) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(entry, dict) or not all(isinstance(entry.get(key), kind) for key, kind in ENTRY_SCHEMA.items()):
+        return None
+    return entry
+
+
+class DiskCache:
+    """
+    A local disk cache of blobs, keyed by blob url and etag, that can be shared by many processes. Entries are filled
+    through a temporary file that is moved into place, so a reader never sees a partly written file, and each blob
+    url is locked across processes while it is checked or filled. Once the cache holds more than max_size bytes the
+    least recently used entries are deleted.
+
+    The index entries and locks are kept in directory as <hash>.entry and <hash>.lock files, and the cached blobs in
+    its blobs sub-directory, so no blob name can be mistaken for an index entry.
+
+    :param directory: str: The directory the cache is kept in, it is created if needed
+    :param max_size: int: optional The number of bytes of blobs kept. Defaults to 10 GiB.
+    :param revalidate_after: float: optional Seconds an entry is used for before checking, with a conditional
+        request, that the blob has not changed. Defaults to 0, checking on every use.
+    """
+
+    def __init__(self, directory: str, max_size: int = 10 * GiB, revalidate_after: float = 0):
+        self.directory = directory
+        self.max_size = max_size
+        self.revalidate_after = revalidate_after
+        self.blob_directory = os.path.join(directory, "blobs")
+        os.makedirs(self.blob_directory, exist_ok=True)
+
+    def _entry_path(self, url: str) -> str:
+        return os.path.join(self.directory, f"{_hash(url)}.entry")
+
+    def lock(self, url: str):
+        """
+        Returns a context manager holding the cross-process lock of a blob url
+        """
+        return file_lock(os.path.join(self.directory, f"{_hash(url)}.lock"))
+
+    def lookup(self, url: str) -> dict:
+        """
+        Returns the entry of a blob url, a dict with its "etag", local "path", "size" and when it was "validated", or
+        None if the blob is not cached
+        """
+        entry = _read_entry(self._entry_path(url))
+        return entry if entry is not None and os.path.exists(entry["path"]) else None
+
+    def is_fresh(self, entry: dict) -> bool:
+        """
+        Returns True if an entry was validated less than revalidate_after seconds ago
+        """
+        return time.time() - entry["validated"] < self.revalidate_after
+
+    def _write_entry(self, url: str, entry: dict):
+        fd, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        os.replace(temporary_path, self._entry_path(url))
+
+    def touch(self, url: str, entry: dict, validated: bool = False) -> str:
+        """
+        Marks an entry as used, and as validated if it was checked against azure, returning its local path
+        """
+        os.utime(entry["path"])
+        if validated:
+            self._write_entry(url, dict(entry, validated=time.time()))
+        return entry["path"]
+
+    def store(self, url: str, etag: str, fill, suffix: str = "") -> str:
+        """
+        Adds a blob to the cache, replacing any older version of it, and evicts entries if the cache is over max_size.
+        Hold the url's lock while calling this.
+
+        :param url: str: The blob url
+        :param etag: str: The etag of the blob version fill writes
+        :param fill: callable: Called with a local path to write the blob to
+        :param suffix: str: optional Added to the cached file name, such as the blob's extension. Defaults to "".
+
+        :return str: The local path of the cached blob
+        """
+        fd, temporary_path = tempfile.mkstemp(dir=self.blob_directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            fill(temporary_path)
+            path = os.path.join(self.blob_directory, f"{_hash(url, etag)}{suffix}")
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+        previous = self.lookup(url)
+        self._write_entry(
+            url, {"url": url, "etag": etag, "path": path, "size": os.path.getsize(path), "validated": time.time()}
+        )
+        if previous is not None and previous["path"] != path:
+            self._remove_file(previous["path"])
+        self.evict(keep=url)
+        return path
+
+    def _remove_file(self, path: str):
+        try:
+            os.unlink(path)
+        except OSError:
+            # Another process removed it, or on Windows it is still open
+            pass
+
+    def entries(self) -> list:
+        """
+        Returns the url, local path, size and last use time of every cached blob
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".entry"):
+                continue
+            entry = _read_entry(os.path.join(self.directory, name))
+            if entry is None:
+                continue
+            try:
+                entries.append(dict(entry, used=os.path.getmtime(entry["path"])))
+            except OSError:
+                continue
+        return entries
+
+    def evict(self, keep: str = None):
+        """
+        Deletes the least recently used entries until the cache holds at most max_size bytes. Entries locked by
+        another process and the url keep are skipped.
+        """
+        entries = self.entries()
+        total = sum(entry["size"] for entry in entries)
+        for entry in sorted(entries, key=lambda entry: entry["used"]):
+            if total <= self.max_size:
+                break
+            if entry["url"] == keep:
+                continue
+            with file_lock(os.path.join(self.directory, f"{_hash(entry['url'])}.lock"), blocking=False) as locked:
+                if locked:
+                    self._remove_file(self._entry_path(entry["url"]))
+                    self._remove_file(entry["path"])
+                    total -= entry["size"]
+
+    def clear(self):
+        """
+        Deletes every cached blob
+        """
+        for entry in self.entries():
+            with self.lock(entry["url"]):
+                self._remove_file(self._entry_path(entry["url"]))
+                self._remove_file(entry["path"])
+
+
+class CachedBlob:
+    """
+    A blob held by MemoryCache, with the etag it was read at and when it was last checked against azure
+    """
+
+    __slots__ = ("etag", "data", "validated")
+
+    def __init__(self, etag: str, data: bytes, validated: float):
+        self.etag = etag
+        self.data = data
+        self.validated = validated
+
+
+class MemoryCache:
+    """
+    A thread safe, in memory LRU cache of small blobs, keyed by blob url and limited both by the number of blobs and
+    their total size. Entries older than ttl seconds are revalidated by the caller with a conditional request, or with
+    stale_while_revalidate the stale entry is used while revalidate_in_background checks it on a background thread.
+
+    :param max_entries: int: optional The number of blobs kept. Defaults to 1024.
+    :param max_bytes: int: optional The total size of the blobs kept. Defaults to 64 MiB.
+    :param max_blob_size: int: optional Blobs larger than this are not cached. Defaults to 1 MiB.
+    :param ttl: float: optional Seconds an entry is used for before it is revalidated. Defaults to 60.
+    :param stale_while_revalidate: bool: optional If True stale entries are used while they are revalidated in the
+        background. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * MiB,
+        max_blob_size: int = MiB,
+        ttl: float = 60,
+        stale_while_revalidate: bool = False,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_blob_size = max_blob_size
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self._entries = OrderedDict()
+        # When blobs were found to be over max_blob_size, so they are not read again to find that out within the ttl
+        self._too_large = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._revalidating = set()
+        self._executor = None
+        self._stats = {"hits": 0, "misses": 0, "stale_hits": 0, "not_modified": 0, "refreshed": 0, "evictions": 0}
+
+    @property
+    def stats(self) -> dict:
+        """
+        The counts of "hits" served without a request, "stale_hits" served while revalidating in the background,
+        "misses", revalidations that found the blob "not_modified" or "refreshed" it, and "evictions"
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def record(self, name: str):
+        """
+        Adds one to a stats counter
+        """
+        with self._lock:
+            self._stats[name] += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, url: str) -> CachedBlob:
+        """
+        Returns the cached blob of a url, marking it as recently used, or None if it is not cached
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def is_fresh(self, entry: CachedBlob) -> bool:
+        """
+        Returns True if an entry was validated less than ttl seconds ago
+        """
+        return time.monotonic() - entry.validated < self.ttl
+
+    def put(self, url: str, etag: str, data: bytes):
+        """
+        Caches a blob, evicting the least recently used blobs to stay within max_entries and max_bytes. Blobs over
+        max_blob_size are remembered as too large instead, dropping any copy cached while they were smaller.
+        """
+        with self._lock:
+            previous = self._entries.pop(url, None)
+            if previous is not None:
+                self._size -= len(previous.data)
+            if len(data) > self.max_blob_size:
+                self._too_large[url] = time.monotonic()
+                self._too_large.move_to_end(url)
+                while len(self._too_large) > self.max_entries:
+                    self._too_large.popitem(last=False)
+                return
+            self._too_large.pop(url, None)
+            self._entries[url] = CachedBlob(etag, data, time.monotonic())
+            self._size += len(data)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.data)
+                self._stats["evictions"] += 1
+
+    def mark_validated(self, url: str):
+        """
+        Records that a cached blob was found to be unchanged
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                entry.validated = time.monotonic()
+
+    def is_too_large(self, url: str) -> bool:
+        """
+        Returns True if the blob of a url was found to be over max_blob_size less than ttl seconds ago
+        """
+        with self._lock:
+            marked = self._too_large.get(url)
+            if marked is None:
+                return False
+            if time.monotonic() - marked < self.ttl:
+                return True
+            # The blob may have shrunk since, so it is read again
+            del self._too_large[url]
+            return False
+
+    def revalidate_in_background(self, url: str, revalidate):
+        """
+        Calls revalidate on a background thread, unless the url is already being revalidated
+
+        :param url: str: The blob url
+        :param revalidate: callable: Called with no arguments, it should update the cache
+        """
+        with self._lock:
+            if url in self._revalidating:
+                return
+            self._revalidating.add(url)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="aztools-revalidate")
+
+        def run():
+            try:
+                revalidate()
+            finally:
+                with self._lock:
+                    self._revalidating.discard(url)
+
+        self._executor.submit(run)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._too_large.clear()
+            self._size = 0
+
+    def close(self):
+        """
+        Waits for background revalidations to finish
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -0,0 +1,62 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from collections import deque
+from itertools import islice
+
+
+def _wait_for_any(pending: deque):
+    """
+    Waits until at least one more of the pending futures is done, raising the error of any future that failed
+    """
+    running = [future for future in pending if not future.done()]
+    if running:
+        wait(running, return_when=FIRST_COMPLETED)
+    for future in pending:
+        if future.done() and not future.cancelled() and future.exception() is not None:
+            raise future.exception()
+
+
+def ordered_map(func, iterable, max_workers: int = 8):
+    """
+    Like map, but calls func on a bounded pool of threads. Results are yielded in the order of iterable, while
+    at most 2 * max_workers items are in flight, so iterable can be a lazy listing of any length. The first error
+    raised by func is raised as soon as it happens and the items that have not started are cancelled.
+
+    :param func: callable: Called with each item of iterable
+    :param iterable: iterable: The items to call func with
+    :param max_workers: int: optional The number of threads. If 1 or less func is called in the current thread. Defaults to 8.
+
+    :return iterator: The results of func in the order of iterable
+    """
+    if max_workers is None or max_workers <= 1:
+        for item in iterable:
+            yield func(item)
+        return
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = deque()
+    try:
+        for item in iterable:
+            pending.append(executor.submit(func, item))
+            while len(pending) >= 2 * max_workers:
+                _wait_for_any(pending)
+                while pending and pending[0].done():
+                    yield pending.popleft().result()
+        while pending:
+            _wait_for_any(pending)
+            while pending and pending[0].done():
+                yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def chunked(iterable, size: int):
+    """
+    Yields lists of up to size consecutive items of iterable, reading it lazily
+    """
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
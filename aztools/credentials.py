@@ -0,0 +1,186 @@
+from azure.identity import (
+    AzureCliCredential,
+    ClientSecretCredential,
+    DefaultAzureCredential,
+    EnvironmentCredential,
+    ManagedIdentityCredential,
+)
+import threading
+import logging
+import time
+import os
+
+# Environment variable naming the auth mode used when one is not passed to a Connector or secret store
+AUTH_MODE_ENV_VAR = "AZTOOLS_AUTH_MODE"
+
+# The environment variables a service principal is read from, the ones EnvironmentCredential reads a secret from
+SERVICE_PRINCIPAL_ENV_VARS = {
+    "tenant_id": "AZURE_TENANT_ID",
+    "client_id": "AZURE_CLIENT_ID",
+    "client_secret": "AZURE_CLIENT_SECRET",
+}
+
+
+def service_principal_settings() -> dict:
+    """
+    Returns the tenant_id, client_id and client_secret of a service principal from the environment
+
+    :exception ValueError: Raised if any of the environment variables is not set
+
+    :return dict: The arguments of a ClientSecretCredential
+    """
+    missing = [name for name in SERVICE_PRINCIPAL_ENV_VARS.values() if not os.environ.get(name)]
+    if missing:
+        raise ValueError(f"The service_principal auth mode needs the environment variables: {', '.join(missing)}")
+    return {key: os.environ[name] for key, name in SERVICE_PRINCIPAL_ENV_VARS.items()}
+
+
+# Each auth mode creates a single credential type, so only "default" probes the DefaultAzureCredential chain
+CREDENTIAL_FACTORIES = {
+    "default": lambda: DefaultAzureCredential(),
+    "cli": lambda: AzureCliCredential(),
+    "managed_identity": lambda: ManagedIdentityCredential(client_id=os.environ.get("AZURE_CLIENT_ID")),
+    "environment": lambda: EnvironmentCredential(),
+    "service_principal": lambda: ClientSecretCredential(**service_principal_settings()),
+}
+
+
+class CachedTokenCredential:
+    """
+    Wraps an azure credential so tokens are shared by every client using it. Tokens are cached in memory per scope
+    and refreshed once they are within refresh_margin seconds of expiring, if a refresh fails the cached token is
+    used until it actually expires.
+
+    :param credential: An azure credential with a get_token method
+    :param refresh_margin: float: optional Seconds before expiry at which a token is refreshed. Defaults to 300.
+    """
+
+    def __init__(self, credential, refresh_margin: float = 300):
+        self.credential = credential
+        self.refresh_margin = refresh_margin
+        self.logger = logging.getLogger(__name__)
+        self._tokens = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, token) -> bool:
+        return token.expires_on - time.time() > self.refresh_margin
+
+    def _key_lock(self, key) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get_token(self, *scopes, **kwargs):
+        """
+        Returns a token for the scopes, from the cache if it is not close to expiring
+
+        :param scopes: str: The scopes the token is requested for
+
+        :return AccessToken: The access token
+        """
+        if kwargs.get("claims"):
+            # Claims challenges need a new token from the credential, they can't be answered from the cache
+            return self.credential.get_token(*scopes, **kwargs)
+
+        key = (scopes, kwargs.get("tenant_id"))
+        token = self._tokens.get(key)
+        if token is not None and self._is_fresh(token):
+            return token
+
+        # One thread refreshes a scope while the others wait for its token
+        with self._key_lock(key):
+            token = self._tokens.get(key)
+            if token is not None and self._is_fresh(token):
+                return token
+            try:
+                new_token = self.credential.get_token(*scopes, **kwargs)
+            except Exception:
+                if token is not None and token.expires_on > time.time():
+                    self.logger.warning(f"Failed to refresh token for {scopes}, using the cached token until it expires")
+                    return token
+                raise
+            self._tokens[key] = new_token
+            return new_token
+
+    def clear(self):
+        """
+        Removes every cached token
+        """
+        with self._lock:
+            self._tokens.clear()
+
+    def close(self):
+        if hasattr(self.credential, "close"):
+            self.credential.close()
+
+
+_shared_credentials = {}
+_shared_credentials_lock = threading.Lock()
+
+
+def get_auth_mode(auth_mode: str = None) -> str:
+    """
+    Returns the auth mode to use, the one passed or the AZTOOLS_AUTH_MODE environment variable or "default"
+
+    :param auth_mode: str: optional One of the CREDENTIAL_FACTORIES keys. Defaults to None.
+
+    :exception ValueError: Raised if the auth mode is not recognised
+
+    :return str: The auth mode
+    """
+    auth_mode = auth_mode or os.environ.get(AUTH_MODE_ENV_VAR) or "default"
+    if auth_mode not in CREDENTIAL_FACTORIES:
+        raise ValueError(
+            f"Unknown auth mode: {auth_mode}, expected one of: {', '.join(CREDENTIAL_FACTORIES)}"
+        )
+    return auth_mode
+
+
+def get_shared_credential(auth_mode: str = None) -> CachedTokenCredential:
+    """
+    Returns the credential for the auth mode shared by the whole process, creating it on first use. Sharing one
+    credential means it is only set up once (for "default" the chain is only probed once) and its tokens are reused
+    by every Connector and secret store.
+
+    :param auth_mode: str: optional The auth mode, see get_auth_mode. Defaults to None.
+
+    :return CachedTokenCredential: The shared credential
+    """
+    auth_mode = get_auth_mode(auth_mode)
+    credential = _shared_credentials.get(auth_mode)
+    if credential is None:
+        with _shared_credentials_lock:
+            credential = _shared_credentials.get(auth_mode)
+            if credential is None:
+                credential = CachedTokenCredential(CREDENTIAL_FACTORIES[auth_mode]())
+                _shared_credentials[auth_mode] = credential
+    return credential
+
+
+def get_credential(credential=None, auth_mode: str = None) -> CachedTokenCredential:
+    """
+    Returns the credential to use for a client. A credential passed explicitly is wrapped so its tokens are cached,
+    otherwise the shared credential for the auth mode is returned.
+
+    :param credential: optional An azure credential to use. Defaults to None.
+    :param auth_mode: str: optional The auth mode, see get_auth_mode. Defaults to None.
+
+    :exception ValueError: Raised if both a credential and an auth mode are passed
+
+    :return CachedTokenCredential: The credential
+    """
+    if credential is not None:
+        if auth_mode is not None:
+            raise ValueError("Pass either a credential or an auth_mode, not both")
+        if isinstance(credential, CachedTokenCredential):
+            return credential
+        return CachedTokenCredential(credential)
+    return get_shared_credential(auth_mode)
+
+
+def clear_shared_credentials():
+    """
+    Forgets the shared credentials and their tokens, the next call to get_shared_credential creates new ones
+    """
+    with _shared_credentials_lock:
+        _shared_credentials.clear()
@@ -0,0 +1,289 @@
+from azure.storage.blob import ContainerClient
+import threading
+import base64
+import sqlite3
+import time
+import os
+
+# The largest page the list blobs api returns
+LISTING_PAGE_SIZE = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    account TEXT NOT NULL,
+    container TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER,
+    etag TEXT,
+    last_modified REAL,
+    content_md5 TEXT,
+    tier TEXT,
+    PRIMARY KEY (account, container, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS listings (
+    account TEXT NOT NULL,
+    container TEXT NOT NULL,
+    prefix TEXT NOT NULL,
+    refreshed_at REAL NOT NULL,
+    PRIMARY KEY (account, container, prefix)
+) WITHOUT ROWID;
+"""
+
+
+def blob_content_md5(blob) -> str:
+    """
+    Returns the base64 content md5 of listed blob properties, or None if the blob has no md5
+    """
+    content_settings = getattr(blob, "content_settings", None)
+    content_md5 = getattr(content_settings, "content_md5", None)
+    return base64.b64encode(bytes(content_md5)).decode() if content_md5 else None
+
+
+def blob_tier(blob) -> str:
+    """
+    Returns the access tier of listed blob properties as a string, or None if it is not known
+    """
+    tier = getattr(blob, "blob_tier", None)
+    return getattr(tier, "value", tier)
+
+
+def prefix_range(prefix: str) -> tuple:
+    """
+    Returns the bounds of the names that start with prefix, as (lower inclusive, upper exclusive). Comparing against
+    the bounds lets sqlite answer prefix queries from the primary key index.
+    """
+    if not prefix:
+        return "", None
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def glob_prefix(pattern: str) -> str:
+    """
+    Returns the literal part of a glob pattern before its first wildcard
+    """
+    for index, char in enumerate(pattern):
+        if char in "*?[":
+            return pattern[:index]
+    return pattern
+
+
+class ListingIndex:
+    """
+    A local sqlite index of blob listings, storing the name, size, etag, last modified time, content md5 and tier of
+    the blobs under each (storage account, container, prefix) that has been listed. Prefix, glob and size queries
+    are answered from the index, and a prefix is only listed from azure again once its listing is older than max_age
+    seconds, or the listing of a prefix containing it is.
+
+    Refreshing a prefix lists it once, without holding the index's lock, and then only writes the rows of blobs that
+    are new, changed or deleted in one short transaction, so queries are not blocked while a large prefix is listed.
+    Listings are ordered by when they started: a listing never overwrites one of the same blobs that started after it.
+
+    :param path: str: The sqlite database file, ":memory:" keeps the index in memory
+    :param max_age: float: optional Seconds a listing is used for before it is refreshed. Defaults to 300.
+    """
+
+    def __init__(self, path: str, max_age: float = 300):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        # A lock and the number of threads using it per listing being ensured, so concurrent ensure calls list a
+        # prefix once. Entries are removed once no thread uses them.
+        self._refresh_locks = {}
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            # Lets other processes read the index while it is refreshed
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def refreshed_at(self, account: str, container: str, prefix: str = "") -> float:
+        """
+        Returns when the newest listing covering prefix was made, as a unix timestamp, or None if it was never listed
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MAX(refreshed_at) FROM listings "
+                "WHERE account = ? AND container = ? AND substr(?, 1, length(prefix)) = prefix",
+                (account, container, prefix or ""),
+            ).fetchone()
+        return row[0]
+
+    def is_fresh(self, account: str, container: str, prefix: str = "", max_age: float = None) -> bool:
+        """
+        Returns True if prefix was listed, directly or as part of a shorter prefix, less than max_age seconds ago
+
+        :param max_age: float: optional Overrides the index's max_age. Defaults to None.
+        """
+        refreshed_at = self.refreshed_at(account, container, prefix)
+        max_age = self.max_age if max_age is None else max_age
+        return refreshed_at is not None and time.time() - refreshed_at < max_age
+
+    def refresh(self, container_client: ContainerClient, account: str, container: str, prefix: str = "") -> int:
+        """
+        Lists every blob under prefix and brings the index in line with it
+
+        :param container_client: ContainerClient: The client for the container to list
+        :param account: str: The storage account name
+        :param container: str: The container name
+        :param prefix: str: optional The prefix to list. Defaults to the whole container.
+
+        :return int: The number of blobs under prefix
+        """
+        prefix = prefix or ""
+        # The listing is as old as its start, blobs changed while it is read may or may not be in it
+        refreshed_at = time.time()
+        lower, upper = prefix_range(prefix)
+        listing = container_client.list_blobs(name_starts_with=prefix or None, results_per_page=LISTING_PAGE_SIZE)
+        rows = [
+            (
+                account,
+                container,
+                blob.name,
+                blob.size,
+                blob.etag,
+                blob.last_modified.timestamp() if blob.last_modified else None,
+                blob_content_md5(blob),
+                blob_tier(blob),
+            )
+            for blob in listing
+        ]
+
+        count = len(rows)
+
+        with self._lock:
+            newer = [
+                row[0]
+                for row in self._db.execute(
+                    "SELECT prefix FROM listings WHERE account = ? AND container = ? AND refreshed_at > ? "
+                    "AND (substr(?, 1, length(prefix)) = prefix OR substr(prefix, 1, length(?)) = ?)",
+                    (account, container, refreshed_at, prefix, prefix, prefix),
+                )
+            ]
+            if any(prefix.startswith(newer_prefix) for newer_prefix in newer):
+                # A listing covering prefix started after this one and was already written
+                return count
+            # The blobs under longer prefixes listed after this one started are left as those listings found them
+            rows = [row for row in rows if not row[2].startswith(tuple(newer))]
+            self._db.execute("BEGIN")
+            try:
+                self._db.execute("CREATE TEMP TABLE IF NOT EXISTS seen (name TEXT PRIMARY KEY) WITHOUT ROWID")
+                self._db.execute("DELETE FROM seen")
+                self._db.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ((row[2],) for row in rows))
+                # Unchanged blobs are left as they are
+                self._db.executemany(
+                    "INSERT INTO blobs VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (account, container, name) DO UPDATE SET "
+                    "size = excluded.size, etag = excluded.etag, last_modified = excluded.last_modified, "
+                    "content_md5 = excluded.content_md5, tier = excluded.tier "
+                    "WHERE blobs.etag IS NOT excluded.etag OR blobs.tier IS NOT excluded.tier",
+                    rows,
+                )
+                self._db.execute(
+                    "DELETE FROM blobs WHERE account = ? AND container = ? AND name >= ? "
+                    "AND (? IS NULL OR name < ?) AND name NOT IN (SELECT name FROM seen) "
+                    "AND NOT EXISTS (SELECT 1 FROM listings WHERE listings.account = blobs.account "
+                    "AND listings.container = blobs.container AND listings.refreshed_at > ? "
+                    "AND substr(blobs.name, 1, length(listings.prefix)) = listings.prefix)",
+                    (account, container, lower, upper, upper, refreshed_at),
+                )
+                self._db.execute(
+                    "INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?)", (account, container, prefix, refreshed_at)
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return count
+
+    def ensure(
+        self, container_client: ContainerClient, account: str, container: str, prefix: str = "", max_age: float = None
+    ) -> bool:
+        """
+        Refreshes prefix if it is not fresh. Other threads can query the index while it is listed, and threads
+        ensuring the same prefix wait for the one listing it.
+
+        :param max_age: float: optional Overrides the index's max_age. Defaults to None.
+
+        :return bool: True if prefix was refreshed
+        """
+        key = (account, container, prefix or "")
+        with self._lock:
+            entry = self._refresh_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                if self.is_fresh(account, container, prefix, max_age=max_age):
+                    return False
+                self.refresh(container_client, account, container, prefix)
+                return True
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._refresh_locks[key]
+
+    def invalidate(self, account: str = None, container: str = None):
+        """
+        Marks the listings of a container, an account or everything as stale, so they are listed again on next use
+        """
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM listings WHERE (? IS NULL OR account = ?) AND (? IS NULL OR container = ?)",
+                (account, account, container, container),
+            )
+
+    def _query(self, columns: str, account: str, container: str, prefix: str, condition: str = "", params=()):
+        lower, upper = prefix_range(prefix or "")
+        with self._lock:
+            return self._db.execute(
+                f"SELECT {columns} FROM blobs WHERE account = ? AND container = ? AND name >= ? "
+                f"AND (? IS NULL OR name < ?) {condition} ORDER BY name",
+                (account, container, lower, upper, upper, *params),
+            ).fetchall()
+
+    def list_blobs(self, account: str, container: str, prefix: str = "") -> list:
+        """
+        Returns the names of the indexed blobs under prefix, in name order
+        """
+        return [row[0] for row in self._query("name", account, container, prefix)]
+
+    def blobs(self, account: str, container: str, prefix: str = "") -> list:
+        """
+        Returns a dict of the name, size, etag, last modified timestamp, content md5 and tier of each indexed blob
+        under prefix
+        """
+        columns = ("name", "size", "etag", "last_modified", "content_md5", "tier")
+        return [dict(zip(columns, row)) for row in self._query(", ".join(columns), account, container, prefix)]
+
+    def glob(self, account: str, container: str, pattern: str) -> list:
+        """
+        Returns the names of the indexed blobs matching a glob pattern, where * and ? also match /
+        """
+        # sqlite's GLOB negates character classes with ^ rather than !
+        sqlite_pattern = pattern.replace("[!", "[^")
+        rows = self._query("name", account, container, glob_prefix(pattern), "AND name GLOB ?", (sqlite_pattern,))
+        return [row[0] for row in rows]
+
+    def total_size(self, account: str, container: str, prefix: str = "") -> tuple:
+        """
+        Returns the number of indexed blobs under prefix and their total size in bytes
+        """
+        lower, upper = prefix_range(prefix or "")
+        with self._lock:
+            count, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs "
+                "WHERE account = ? AND container = ? AND name >= ? AND (? IS NULL OR name < ?)",
+                (account, container, lower, upper, upper),
+            ).fetchone()
+        return count, size
@@ -0,0 +1,127 @@
+from functools import lru_cache
+import re
+
+# The number of parsed paths kept by parse_path
+PATH_CACHE_SIZE = 65536
+
+AZURE_PATH_PATTERN = re.compile(r"https://.*\.blob.core.windows.net|azure://")
+HTTPS_PATH_PATTERN = re.compile(r"https://(.*)\.blob\.core\.windows\.net/?(.*)", re.DOTALL)
+
+
+class AzurePath:
+    """
+    An immutable, hashable azure blob location. Connector methods accept it in place of a path string and use its
+    parts without parsing it again.
+
+    :param storage_account: str: The storage account name, None for azure://container/path paths without one
+    :param container: str: The container name
+    :param file_path: str: optional The path from the container to the blob or folder. Defaults to "".
+    """
+
+    __slots__ = ("storage_account", "container", "file_path")
+
+    def __init__(self, storage_account: str, container: str, file_path: str = ""):
+        object.__setattr__(self, "storage_account", storage_account)
+        object.__setattr__(self, "container", container)
+        object.__setattr__(self, "file_path", file_path)
+
+    @classmethod
+    def parse(cls, path, storage_account: str = None) -> "AzurePath":
+        """
+        Returns the AzurePath of an azure path string, see parse_path
+        """
+        return parse_path(path, storage_account)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("AzurePath is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("AzurePath is immutable")
+
+    def __eq__(self, other):
+        if not isinstance(other, AzurePath):
+            return NotImplemented
+        return (self.storage_account, self.container, self.file_path) == (
+            other.storage_account,
+            other.container,
+            other.file_path,
+        )
+
+    def __hash__(self):
+        return hash((self.storage_account, self.container, self.file_path))
+
+    def __repr__(self):
+        return f"AzurePath({self.storage_account!r}, {self.container!r}, {self.file_path!r})"
+
+    def __str__(self):
+        if self.storage_account:
+            return f"https://{self.storage_account}.blob.core.windows.net/{self.container}/{self.file_path}"
+        return f"azure://{self.container}/{self.file_path}"
+
+    def __reduce__(self):
+        return AzurePath, (self.storage_account, self.container, self.file_path)
+
+    def to_dict(self) -> dict:
+        """
+        Returns the parts of the path in the dict returned by parse_azure_path
+        """
+        return {"storage_account": self.storage_account, "container": self.container, "file_path": self.file_path}
+
+    def with_storage_account(self, storage_account: str) -> "AzurePath":
+        """
+        Returns the path with its storage account set, if it has none
+        """
+        if self.storage_account or not storage_account:
+            return self
+        return AzurePath(storage_account, self.container, self.file_path)
+
+
+def is_azure_path(path) -> bool:
+    """
+    Returns true if the path is an AzurePath or a string of a recognised azure path format
+
+    :param path: str: The path to test
+
+    :return bool: True if path is of an accepted azure path format
+    """
+    if isinstance(path, AzurePath):
+        return True
+    return AZURE_PATH_PATTERN.match(path) is not None
+
+
+@lru_cache(maxsize=PATH_CACHE_SIZE)
+def parse_path(path: str, storage_account: str = None) -> AzurePath:
+    """
+    Parses an azure path of the format azure://<container>/path or
+    https://<storage-account>.blob.core.windows.net/<container>/<path>. The results are cached, so parsing the same
+    path again is a dict lookup.
+
+    :param path: str: The azure path
+    :param storage_account: str: optional The storage account of azure:// paths, which do not include one. Defaults to None.
+
+    :exception ValueError: Raised if path is not an azure path
+
+    :return AzurePath: The parsed path
+    """
+    if path.startswith("azure://"):
+        container, _, file_path = path[len("azure://"):].partition("/")
+        return AzurePath(storage_account, container, file_path)
+    match = HTTPS_PATH_PATTERN.match(path)
+    if match is None:
+        raise ValueError(f"Path: {path} is not an azure path")
+    container, _, file_path = match.group(2).partition("/")
+    return AzurePath(match.group(1), container, file_path)
+
+
+@lru_cache(maxsize=PATH_CACHE_SIZE)
+def to_azure_path(path: str, storage_account: str = None) -> AzurePath:
+    """
+    Returns the AzurePath of a path string, or None if it is a local path. The results are cached, so a path seen
+    before costs one dict lookup.
+
+    :param path: str: The path
+    :param storage_account: str: optional The storage account of azure:// paths, which do not include one. Defaults to None.
+
+    :return AzurePath: The parsed path, or None
+    """
+    return parse_path(path, storage_account) if is_azure_path(path) else None
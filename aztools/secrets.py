@@ -1,12 +1,12 @@
 from azure.keyvault.secrets import SecretClient
-from azure.identity import DefaultAzureCredential
+from aztools.credentials import get_credential
 
 
 class AzureSecretStore():
 
-    def __init__(self, key_vault):
+    def __init__(self, key_vault, credential=None, auth_mode=None):
         key_vault_uri = f"https://{key_vault}.vault.azure.net"
-        credential = DefaultAzureCredential()
+        credential = get_credential(credential=credential, auth_mode=auth_mode)
         self.client = SecretClient(vault_url=key_vault_uri, credential=credential)
 
     def set_secret(self, secret_name, secret_value):
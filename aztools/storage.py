@@ -1,86 +1,682 @@
 from aztools.args_handler import arguments_decorator, multi_arguments_decorator
-from azure.identity._credentials.default import DefaultAzureCredential
-from azure.storage.blob import BlobServiceClient, ContainerClient
+from aztools.concurrency import chunked, ordered_map
+from aztools.credentials import get_auth_mode, get_credential
+from aztools.index import LISTING_PAGE_SIZE, blob_content_md5, blob_tier, glob_prefix
+from aztools.paths import AzurePath, is_azure_path, parse_path
+from aztools.transfer import (
+    BlockBlobWriter,
+    DEFAULT_BLOCK_SIZE,
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_LARGE_BLOB_THRESHOLD,
+    FIRST_RANGE_SIZE,
+    content_range_size,
+    download_blob_ranges,
+    file_md5,
+    named_buffer,
+    open_blob_range_reader,
+    open_temporary,
+    upload_file_blocks,
+)
+from aztools.transport import build_transport, close_transport
+from azure.core import MatchConditions
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+from azure.storage.blob import (
+    BlobPrefix,
+    BlobSasPermissions,
+    BlobServiceClient,
+    ContainerClient,
+    ContentSettings,
+    generate_blob_sas,
+)
+from collections import OrderedDict
 import smart_open
+import threading
+import tempfile
+import fnmatch
+import datetime
+import base64
+import json
 import logging
-import re
+import time
 import os
 
 
-def parse_azure_path(storage_account: str, container: str, path: str) -> dict:
+def parse_azure_path(storage_account: str, container: str, path) -> dict:
     """
     Parse an azure url into : storage_account, container and filepath.
     If passing a url of the for azure://container/filepath the storage account is
     taken from the class instance. If there is no storage account passed for the class
-    the storage account will be None.
+    the storage account will be None. Azure paths are parsed once and cached, and an
+    AzurePath is used as it is.
 
-    :param path: str: The azure blob path
+    :param path: str: The azure blob path, or an AzurePath
     :return: dict: A dictionary containing the container name and filepath
     """
-
-    if path.startswith("https://"):
-        storage_account = re.findall(
-            r"https://(.*)\.blob\.core\.windows\.net", path
-        )[0]
-        path = path.replace(f"https://{storage_account}.blob.core.windows.net/", "")
-        split_path = path.split("/")
-        container = split_path.pop(0)
-        filepath = "/".join(split_path)
-
-    elif path.startswith("azure://"):
-        path = path.replace("azure://", "")
-        split_path = path.split("/")
-        container = split_path.pop(0)
-        filepath = "/".join(split_path)
-
-    else:
-        filepath = path
+    if isinstance(path, AzurePath):
+        return path.with_storage_account(storage_account).to_dict()
+    if is_azure_path(path):
+        return parse_path(path, storage_account).to_dict()
     return {
         "storage_account": storage_account,
         "container": container,
-        "file_path": filepath,
+        "file_path": path,
     }
 
 
+def walk_local_files(local_path: str):
+    """
+    Yields every file under a local directory, including those in sub-directories, in a stable order
+
+    :param local_path: str: The directory to walk
+
+    :return iterator: Tuples of the file's local path and its path relative to local_path, using / separators
+    """
+    for root, dirs, files in os.walk(local_path):
+        dirs.sort()
+        for file in sorted(files):
+            file_path = os.path.join(root, file)
+            yield file_path, os.path.relpath(file_path, local_path).replace(os.sep, "/")
+
+
+def flat_download_paths(blobs, local_path: str):
+    """
+    Yields each listed blob with the path in local_path download_folder saves it to, named by its base name
+
+    :param blobs: iterable: Listed blobs
+    :param local_path: str: The local directory
+
+    :exception ValueError: Raised before yielding a blob whose base name an earlier blob already has, downloading both
+        at once would write them to the same file
+
+    :return iterator: Tuples of the blob and its local path
+    """
+    seen = {}
+    for blob in blobs:
+        file_name = os.path.basename(blob.name)
+        if file_name in seen:
+            raise ValueError(
+                f"{seen[file_name]} and {blob.name} would both be downloaded to {file_name}, "
+                "use sync_down to keep the folder structure"
+            )
+        seen[file_name] = blob.name
+        yield blob, os.path.join(local_path, file_name)
+
+
+def local_blob_path(local_root: str, relative_path: str) -> str:
+    """
+    Returns the local path under local_root of a blob path relative to a folder, or None if the blob name has . or ..
+    segments, which could place the file outside local_root, or otherwise resolves outside local_root
+
+    :param local_root: str: The local directory the folder is downloaded to
+    :param relative_path: str: The blob name relative to the folder, using / separators
+
+    :return str: The local path, or None
+    """
+    segments = relative_path.split("/")
+    if any(segment in (".", "..") for segment in segments):
+        return None
+    root = os.path.abspath(local_root)
+    local_path = os.path.normpath(os.path.join(root, *segments))
+    if local_path == root or os.path.commonpath([root, local_path]) != root:
+        return None
+    return local_path
+
+
+def join_blob_path(prefix: str, relative_path: str) -> str:
+    """
+    Joins a blob folder path and a relative path, adding a / between them if the folder does not end with one
+    """
+    if not prefix:
+        return relative_path
+    return prefix + relative_path if prefix.endswith("/") else f"{prefix}/{relative_path}"
+
+
+UPLOAD_IF_EXISTS = ("error", "overwrite", "skip")
+# Connector.sync_up keeps the local modification time of uploaded files in this blob metadata key
+SYNC_MTIME_METADATA = "aztools_mtime"
+# The pool size a Connector keeps at least, and the max_workers default of its folder methods that it is sized for
+MIN_POOL_SIZE = 10
+DEFAULT_MAX_WORKERS = 8
+# The most sub-requests a blob batch request can hold
+MAX_BATCH_SIZE = 256
+
+
+def default_pool_size(download_concurrency: int, upload_concurrency: int) -> int:
+    """
+    Returns a connection pool size that fits DEFAULT_MAX_WORKERS threads each transferring a large blob
+    """
+    return max(MIN_POOL_SIZE, DEFAULT_MAX_WORKERS * max(download_concurrency, upload_concurrency))
+
+
+def check_batch_size(batch_size: int):
+    """
+    Raises ValueError if batch_size is not a valid number of sub-requests for a blob batch request
+    """
+    if not 1 <= batch_size <= MAX_BATCH_SIZE:
+        raise ValueError(f"batch_size must be between 1 and {MAX_BATCH_SIZE}, got: {batch_size}")
+
+
+def match_segments(name_segments: list, pattern_segments: list) -> bool:
+    """
+    Returns True if the segments of a blob name match the segments of a glob pattern, where a ** segment matches
+    any number of segments and other segments are matched with fnmatch
+    """
+    if not pattern_segments:
+        return not name_segments
+    if pattern_segments[0] == "**":
+        return any(
+            match_segments(name_segments[index:], pattern_segments[1:]) for index in range(len(name_segments) + 1)
+        )
+    return bool(name_segments) and fnmatch.fnmatchcase(name_segments[0], pattern_segments[0]) and match_segments(
+        name_segments[1:], pattern_segments[1:]
+    )
+
+
+class BlobRecord:
+    """
+    The properties of a listed blob, kept compactly with __slots__
+
+    :param name: str: The blob name, relative to the listed path
+    :param size: int: The size in bytes
+    :param etag: str: The etag
+    :param last_modified: datetime: When the blob was last modified
+    :param content_md5: str: The base64 content md5, None if the blob has none
+    :param tier: str: The access tier, such as "Hot", "Cool" or "Archive"
+    """
+
+    __slots__ = ("name", "size", "etag", "last_modified", "content_md5", "tier")
+
+    def __init__(self, name: str, size: int, etag: str, last_modified, content_md5: str = None, tier: str = None):
+        self.name = name
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_md5 = content_md5
+        self.tier = tier
+
+    def __repr__(self):
+        return f"BlobRecord(name={self.name!r}, size={self.size}, etag={self.etag!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, BlobRecord):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+
+LISTING_FORMATS = ("numpy", "arrow")
+
+
+def blob_columns(rows, columnar: str):
+    """
+    Builds columns of blob properties from rows ordered like BlobRecord's fields. numpy gives a dict of arrays, with
+    last_modified as datetime64[us] in UTC, and arrow gives a pyarrow Table.
+    """
+    columns = {field: [] for field in BlobRecord.__slots__}
+    appends = [columns[field].append for field in BlobRecord.__slots__]
+    for row in rows:
+        for append, value in zip(appends, row):
+            append(value)
+
+    if columnar == "arrow":
+        import pyarrow
+
+        types = {"size": pyarrow.int64(), "last_modified": pyarrow.timestamp("us", tz="UTC")}
+        return pyarrow.table(
+            {field: pyarrow.array(values, types.get(field, pyarrow.string())) for field, values in columns.items()}
+        )
+
+    import numpy
+
+    not_a_time = numpy.iinfo(numpy.int64).min
+    arrays = {field: numpy.array(values, dtype=object) for field, values in columns.items()}
+    arrays["size"] = numpy.array(columns["size"], dtype=numpy.int64)
+    arrays["last_modified"] = numpy.array(
+        [round(value.timestamp() * 1e6) if value else not_a_time for value in columns["last_modified"]],
+        dtype=numpy.int64,
+    ).view("datetime64[us]")
+    return arrays
+
+
+class SyncManifest:
+    """
+    The record of the blobs Connector.sync_down has downloaded to a local folder, kept in a json file in the folder.
+    Each entry holds the blob's size, etag, last modified time and content md5, and the local file's size and
+    modification time when it was downloaded.
+
+    :param local_path: str: The local folder
+    :param entries: dict: optional The entries keyed by path relative to the folder. Defaults to None.
+    """
+
+    file_name = ".aztools-sync.json"
+
+    def __init__(self, local_path: str, entries: dict = None):
+        self.local_path = local_path
+        self.entries = entries or {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, local_path: str) -> "SyncManifest":
+        """
+        Loads the manifest of a local folder, a missing or unreadable manifest gives an empty one
+        """
+        try:
+            with open(os.path.join(local_path, cls.file_name)) as f:
+                return cls(local_path, json.load(f))
+        except (OSError, ValueError):
+            return cls(local_path)
+
+    def save(self):
+        """
+        Writes the manifest to a temporary file and moves it into place, so an interrupted save can't corrupt it
+        """
+        manifest_path = os.path.join(self.local_path, self.file_name)
+        with self._lock:
+            with open(manifest_path + ".tmp", "w") as f:
+                json.dump(self.entries, f, sort_keys=True)
+            os.replace(manifest_path + ".tmp", manifest_path)
+
+    def _local_state(self, relative_path: str):
+        try:
+            stat = os.stat(os.path.join(self.local_path, *relative_path.split("/")))
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def is_unchanged(self, relative_path: str, blob) -> bool:
+        """
+        Returns True if the blob is the one that was downloaded and the local copy has not been changed since
+        """
+        entry = self.entries.get(relative_path)
+        if entry is None or entry["size"] != blob.size:
+            return False
+        if self._local_state(relative_path) != (entry["local_size"], entry["local_mtime_ns"]):
+            return False
+        if entry["etag"] == blob.etag:
+            return True
+        # A blob rewritten with the same content gets a new etag but keeps its md5
+        content_md5 = blob_content_md5(blob)
+        return content_md5 is not None and content_md5 == entry["content_md5"]
+
+    def add(self, relative_path: str, blob):
+        """
+        Records that a blob has been downloaded to the relative path
+        """
+        local_size, local_mtime_ns = self._local_state(relative_path)
+        with self._lock:
+            self.entries[relative_path] = {
+                "size": blob.size,
+                "etag": blob.etag,
+                "last_modified": blob.last_modified.isoformat() if blob.last_modified else None,
+                "content_md5": blob_content_md5(blob),
+                "local_size": local_size,
+                "local_mtime_ns": local_mtime_ns,
+            }
+
+    def remove(self, relative_path: str):
+        with self._lock:
+            self.entries.pop(relative_path, None)
+
+
+class BlobIterator:
+    """
+    Lazily iterates a blob listing page by page, yielding the names of the blobs with the prefix removed. Only one
+    page is held in memory at a time.
+
+    continuation_token is the token of the first page that has not been completely yielded, so a scan that stops
+    part way can be resumed by passing it to a new iterator. The rest of the page it stopped in is yielded again.
+    It is None before the first page and once the listing is finished.
+
+    :param container_client: ContainerClient: The container to list
+    :param prefix: str: optional Only blobs whose names start with prefix are listed. Defaults to None.
+    :param results_per_page: int: optional The number of blobs requested per page, at most 5000. Defaults to 5000.
+    :param continuation_token: str: optional A continuation_token of an earlier iterator to resume from. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        container_client: ContainerClient,
+        prefix: str = None,
+        results_per_page: int = LISTING_PAGE_SIZE,
+        continuation_token: str = None,
+    ):
+        self.container_client = container_client
+        self.prefix = prefix or ""
+        self.results_per_page = results_per_page
+        self.continuation_token = continuation_token
+        self._names = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if self._names is None:
+            self._names = self._iter_names()
+        return next(self._names)
+
+    def _iter_names(self):
+        pages = self.container_client.list_blobs(
+            name_starts_with=self.prefix or None, results_per_page=self.results_per_page
+        ).by_page(continuation_token=self.continuation_token)
+        for page in pages:
+            for blob in page:
+                yield blob.name[len(self.prefix):]
+            self.continuation_token = pages.continuation_token
+
+
+class ClientPool:
+    """
+    A thread safe, bounded pool of clients keyed by account url. When the pool is full the least
+    recently used client is evicted and closed, so its connections are released.
+
+    :param max_size: int: optional The maximum number of clients to keep open. Defaults to 8.
+    :param close_client: callable: optional Called with each evicted client to close it. Defaults to calling its close method.
+    """
+
+    def __init__(self, max_size: int = 8, close_client=None):
+        if max_size < 1:
+            raise ValueError(f"max_size must be at least 1, got: {max_size}")
+        self.max_size = max_size
+        self.close_client = close_client or (lambda client: client.close())
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._clients)
+
+    def __contains__(self, key):
+        return key in self._clients
+
+    def get(self, key: str, factory):
+        """
+        Returns the pooled client for the key, creating it with factory if it is not pooled yet
+
+        :param key: str: The key of the client, usually the account url
+        :param factory: callable: Called with no arguments to create the client on a miss
+
+        :return: The pooled client
+        """
+        evicted = []
+        with self._lock:
+            if key in self._clients:
+                self._clients.move_to_end(key)
+                return self._clients[key]
+            client = factory()
+            self._clients[key] = client
+            while len(self._clients) > self.max_size:
+                evicted.append(self._clients.popitem(last=False)[1])
+        for old_client in evicted:
+            self.close_client(old_client)
+        return client
+
+    def clear(self) -> list:
+        """
+        Removes every client from the pool without closing them
+
+        :return list: The removed clients
+        """
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        return clients
+
+    def close(self):
+        """
+        Closes and removes every client in the pool
+        """
+        for client in self.clear():
+            self.close_client(client)
+
+
+class ContainerCache:
+    """
+    A thread safe record of the containers that have been verified to exist, keyed by (storage_account, container).
+    Entries expire after ttl seconds so deleted containers are eventually noticed.
+
+    :param ttl: float: optional Seconds a verified container is trusted for. Defaults to 300.
+    """
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self._verified = {}
+        self._lock = threading.Lock()
+
+    def is_verified(self, storage_account: str, container: str) -> bool:
+        """
+        Returns True if the container was verified to exist less than ttl seconds ago
+        """
+        with self._lock:
+            verified_at = self._verified.get((storage_account, container))
+            if verified_at is None:
+                return False
+            if time.monotonic() - verified_at > self.ttl:
+                del self._verified[(storage_account, container)]
+                return False
+            return True
+
+    def add(self, storage_account: str, container: str):
+        """
+        Records that the container exists in the storage account
+        """
+        with self._lock:
+            self._verified[(storage_account, container)] = time.monotonic()
+
+    def invalidate(self, storage_account: str = None, container: str = None):
+        """
+        Forgets verified containers. If no parameters are passed every entry is removed, otherwise only entries
+        matching the storage account and/or container passed.
+
+        :param storage_account: str: optional Only invalidate containers in this storage account. Defaults to None.
+        :param container: str: optional Only invalidate containers with this name. Defaults to None.
+        """
+        with self._lock:
+            for key in list(self._verified):
+                if (storage_account is None or key[0] == storage_account) and (
+                    container is None or key[1] == container
+                ):
+                    del self._verified[key]
+
+
 class Connector:
-    def __init__(self, path=None, storage_account=None, container=None):
+    """
+    A client for reading and writing blobs in azure storage accounts.
+
+    :param path: str: optional An azure path, the storage account and container are taken from it. Defaults to None.
+    :param storage_account: str: optional The default storage account name. Defaults to None.
+    :param container: str: optional The default container name. Defaults to None.
+    :param max_clients: int: optional The number of clients for other storage accounts to keep open. Defaults to 8.
+    :param container_cache_ttl: float: optional Seconds a container is trusted to exist after it was checked. Defaults to 300.
+    :param lazy: bool: optional If True no credential, client or network call is made until the connector is first used.
+        Defaults to False, which checks the container exists when the connector is created.
+    :param credential: optional An azure credential to use instead of the shared one. Defaults to None.
+    :param auth_mode: str: optional The type of credential to use: "default", "cli", "managed_identity", "environment"
+        or "service_principal", a client secret read from AZURE_TENANT_ID, AZURE_CLIENT_ID and AZURE_CLIENT_SECRET.
+        Defaults to the AZTOOLS_AUTH_MODE environment variable, or "default" if it is not set.
+    :param pool_size: int: optional The number of connections kept open per storage account, raise this when calling
+        the connector from more threads than this. Methods that use more connections than this at once log a
+        warning. Defaults to enough for the default 8 workers of the folder methods each transferring a large blob
+        with download_concurrency or upload_concurrency connections.
+    :param keep_alive: bool: optional If False connections are closed after each request. Defaults to True.
+    :param connection_timeout: float: optional Seconds to wait for a connection. Defaults to the azure default.
+    :param read_timeout: float: optional Seconds to wait between bytes read. Defaults to the azure default.
+    :param large_blob_threshold: int: optional Blobs of at least this many bytes are downloaded as byte ranges on
+        parallel connections by download_folder and open in read mode, and files of at least this size are uploaded
+        as blocks staged on parallel connections by upload_folder. None turns this off. Defaults to 256 MiB.
+    :param temp_dir: str: optional The directory open downloads large blobs to. Defaults to the system temporary
+        directory.
+    :param download_chunk_size: int: optional The size of the ranges large blobs are downloaded in. Defaults to 16 MiB.
+    :param download_concurrency: int: optional The number of ranges of a large blob downloaded at once. Defaults to 8.
+    :param upload_block_size: int: optional The size of the blocks large files are uploaded in. Defaults to 16 MiB.
+    :param upload_concurrency: int: optional The number of blocks of a large file uploaded at once. Defaults to 8.
+    :param listing_index: ListingIndex: optional A local index list_blobs answers from, listing a prefix from azure
+        only when the index's listing of it is older than its max_age. Defaults to None.
+    :param disk_cache: DiskCache: optional A local cache open reads azure blobs through, checking a cached copy is
+        still current with a conditional request. Defaults to None.
+    :param memory_cache: MemoryCache: optional An in memory cache open reads small azure blobs through, checking
+        cached blobs are still current with a conditional request once they are older than its ttl. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        path=None,
+        storage_account=None,
+        container=None,
+        max_clients=8,
+        container_cache_ttl=300,
+        lazy=False,
+        credential=None,
+        auth_mode=None,
+        pool_size=None,
+        keep_alive=True,
+        connection_timeout=None,
+        read_timeout=None,
+        large_blob_threshold=DEFAULT_LARGE_BLOB_THRESHOLD,
+        temp_dir=None,
+        download_chunk_size=DEFAULT_CHUNK_SIZE,
+        download_concurrency=DEFAULT_CONCURRENCY,
+        upload_block_size=DEFAULT_BLOCK_SIZE,
+        upload_concurrency=DEFAULT_CONCURRENCY,
+        listing_index=None,
+        disk_cache=None,
+        memory_cache=None,
+    ):
 
         self.storage_account = storage_account
         self.container = container
+        self.lazy = lazy
+        if credential is None:
+            # Checked now, a lazy connector would otherwise only fail on first use
+            get_auth_mode(auth_mode)
+        self.auth_mode = auth_mode
+        self.transport_options = {
+            "pool_size": pool_size or default_pool_size(download_concurrency, upload_concurrency),
+            "pool_connections": max_clients + 1,
+            "keep_alive": keep_alive,
+            "connection_timeout": connection_timeout,
+            "read_timeout": read_timeout,
+        }
+        self.large_blob_threshold = large_blob_threshold
+        self.temp_dir = temp_dir
+        self.download_chunk_size = download_chunk_size
+        self.download_concurrency = download_concurrency
+        self.upload_block_size = upload_block_size
+        self.upload_concurrency = upload_concurrency
+        self.listing_index = listing_index
+        self.disk_cache = disk_cache
+        self.memory_cache = memory_cache
 
         self.logger = logging.getLogger(__name__)
 
+        # Clients for storage accounts other than the one the connector was initialised with
+        self.client_pool = ClientPool(max_size=max_clients)
+        self.container_cache = ContainerCache(ttl=container_cache_ttl)
+
         if path:
             parsed_path = self.parse_azure_path(path)
             self.storage_account = parsed_path["storage_account"]
             self.container = parsed_path["container"]
 
-        # Gets credential from azure cli
-        self.credential = DefaultAzureCredential()
+        self._credential = get_credential(credential, auth_mode) if credential is not None else None
+        self._transport = None
+        self._blob_service_client = None
+        self._container_client = None
+        self._connect_lock = threading.RLock()
 
-        # Create class wide storage account and container clients if names are passed
-        if self.storage_account:
-            blob_storage_url = self.get_blob_storage_url(
-                storage_account=self.storage_account
-            )
-            self.blob_service_client = BlobServiceClient(
-                credential=self.credential, account_url=blob_storage_url
-            )
-            if self.container:
-                container_names = [
-                    container.name
-                    for container in self.blob_service_client.list_containers()
-                ]
-                if self.container in container_names:
-                    self.container_client = (
-                        self.blob_service_client.get_container_client(
-                            container=self.container
-                        )
+        if not lazy:
+            self.connect()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def connect(self):
+        """
+        Creates the credential and the class wide storage account and container clients, checking the container
+        exists. This happens on first use for lazy connectors, calling connect forces it to happen now.
+
+        :exception ValueError: Raised if the container does not exist in the storage account
+
+        :return Connector: The connector itself
+        """
+        # Accessing the properties creates anything that has not been created yet
+        self.credential
+        self.blob_service_client
+        self.container_client
+        return self
+
+    @property
+    def credential(self):
+        """
+        The credential used by every client the connector creates, shared with the rest of the process unless one
+        was passed to the connector
+        """
+        if self._credential is None:
+            with self._connect_lock:
+                if self._credential is None:
+                    self._credential = get_credential(auth_mode=self.auth_mode)
+        return self._credential
+
+    @property
+    def transport(self):
+        """
+        The HTTP transport shared by every client the connector creates, so they share one set of connection pools
+        """
+        if self._transport is None:
+            with self._connect_lock:
+                if self._transport is None:
+                    self._transport = build_transport(**self.transport_options)
+        return self._transport
+
+    def _create_blob_service_client(self, storage_account: str) -> BlobServiceClient:
+        blob_storage_url = self.get_blob_storage_url(storage_account=storage_account)
+        return BlobServiceClient(
+            credential=self.credential,
+            account_url=blob_storage_url,
+            transport=self.transport,
+        )
+
+    @property
+    def blob_service_client(self) -> BlobServiceClient:
+        """
+        The client for the storage account the connector was initialised with, None if there is no storage account
+        """
+        if self._blob_service_client is None and self.storage_account:
+            with self._connect_lock:
+                if self._blob_service_client is None:
+                    self._blob_service_client = self._create_blob_service_client(
+                        self.storage_account
                     )
-                else:
-                    raise ValueError(
-                        f"The container: {self.container} is not in the storage account: {self.storage_account}"
+        return self._blob_service_client
+
+    @property
+    def container_client(self) -> ContainerClient:
+        """
+        The client for the container the connector was initialised with, None if there is no container
+        """
+        if self._container_client is None and self.storage_account and self.container:
+            with self._connect_lock:
+                if self._container_client is None:
+                    self._container_client = self._verified_container_client(
+                        self.blob_service_client, self.storage_account, self.container
                     )
+        return self._container_client
+
+    def close(self):
+        """
+        Closes the connections held by the connector's clients and transport. Clients are created again if the
+        connector is used after it is closed.
+        """
+        with self._connect_lock:
+            self.client_pool.close()
+            if self._blob_service_client is not None:
+                self._blob_service_client.close()
+            if self._transport is not None:
+                close_transport(self._transport)
+            self._blob_service_client = None
+            self._container_client = None
+            self._transport = None
 
     @arguments_decorator()
     def get_blob_storage_url(
@@ -113,8 +709,7 @@ class Connector:
 
         :return bool: True if path is of an accepted azure path format
         """
-        patterns = [r"https://.*\.blob.core.windows.net", r"azure://"]
-        return any([bool(re.match(p, path)) for p in patterns])
+        return is_azure_path(path)
 
     @arguments_decorator()
     def get_blob_service_client(
@@ -125,7 +720,8 @@ class Connector:
         file_path: str = None,
     ) -> BlobServiceClient:
         """
-        Returns a blob service client for the specified storage account. If no parameters are passed the class values are used
+        Returns a blob service client for the specified storage account. If no parameters are passed the class values are used.
+        Clients for other storage accounts are kept in the connector's client pool, so repeated calls reuse their connections.
 
         :param path: str: optional An azure path, the storage account will be used to create a client. Defaults to None.
         :param storage_account: str: optional The name of the storage account to create a client for. Defaults to None.
@@ -140,8 +736,9 @@ class Connector:
             blob_storage_url = self.get_blob_storage_url(
                 storage_account=storage_account
             )
-            return BlobServiceClient(
-                credential=self.credential, account_url=blob_storage_url
+            return self.client_pool.get(
+                blob_storage_url,
+                lambda: self._create_blob_service_client(storage_account),
             )
 
     @arguments_decorator()
@@ -160,7 +757,8 @@ class Connector:
         :param container: str: optional The name of the container to create a client for. Defaults to None.
         :param file_path: str: optional The file path will ultimately be ignored. Defaults to None.
 
-        :exception ValueError: Raised if the container does not exist in the storage account
+        :exception ValueError: Raised if the container does not exist in the storage account. Containers that exist are
+            cached for container_cache_ttl seconds, see Connector.container_cache to invalidate them.
 
         :return ContainerClient: An Azure client for the container
         """
@@ -168,13 +766,22 @@ class Connector:
             return self.container_client
         else:
             client = self.get_blob_service_client(storage_account=storage_account)
-            container_names = [container.name for container in client.list_containers()]
-            if container in container_names:
-                return client.get_container_client(container=container)
-            else:
+            return self._verified_container_client(client, storage_account, container)
+
+    def _verified_container_client(
+        self, client: BlobServiceClient, storage_account: str, container: str
+    ) -> ContainerClient:
+        """
+        Returns a container client, checking the container exists unless it is already in the container cache
+        """
+        container_client = client.get_container_client(container=container)
+        if not self.container_cache.is_verified(storage_account, container):
+            if not container_client.exists():
                 raise ValueError(
                     f"The container: {container} is not in the storage account: {storage_account}"
                 )
+            self.container_cache.add(storage_account, container)
+        return container_client
 
     @arguments_decorator()
     def list_blobs(
@@ -183,26 +790,248 @@ class Connector:
         storage_account: str = None,
         container: str = None,
         file_path: str = None,
-    ) -> list:
+        max_age: float = None,
+        with_properties: bool = False,
+        columnar: str = None,
+    ):
         """
-        Returns a list of blobs, with paths that match the path passed
+        Returns a list of blobs, with paths that match the path passed. The names have the file path removed from
+        their start.
 
         :param path: str: optional An azure path to search for blobs. Defaults to None.
         :param storage_account: str: optional storage account name. Defaults to None.
         :param container: str: optional container name. Defaults to None.
         :param file_path: str: optional the prefix file path. Defaults to None.
+        :param max_age: float: optional With a listing_index, the age in seconds of an indexed listing that is used
+            rather than listing azure. Defaults to the index's max_age.
+        :param with_properties: bool: optional If True a BlobRecord with the name, size, etag, last modified time,
+            content md5 and tier of each blob is returned rather than its name. Defaults to False.
+        :param columnar: str: optional Returns the same properties as columns, "numpy" gives a dict of numpy arrays
+            and "arrow" a pyarrow Table. Requires numpy or pyarrow. Defaults to None.
+
+        :exception ValueError: Raised if columnar is not "numpy" or "arrow"
 
         :return list: Blobs in the path passed
         """
+        if columnar is not None and columnar not in LISTING_FORMATS:
+            raise ValueError(f"columnar must be one of {LISTING_FORMATS}, got: {columnar}")
         container_client = self.get_container_client(
             storage_account=storage_account, container=container
         )
-        if file_path:
-            blob_iter = container_client.list_blobs(name_starts_with=file_path)
-            return [blob.name.replace(file_path, "") for blob in blob_iter]
+        prefix = file_path or ""
+
+        if self.listing_index is not None:
+            self.listing_index.ensure(container_client, storage_account, container, prefix, max_age=max_age)
+            if not (with_properties or columnar):
+                return [name[len(prefix):] for name in self.listing_index.list_blobs(storage_account, container, prefix)]
+            rows = (
+                (
+                    blob["name"][len(prefix):],
+                    blob["size"],
+                    blob["etag"],
+                    None
+                    if blob["last_modified"] is None
+                    else datetime.datetime.fromtimestamp(blob["last_modified"], datetime.timezone.utc),
+                    blob["content_md5"],
+                    blob["tier"],
+                )
+                for blob in self.listing_index.blobs(storage_account, container, prefix)
+            )
         else:
-            blob_iter = container_client.list_blobs()
-            return [blob.name for blob in blob_iter]
+            blob_iter = container_client.list_blobs(name_starts_with=prefix or None)
+            if not (with_properties or columnar):
+                return [blob.name[len(prefix):] for blob in blob_iter]
+            rows = (
+                (
+                    blob.name[len(prefix):],
+                    blob.size,
+                    blob.etag,
+                    blob.last_modified,
+                    blob_content_md5(blob),
+                    blob_tier(blob),
+                )
+                for blob in blob_iter
+            )
+
+        if columnar:
+            return blob_columns(rows, columnar)
+        return [BlobRecord(*row) for row in rows]
+
+    @arguments_decorator()
+    def iter_blobs(
+        self,
+        path: str = None,
+        storage_account: str = None,
+        container: str = None,
+        file_path: str = None,
+        results_per_page: int = LISTING_PAGE_SIZE,
+        continuation_token: str = None,
+    ) -> BlobIterator:
+        """
+        Returns an iterator over the blobs that match the path passed, like list_blobs but fetched lazily one page at
+        a time. The iterator's continuation_token can be passed back to resume a scan that stopped part way.
+
+        :param path: str: optional An azure path to search for blobs. Defaults to None.
+        :param storage_account: str: optional storage account name. Defaults to None.
+        :param container: str: optional container name. Defaults to None.
+        :param file_path: str: optional the prefix file path. Defaults to None.
+        :param results_per_page: int: optional The number of blobs fetched per request, at most 5000. Defaults to 5000.
+        :param continuation_token: str: optional The continuation_token of an earlier iterator to resume from. Defaults to None.
+
+        :return BlobIterator: An iterator of the blob names with file_path removed
+        """
+        container_client = self.get_container_client(
+            storage_account=storage_account, container=container
+        )
+        return BlobIterator(
+            container_client,
+            prefix=file_path,
+            results_per_page=results_per_page,
+            continuation_token=continuation_token,
+        )
+
+    def _list_level(self, container_client: ContainerClient, prefix: str, delimiter: str = "/"):
+        """
+        Lists one virtual directory level of a container with a single delimited listing
+
+        :return tuple: The names of the sub-directories, without the delimiter, and the names of the blobs, relative to prefix
+        """
+        dirs, files = [], []
+        for item in container_client.walk_blobs(name_starts_with=prefix or None, delimiter=delimiter):
+            if isinstance(item, BlobPrefix):
+                dirs.append(item.name[len(prefix):-len(delimiter)])
+            else:
+                files.append(item.name[len(prefix):])
+        return dirs, files
+
+    @arguments_decorator()
+    def list_dirs(
+        self,
+        path: str = None,
+        storage_account: str = None,
+        container: str = None,
+        file_path: str = None,
+        delimiter: str = "/",
+    ) -> list:
+        """
+        Returns the virtual directories directly under a folder, found with one delimited listing rather than by
+        listing every blob under it
+
+        :param path: str: optional An azure path to the folder. Defaults to None.
+        :param storage_account: str: optional storage account name. Defaults to None.
+        :param container: str: optional container name. Defaults to None.
+        :param file_path: str: optional The path to the folder, the container root if None. Defaults to None.
+        :param delimiter: str: optional The character that separates directories in blob names. Defaults to "/".
+
+        :return list: The names of the directories, relative to the folder and without a trailing delimiter
+        """
+        container_client = self.get_container_client(
+            storage_account=storage_account, container=container
+        )
+        prefix = file_path + delimiter if file_path and not file_path.endswith(delimiter) else file_path or ""
+        return self._list_level(container_client, prefix, delimiter)[0]
+
+    @arguments_decorator()
+    def walk(
+        self,
+        path: str = None,
+        storage_account: str = None,
+        container: str = None,
+        file_path: str = None,
+        max_depth: int = None,
+        delimiter: str = "/",
+    ):
+        """
+        Walks the virtual directory tree under a folder like os.walk, listing one directory level per request.
+        Like os.walk, removing names from the yielded dirs list stops them being walked.
+
+        :param path: str: optional An azure path to the folder. Defaults to None.
+        :param storage_account: str: optional storage account name. Defaults to None.
+        :param container: str: optional container name. Defaults to None.
+        :param file_path: str: optional The path to the folder, the container root if None. Defaults to None.
+        :param max_depth: int: optional The number of levels below the folder to walk, 0 lists only the folder. Defaults to None.
+        :param delimiter: str: optional The character that separates directories in blob names. Defaults to "/".
+
+        :return iterator: Tuples of a directory's path relative to the folder, the names of its sub-directories and
+            the names of its blobs
+        """
+        container_client = self.get_container_client(
+            storage_account=storage_account, container=container
+        )
+        root = file_path + delimiter if file_path and not file_path.endswith(delimiter) else file_path or ""
+
+        def walk_level(relative_path, depth):
+            dirs, files = self._list_level(
+                container_client, root + relative_path + delimiter if relative_path else root, delimiter
+            )
+            yield relative_path, dirs, files
+            if max_depth is None or depth < max_depth:
+                for name in dirs:
+                    yield from walk_level(relative_path + delimiter + name if relative_path else name, depth + 1)
+
+        return walk_level("", 0)
+
+    @arguments_decorator()
+    def glob(
+        self,
+        path: str = None,
+        storage_account: str = None,
+        container: str = None,
+        file_path: str = None,
+        max_workers: int = 8,
+    ) -> list:
+        """
+        Returns the blobs matching a glob pattern such as azure://container/data/2024-*/part-*.parquet. Wildcards
+        match within one directory level, except a ** directory which matches any number of levels. Each
+        directory level is listed with a delimiter and only from the literal start of its pattern, so only the
+        directories the pattern can match are listed.
+
+        :param path: str: optional An azure path pattern. Defaults to None.
+        :param storage_account: str: optional storage account name. Defaults to None.
+        :param container: str: optional container name. Defaults to None.
+        :param file_path: str: optional The pattern, from the container. Defaults to None.
+        :param max_workers: int: optional The number of directories listed at once. Defaults to 8.
+
+        :return list: The sorted names of the matching blobs, from the container
+        """
+        container_client = self.get_container_client(
+            storage_account=storage_account, container=container
+        )
+        segments = (file_path or "*").split("/")
+
+        self._check_pool(max_workers)
+
+        def expand(item):
+            directory, index = item
+            segment = segments[index]
+            if segment == "**":
+                # Everything below is listed and matched against the rest of the pattern
+                listing = container_client.list_blobs(name_starts_with=directory or None)
+                relative_names = ((blob.name, blob.name[len(directory):].split("/")) for blob in listing)
+                return [], [name for name, parts in relative_names if match_segments(parts, segments[index:])]
+            literal = glob_prefix(segment)
+            dirs, files = self._list_level(container_client, directory + literal)
+            if index == len(segments) - 1:
+                return [], [directory + literal + name for name in files if fnmatch.fnmatchcase(literal + name, segment)]
+            matched = [name for name in dirs if fnmatch.fnmatchcase(literal + name, segment)]
+            return [(f"{directory}{literal}{name}/", index + 1) for name in matched], []
+
+        level = [("", 0)]
+        matches = []
+        while level:
+            listed = []
+            next_level = []
+            for directory, index in level:
+                if index < len(segments) - 1 and glob_prefix(segments[index]) == segments[index]:
+                    # Literal directories are followed without listing them
+                    next_level.append((f"{directory}{segments[index]}/", index + 1))
+                else:
+                    listed.append((directory, index))
+            for dirs, files in ordered_map(expand, listed, max_workers=max_workers):
+                next_level.extend(dirs)
+                matches.extend(files)
+            level = next_level
+        return sorted(matches)
 
     @multi_arguments_decorator(local_support=True)
     def download_folder(
@@ -215,9 +1044,12 @@ class Connector:
         dest_storage_account: str = None,
         dest_container: str = None,
         dest_file_path: str = None,
-    ):
+        max_workers: int = 8,
+        max_concurrency: int = 1,
+    ) -> list:
         """
-        Copy a folder from azure to a local path
+        Copy a folder from azure to a local path. Blobs are downloaded by a pool of max_workers threads, progress is
+        logged in listing order and the first failed download stops the rest.
 
         :param source_path: str: optional An Azure path to the folder to download. Defaults to None.
         :param source_storage_account: str: optional The storage account name. Defaults to None.
@@ -227,8 +1059,14 @@ class Connector:
         :param dest_storage_account: str: optional Ignored. Defaults to None.
         :param dest_container: str: optional Ignored. Defaults to None.
         :param dest_file_path: str: optional Ignored. Defaults to None.
+        :param max_workers: int: optional The number of blobs downloaded at once. Defaults to 8.
+        :param max_concurrency: int: optional The number of connections used to download each blob below the
+            connector's large_blob_threshold, larger blobs are downloaded with download_concurrency. Defaults to 1.
 
-        :exception ValueError: Raised when destination path is an azure path
+        :exception ValueError: Raised when destination path is an azure path, or when two blobs have the same base name.
+            Blobs are saved by their base name, so the error is raised before the second one is downloaded.
+
+        :return list: A dict per downloaded blob, in listing order, with the blob name, local_path and size in bytes
         """
         container_client = self.get_container_client(
             storage_account=source_storage_account, container=source_container
@@ -240,14 +1078,137 @@ class Connector:
             )
         os.makedirs(dest_path, exist_ok=True)
 
-        for blob in container_client.list_blobs(source_file_path):
-            file_name = os.path.basename(blob.name)
-            local_path = os.path.join(dest_path, file_name)
+        self._check_pool(max_workers, max(max_concurrency, self.download_concurrency))
+
+        def download(item):
+            blob, local_path = item
+            self._download_blob(container_client, blob, local_path, max_concurrency)
+            return {"blob": blob.name, "local_path": local_path, "size": blob.size}
+
+        results = []
+        for result in ordered_map(
+            download,
+            flat_download_paths(container_client.list_blobs(source_file_path), dest_path),
+            max_workers=max_workers,
+        ):
+            self.logger.info(f"Downloaded {result['blob']} to {result['local_path']}")
+            results.append(result)
+        self.logger.info("Completed Download")
+        return results
+
+    def _download_blob(self, container_client: ContainerClient, blob, local_path: str, max_concurrency: int = 1):
+        """
+        Downloads a listed blob to a local file, as parallel byte ranges if it is a large blob
+        """
+        if self.is_large_blob(blob.size):
+            download_blob_ranges(
+                container_client.get_blob_client(blob.name),
+                local_path,
+                size=blob.size,
+                etag=blob.etag,
+                chunk_size=self.download_chunk_size,
+                max_concurrency=self.download_concurrency,
+            )
+        else:
             with open(local_path, "wb") as f:
-                self.logger.info(f"Downloading {blob.name} to {local_path}")
-                blob_data = container_client.download_blob(blob.name)
+                blob_data = container_client.download_blob(blob.name, max_concurrency=max_concurrency)
                 blob_data.readinto(f)
-            self.logger.info("Completed Download")
+
+    @multi_arguments_decorator(local_support=True)
+    def sync_down(
+        self,
+        source_path: str = None,
+        source_storage_account: str = None,
+        source_container: str = None,
+        source_file_path: str = None,
+        dest_path: str = None,
+        dest_storage_account: str = None,
+        dest_container: str = None,
+        dest_file_path: str = None,
+        delete: bool = False,
+        max_workers: int = 8,
+        max_concurrency: int = 1,
+    ) -> dict:
+        """
+        Incrementally copy a folder from azure to a local path, keeping the folder structure. The size, etag,
+        last modified time and content md5 of every downloaded blob are kept in a manifest file in the local folder,
+        and only blobs that are new, have changed since they were downloaded, or whose local copy was changed or
+        removed are downloaded again. Blobs with . or .. segments in their names, such as a/../../x, are skipped
+        so nothing is written outside dest_path.
+
+        :param source_path: str: optional An Azure path to the folder to sync. Defaults to None.
+        :param source_storage_account: str: optional The storage account name. Defaults to None.
+        :param source_container: str: optional The container name. Defaults to None.
+        :param source_file_path: str: optional The path to the folder to sync. Defaults to None.
+        :param dest_path: str: optional The local path to sync the folder to. Defaults to None.
+        :param dest_storage_account: str: optional Ignored. Defaults to None.
+        :param dest_container: str: optional Ignored. Defaults to None.
+        :param dest_file_path: str: optional Ignored. Defaults to None.
+        :param delete: bool: optional If True local files that are not in the azure folder are deleted. Defaults to False.
+        :param max_workers: int: optional The number of blobs downloaded at once. Defaults to 8.
+        :param max_concurrency: int: optional The number of connections used to download each blob below the
+            connector's large_blob_threshold. Defaults to 1.
+
+        :exception ValueError: Raised when destination path is an azure path
+
+        :return dict: Lists of the relative paths that were "downloaded", "unchanged" and "deleted"
+        """
+        container_client = self.get_container_client(
+            storage_account=source_storage_account, container=source_container
+        )
+
+        if self.is_azure_path(dest_path):
+            raise ValueError(
+                f"Expected destination to be local path got azure path: {dest_path}"
+            )
+        os.makedirs(dest_path, exist_ok=True)
+
+        prefix = join_blob_path(source_file_path, "")
+        manifest = SyncManifest.load(dest_path)
+        summary = {"downloaded": [], "unchanged": [], "deleted": []}
+        remote = set()
+
+        self._check_pool(max_workers, max(max_concurrency, self.download_concurrency))
+
+        def changed_blobs():
+            for blob in container_client.list_blobs(name_starts_with=prefix or None):
+                relative_path = blob.name[len(prefix):]
+                if not relative_path or relative_path.endswith("/"):
+                    # Directory marker blobs have nothing to download
+                    continue
+                local_path = local_blob_path(dest_path, relative_path)
+                if local_path is None:
+                    self.logger.warning(f"Skipping {blob.name}, its name places it outside {dest_path}")
+                    continue
+                remote.add(relative_path)
+                if manifest.is_unchanged(relative_path, blob):
+                    summary["unchanged"].append(relative_path)
+                else:
+                    yield relative_path, local_path, blob
+
+        def download(item):
+            relative_path, local_path, blob = item
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            self._download_blob(container_client, blob, local_path, max_concurrency)
+            return relative_path, blob
+
+        try:
+            for relative_path, blob in ordered_map(download, changed_blobs(), max_workers=max_workers):
+                self.logger.info(f"Downloaded {blob.name} to {dest_path}")
+                manifest.add(relative_path, blob)
+                summary["downloaded"].append(relative_path)
+
+            if delete:
+                for local_path, relative_path in list(walk_local_files(dest_path)):
+                    if relative_path not in remote and relative_path != SyncManifest.file_name:
+                        self.logger.info(f"Deleting {local_path}, it is not in {source_file_path}")
+                        os.remove(local_path)
+                        manifest.remove(relative_path)
+                        summary["deleted"].append(relative_path)
+        finally:
+            # Saving after a failure keeps the blobs that did download from being downloaded again
+            manifest.save()
+        return summary
 
     @arguments_decorator()
     def blob_exists(
@@ -272,6 +1233,199 @@ class Connector:
         blob_client = client.get_blob_client(container, file_path)
         return blob_client.exists()
 
+    def _parse_blob_paths(self, paths: list) -> dict:
+        """
+        Parses many azure paths, returning a (storage_account, container, file_path) tuple for each path
+        """
+        blob_keys = {}
+        for path in paths:
+            parsed = self.parse_azure_path(path)
+            storage_account = parsed["storage_account"] or self.storage_account
+            if storage_account is None:
+                raise ValueError(
+                    "To use a path of the form azure://container/path you must initialise the connector with the storage account"
+                )
+            blob_keys[path] = (storage_account, parsed["container"], parsed["file_path"])
+        return blob_keys
+
+    def blobs_exist(self, paths: list, max_workers: int = None, min_listing_group: int = 16) -> dict:
+        """
+        Checks if many blobs exist. Paths are grouped by container and directory: directories with at least
+        min_listing_group paths are answered by listing the names they share a prefix with, the rest with HEAD
+        requests, all on a pool of max_workers threads. A listing stops once it passes the last name it is looking
+        for, and if it takes more pages than the HEAD requests it replaces would take rounds, the names it has not
+        reached are checked with HEAD requests instead. Blobs in a container that does not exist are reported as not
+        existing, however they are checked.
+
+        :param paths: list: Azure paths of the format azure://<container>/path or https://<storage-account>.blob.core.windows.net/<container>/<path>
+        :param max_workers: int: optional The number of requests made at once. Defaults to 16, or the connector's
+            pool_size if it is smaller.
+        :param min_listing_group: int: optional The number of paths in a directory from which it is listed. Defaults to 16.
+
+        :exception ValueError: Raised if a path has no storage account and the connector was not initialised with one
+
+        :return dict: True or False for each path passed
+        """
+        blob_keys = self._parse_blob_paths(paths)
+        max_workers = min(16, self.pool_size) if max_workers is None else max_workers
+        self._check_pool(max_workers)
+        groups = {}
+        for storage_account, container, name in blob_keys.values():
+            directory = name.rpartition("/")[0]
+            groups.setdefault((storage_account, container, directory), set()).add(name)
+
+        def head(item):
+            storage_account, container, name = item
+            client = self.get_blob_service_client(storage_account=storage_account)
+            return {item: client.get_blob_client(container, name).exists()}
+
+        def list_names(item):
+            storage_account, container, names = item
+            # A listing is a sequential page per request, HEAD requests take one round per max_workers names
+            max_pages = -(-len(names) // max_workers)
+            wanted = sorted(names)
+            # Like a HEAD request, the listing finds no blobs rather than raising if the container does not exist
+            client = self.get_blob_service_client(storage_account=storage_account)
+            pages = (
+                client.get_container_client(container=container)
+                .list_blobs(name_starts_with=os.path.commonprefix(wanted), results_per_page=LISTING_PAGE_SIZE)
+                .by_page()
+            )
+            found = set()
+            last_name = None
+            try:
+                for page_number, page in enumerate(pages, start=1):
+                    for blob in page:
+                        found.add(blob.name)
+                        last_name = blob.name
+                    if (last_name is not None and last_name >= wanted[-1]) or page_number >= max_pages:
+                        break
+                else:
+                    last_name = wanted[-1]
+            except ResourceNotFoundError:
+                self.logger.warning(f"The container: {container} is not in the storage account: {storage_account}")
+                return {(storage_account, container, name): False for name in wanted}, []
+            results = {
+                (storage_account, container, name): name in found for name in wanted if last_name and name <= last_name
+            }
+            # Names the listing did not reach before its page budget ran out
+            unresolved = [(storage_account, container, name) for name in wanted if not last_name or name > last_name]
+            return results, unresolved
+
+        listings = []
+        heads = []
+        for (storage_account, container, directory), names in groups.items():
+            if len(names) >= min_listing_group:
+                listings.append((storage_account, container, names))
+            else:
+                heads.extend((storage_account, container, name) for name in names)
+
+        exists = {}
+        for results, unresolved in ordered_map(list_names, listings, max_workers=max_workers):
+            exists.update(results)
+            heads.extend(unresolved)
+        for results in ordered_map(head, heads, max_workers=max_workers):
+            exists.update(results)
+        return {path: exists[key] for path, key in blob_keys.items()}
+
+    def _delete_batches(self, container_client: ContainerClient, names, max_workers: int, batch_size: int) -> dict:
+        """
+        Deletes blobs of one container in batch requests of batch_size, sent by max_workers threads
+
+        :return dict: The number of blobs "deleted" and a dict of the names that "failed" with the reason
+        """
+        self._check_pool(max_workers)
+
+        def delete_batch(batch):
+            responses = container_client.delete_blobs(*batch, delete_snapshots="include", raise_on_any_failure=False)
+            # Blobs that are already gone are not failures
+            return batch, {
+                name: f"{response.status_code} {response.reason}"
+                for name, response in zip(batch, responses)
+                if response.status_code not in (202, 404)
+            }
+
+        summary = {"deleted": 0, "failed": {}}
+        for batch, failed in ordered_map(delete_batch, chunked(names, batch_size), max_workers=max_workers):
+            summary["deleted"] += len(batch) - len(failed)
+            summary["failed"].update(failed)
+            for name, reason in failed.items():
+                self.logger.error(f"Failed to delete {name}: {reason}")
+        return summary
+
+    @arguments_decorator()
+    def delete_folder(
+        self,
+        path: str = None,
+        storage_account: str = None,
+        container: str = None,
+        file_path: str = None,
+        max_workers: int = 8,
+        batch_size: int = MAX_BATCH_SIZE,
+        allow_container_root: bool = False,
+    ) -> dict:
+        """
+        Deletes every blob in a folder, including its sub-directories and the blobs' snapshots. Blobs are deleted
+        while the folder is listed, in blob batch requests of batch_size sent by max_workers threads.
+
+        :param path: str: optional Azure path to the folder. Defaults to None.
+        :param storage_account: str: optional Storage account. Defaults to None.
+        :param container: str: optional Container. Defaults to None.
+        :param file_path: str: optional Path to the folder. Defaults to None.
+        :param max_workers: int: optional The number of batches sent at once. Defaults to 8.
+        :param batch_size: int: optional The number of deletes in each batch, at most 256. Defaults to 256.
+        :param allow_container_root: bool: optional If True an empty file_path deletes every blob in the container.
+            Defaults to False.
+
+        :exception ValueError: Raised if file_path is empty and allow_container_root is False, or batch_size is over 256
+
+        :return dict: The number of blobs "deleted" and a dict of the blobs that "failed" to delete with the reason
+        """
+        check_batch_size(batch_size)
+        if not file_path and not allow_container_root:
+            raise ValueError(
+                f"No folder passed, this would delete every blob in {container}. Pass allow_container_root=True to do so"
+            )
+        container_client = self.get_container_client(
+            storage_account=storage_account, container=container
+        )
+        prefix = join_blob_path(file_path, "")
+        names = (
+            blob.name
+            for blob in container_client.list_blobs(name_starts_with=prefix or None, results_per_page=LISTING_PAGE_SIZE)
+        )
+        summary = self._delete_batches(container_client, names, max_workers, batch_size)
+        self.logger.info(f"Deleted {summary['deleted']} blobs from {container}/{prefix}")
+        return summary
+
+    def delete_many(self, paths: list, max_workers: int = 8, batch_size: int = MAX_BATCH_SIZE) -> dict:
+        """
+        Deletes many blobs and their snapshots, in blob batch requests of batch_size per container sent by
+        max_workers threads. Blobs that do not exist are not failures.
+
+        :param paths: list: Azure paths of the format azure://<container>/path or https://<storage-account>.blob.core.windows.net/<container>/<path>
+        :param max_workers: int: optional The number of batches sent at once for each container. Defaults to 8.
+        :param batch_size: int: optional The number of deletes in each batch, at most 256. Defaults to 256.
+
+        :exception ValueError: Raised if a path has no storage account and the connector was not initialised with one,
+            or batch_size is over 256
+
+        :return dict: The number of blobs "deleted" and a dict of the paths that "failed" to delete with the reason
+        """
+        check_batch_size(batch_size)
+        blob_keys = self._parse_blob_paths(paths)
+        containers = {}
+        for path, (storage_account, container, name) in blob_keys.items():
+            containers.setdefault((storage_account, container), {})[name] = path
+
+        summary = {"deleted": 0, "failed": {}}
+        for (storage_account, container), names in containers.items():
+            container_client = self.get_container_client(storage_account=storage_account, container=container)
+            result = self._delete_batches(container_client, list(names), max_workers, batch_size)
+            summary["deleted"] += result["deleted"]
+            summary["failed"].update({names[name]: reason for name, reason in result["failed"].items()})
+        return summary
+
     @multi_arguments_decorator(local_support=True)
     def upload_folder(
         self,
@@ -283,9 +1437,14 @@ class Connector:
         dest_storage_account: str = None,
         dest_container: str = None,
         dest_file_path: str = None,
-    ):
+        max_workers: int = 8,
+        max_concurrency: int = 1,
+        if_exists: str = "error",
+    ) -> list:
         """
-        Upload a directory to an azure location. Subdirectories are not currently supported
+        Upload a directory, including its sub-directories, to an azure location. Each file's path relative to the
+        directory is kept under the destination path. Files are uploaded by a pool of max_workers threads, progress
+        is logged in a stable order and the first failed upload stops the rest.
 
         :param source_path: str: optional Local path to folder to upload. Defaults to None.
         :param source_storage_account: str: optional Ignored. Defaults to None.
@@ -295,29 +1454,485 @@ class Connector:
         :param dest_storage_account: str: optional Storage account. Defaults to None.
         :param dest_container: str: optional Container name. Defaults to None.
         :param dest_file_path: str: optional Path to folder. Defaults to None.
+        :param max_workers: int: optional The number of files uploaded at once. Defaults to 8.
+        :param max_concurrency: int: optional The number of connections used to upload each file below the
+            connector's large_blob_threshold, larger files are uploaded with upload_concurrency. Defaults to 1.
+        :param if_exists: str: optional What to do when a blob already exists: "error" raises, "overwrite" replaces
+            it and "skip" leaves it, checked against one listing of the destination. Defaults to "error".
 
         :exception ValueError: Raised if source is an Azure path
+        :exception ResourceExistsError: Raised if a blob exists and if_exists is "error"
+
+        :return list: A dict per file with the local file, blob name and whether it was uploaded
         """
         if self.is_azure_path(source_path):
             raise ValueError(
                 f"Expected destination to be local path got azure path: {source_path}"
             )
+        if if_exists not in UPLOAD_IF_EXISTS:
+            raise ValueError(f"if_exists must be one of {UPLOAD_IF_EXISTS}, got: {if_exists}")
 
         container_client = self.get_container_client(
             storage_account=dest_storage_account, container=dest_container
         )
 
-        for root, dirs, files in os.walk(source_path):
+        existing = set()
+        if if_exists == "skip":
+            existing = {blob.name for blob in container_client.list_blobs(name_starts_with=dest_file_path or None)}
+
+        self._check_pool(max_workers, max(max_concurrency, self.upload_concurrency))
+
+        def upload(item):
+            file_path, blob_path = item
+            if blob_path not in existing:
+                self._upload_file(
+                    container_client,
+                    file_path,
+                    blob_path,
+                    overwrite=if_exists == "overwrite",
+                    max_concurrency=max_concurrency,
+                )
+            return {"file": file_path, "blob": blob_path, "uploaded": blob_path not in existing}
+
+        uploads = (
+            (file_path, join_blob_path(dest_file_path, relative_path))
+            for file_path, relative_path in walk_local_files(source_path)
+        )
+        results = []
+        for result in ordered_map(upload, uploads, max_workers=max_workers):
+            if result["uploaded"]:
+                self.logger.info(f"Uploaded {result['file']} to {result['blob']}")
+            else:
+                self.logger.info(f"Skipped {result['file']}, {result['blob']} already exists")
+            results.append(result)
+        return results
+
+    def _upload_file(
+        self,
+        container_client: ContainerClient,
+        file_path: str,
+        blob_path: str,
+        overwrite: bool = False,
+        max_concurrency: int = 1,
+        **kwargs,
+    ):
+        """
+        Uploads a local file to a blob, as blocks staged in parallel if it is a large file. kwargs such as
+        content_settings and metadata are set on the blob.
+        """
+        if self.is_large_blob(os.path.getsize(file_path)):
+            upload_file_blocks(
+                container_client.get_blob_client(blob_path),
+                file_path,
+                block_size=self.upload_block_size,
+                max_concurrency=self.upload_concurrency,
+                overwrite=overwrite,
+                **kwargs,
+            )
+        else:
+            with open(file_path, "rb") as data:
+                container_client.upload_blob(
+                    name=blob_path,
+                    data=data,
+                    overwrite=overwrite,
+                    max_concurrency=max_concurrency,
+                    **kwargs,
+                )
+
+    @multi_arguments_decorator(local_support=True)
+    def sync_up(
+        self,
+        source_path: str = None,
+        source_storage_account: str = None,
+        source_container: str = None,
+        source_file_path: str = None,
+        dest_path: str = None,
+        dest_storage_account: str = None,
+        dest_container: str = None,
+        dest_file_path: str = None,
+        checksum: bool = False,
+        max_workers: int = 8,
+        max_concurrency: int = 1,
+    ) -> dict:
+        """
+        Incrementally upload a directory, including its sub-directories, to an azure location. The destination is
+        listed once, with metadata, and each local file is compared against the listing in memory: files that are
+        new, have a different size or a different modification time are uploaded. The modification time of every
+        uploaded file is kept in the blob's metadata, blobs without it are compared by their last modified time.
+
+        :param source_path: str: optional Local path to folder to sync. Defaults to None.
+        :param source_storage_account: str: optional Ignored. Defaults to None.
+        :param source_container: str: optional Ignored. Defaults to None.
+        :param source_file_path: str: optional Ignored. Defaults to None.
+        :param dest_path: str: optional Azure path to sync to. Defaults to None.
+        :param dest_storage_account: str: optional Storage account. Defaults to None.
+        :param dest_container: str: optional Container name. Defaults to None.
+        :param dest_file_path: str: optional Path to folder. Defaults to None.
+        :param checksum: bool: optional If True files of the same size are compared by their MD5 rather than their
+            modification time, and the MD5 of those that changed is set on the blob. Files of another size are not
+            hashed, azure sets the MD5 of the ones uploaded in a single request. Defaults to False.
+        :param max_workers: int: optional The number of files compared and uploaded at once. Defaults to 8.
+        :param max_concurrency: int: optional The number of connections used to upload each file below the
+            connector's large_blob_threshold. Defaults to 1.
+
+        :exception ValueError: Raised if source is an Azure path
+
+        :return dict: Lists of the relative paths that were "uploaded" and "unchanged"
+        """
+        if self.is_azure_path(source_path):
+            raise ValueError(
+                f"Expected destination to be local path got azure path: {source_path}"
+            )
+
+        container_client = self.get_container_client(
+            storage_account=dest_storage_account, container=dest_container
+        )
+
+        prefix = join_blob_path(dest_file_path, "")
+        remote = {
+            blob.name[len(prefix):]: blob
+            for blob in container_client.list_blobs(
+                name_starts_with=prefix or None, include=["metadata"], results_per_page=LISTING_PAGE_SIZE
+            )
+        }
+
+        self._check_pool(max_workers, max(max_concurrency, self.upload_concurrency))
+
+        def sync(item):
+            file_path, relative_path = item
+            stat = os.stat(file_path)
+            blob = remote.get(relative_path)
+            content_md5 = None
+            if blob is not None and blob.size == stat.st_size:
+                if checksum:
+                    # Only files of the same size are hashed, the others are uploaded whatever their content
+                    content_md5 = file_md5(file_path)
+                    if blob_content_md5(blob) == base64.b64encode(content_md5).decode():
+                        return relative_path, False
+                elif (blob.metadata or {}).get(SYNC_MTIME_METADATA) is not None:
+                    if blob.metadata[SYNC_MTIME_METADATA] == str(stat.st_mtime_ns):
+                        return relative_path, False
+                elif blob.last_modified is not None and stat.st_mtime <= blob.last_modified.timestamp():
+                    return relative_path, False
+
+            self._upload_file(
+                container_client,
+                file_path,
+                join_blob_path(dest_file_path, relative_path),
+                overwrite=True,
+                max_concurrency=max_concurrency,
+                metadata={SYNC_MTIME_METADATA: str(stat.st_mtime_ns)},
+                content_settings=ContentSettings(content_md5=content_md5) if content_md5 is not None else None,
+            )
+            return relative_path, True
+
+        summary = {"uploaded": [], "unchanged": []}
+        for relative_path, uploaded in ordered_map(sync, walk_local_files(source_path), max_workers=max_workers):
+            if uploaded:
+                self.logger.info(f"Uploaded {relative_path} to {join_blob_path(dest_file_path, relative_path)}")
+                summary["uploaded"].append(relative_path)
+            else:
+                summary["unchanged"].append(relative_path)
+        return summary
+
+    @multi_arguments_decorator()
+    def copy_folder(
+        self,
+        source_path: str = None,
+        source_storage_account: str = None,
+        source_container: str = None,
+        source_file_path: str = None,
+        dest_path: str = None,
+        dest_storage_account: str = None,
+        dest_container: str = None,
+        dest_file_path: str = None,
+        max_workers: int = 8,
+        if_exists: str = "error",
+        wait: bool = True,
+        poll_interval: float = 5,
+        timeout: float = None,
+        sas_expiry: int = 24 * 3600,
+        use_sas: bool = None,
+    ) -> list:
+        """
+        Copy a folder, including its sub-directories, from one azure location to another with server side copies, so
+        the data is copied by azure and never downloaded. The source can be in another container or storage account.
+        Copies are started by a pool of max_workers threads and their status is then polled by listing the
+        destination, rather than with a request per blob.
+
+        Within a storage account, azure reads the source blobs with the connector's own credential. Across storage
+        accounts they are read through a user delegation SAS, which must stay valid until the copies finish. Minting
+        it needs the Storage Blob Delegator role, or another role allowed to generate user delegation keys, on the
+        source storage account.
+
+        :param source_path: str: optional Azure path to the folder to copy. Defaults to None.
+        :param source_storage_account: str: optional The source storage account. Defaults to None.
+        :param source_container: str: optional The source container. Defaults to None.
+        :param source_file_path: str: optional The path to the source folder. Defaults to None.
+        :param dest_path: str: optional Azure path to copy to. Defaults to None.
+        :param dest_storage_account: str: optional The destination storage account. Defaults to None.
+        :param dest_container: str: optional The destination container. Defaults to None.
+        :param dest_file_path: str: optional The path to the destination folder. Defaults to None.
+        :param max_workers: int: optional The number of copies started at once. Defaults to 8.
+        :param if_exists: str: optional What to do when a destination blob already exists: "error" raises, "overwrite"
+            replaces it and "skip" leaves it, checked against one listing of the destination. Defaults to "error".
+        :param wait: bool: optional If True wait for the copies to finish, otherwise return once they have started. Defaults to True.
+        :param poll_interval: float: optional Seconds between listings of the destination while waiting. Defaults to 5.
+        :param timeout: float: optional Seconds to wait for the copies, after which the pending ones are returned as
+            "pending". Defaults to waiting until they finish.
+        :param sas_expiry: int: optional Seconds the SAS used to read the source blobs is valid for. Defaults to 24 hours.
+        :param use_sas: bool: optional If True the source blobs are read through a SAS even within a storage account,
+            if False never. Defaults to using one only when the storage accounts differ.
+
+        :exception ResourceExistsError: Raised if a blob exists and if_exists is "error"
+
+        :return list: A dict per blob with the source blob, destination blob and copy status: "success", "pending",
+            "failed", "aborted" or "skipped"
+        """
+        if if_exists not in UPLOAD_IF_EXISTS:
+            raise ValueError(f"if_exists must be one of {UPLOAD_IF_EXISTS}, got: {if_exists}")
+
+        source_client = self.get_container_client(storage_account=source_storage_account, container=source_container)
+        dest_client = self.get_container_client(storage_account=dest_storage_account, container=dest_container)
+
+        if use_sas is None:
+            use_sas = source_storage_account != dest_storage_account
+        if use_sas:
+            # One delegation key signs the SAS of every source blob
+            start = datetime.datetime.utcnow() - datetime.timedelta(minutes=5)
+            expiry = start + datetime.timedelta(seconds=sas_expiry)
+            delegation_key = self.get_blob_service_client(
+                storage_account=source_storage_account
+            ).get_user_delegation_key(start, expiry)
+
+        source_prefix = join_blob_path(source_file_path, "")
+        dest_prefix = join_blob_path(dest_file_path, "")
+        existing = set()
+        if if_exists == "skip":
+            existing = {blob.name for blob in dest_client.list_blobs(name_starts_with=dest_prefix or None)}
+
+        conditions = {}
+        if if_exists == "error":
+            conditions = {"etag": "*", "match_condition": MatchConditions.IfMissing}
+
+        self._check_pool(max_workers)
+
+        def start_copy(blob):
+            dest_name = dest_prefix + blob.name[len(source_prefix):]
+            if dest_name in existing:
+                return {"source": blob.name, "blob": dest_name, "status": "skipped"}
+            source_url = source_client.get_blob_client(blob.name).url
+            if use_sas:
+                sas = generate_blob_sas(
+                    source_storage_account,
+                    source_client.container_name,
+                    blob.name,
+                    user_delegation_key=delegation_key,
+                    permission=BlobSasPermissions(read=True),
+                    start=start,
+                    expiry=expiry,
+                )
+                source_url = f"{source_url}?{sas}"
+            copy = dest_client.get_blob_client(dest_name).start_copy_from_url(source_url, **conditions)
+            return {"source": blob.name, "blob": dest_name, "status": copy["copy_status"]}
+
+        results = []
+        source_blobs = source_client.list_blobs(name_starts_with=source_prefix or None)
+        for result in ordered_map(start_copy, source_blobs, max_workers=max_workers):
+            self.logger.info(f"Copy of {result['source']} to {result['blob']}: {result['status']}")
+            results.append(result)
+
+        pending = {result["blob"]: result for result in results if result["status"] == "pending"}
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while wait and pending and (deadline is None or time.monotonic() < deadline):
+            time.sleep(poll_interval)
+            for blob in dest_client.list_blobs(name_starts_with=dest_prefix or None, include=["copy"]):
+                if blob.name in pending and blob.copy.status != "pending":
+                    result = pending.pop(blob.name)
+                    result["status"] = blob.copy.status
+                    self.logger.info(f"Copy of {result['source']} to {result['blob']}: {result['status']}")
+                    if blob.copy.status != "success":
+                        self.logger.error(f"Copy of {result['source']} failed: {blob.copy.status_description}")
+        return results
+
+    @property
+    def pool_size(self) -> int:
+        """
+        The number of connections kept open per storage account
+        """
+        return self.transport_options["pool_size"]
+
+    def _check_pool(self, max_workers: int, connections_per_worker: int = 1):
+        """
+        Logs a warning if max_workers threads, each using up to connections_per_worker connections, can need more
+        connections than the pool keeps. The extra connections still work, but are closed after each use.
+        """
+        if max_workers * connections_per_worker > self.pool_size:
             self.logger.warning(
-                "upload folder does not support sub-directories only files will be uploaded"
+                f"{max_workers} workers using up to {connections_per_worker} connections each can need more than the "
+                f"pool_size of {self.pool_size}, connections over it are closed after use. Pass a larger pool_size "
+                "to the Connector to keep them open"
             )
-            for file in files:
-                file_path = os.path.join(root, file)
-                blob_path = dest_file_path + file
 
-                self.logger.info(f"Uploading {file_path} to {blob_path}")
-                with open(file_path, "rb") as data:
-                    container_client.upload_blob(name=blob_path, data=data)
+    def is_large_blob(self, size: int) -> bool:
+        """
+        Returns True if a blob of size bytes should be downloaded as parallel byte ranges
+        """
+        return self.large_blob_threshold is not None and size >= self.large_blob_threshold
+
+    def _open_ranged(self, storage_account: str, container: str, file_path: str):
+        """
+        Reads the first FIRST_RANGE_SIZE bytes of a blob, the response also giving the blob's size, so no separate
+        properties request is made. A blob that fits in that range is returned in memory. A blob of at least the
+        large blob threshold is downloaded to a temporary file in temp_dir with parallel range requests, returning the
+        open temporary file. Blobs in between are streamed, serving the first range from what was already read.
+        """
+        client = self.get_blob_service_client(storage_account=storage_account)
+        blob_client = client.get_blob_client(container, file_path)
+        try:
+            downloader = blob_client.download_blob(offset=0, length=FIRST_RANGE_SIZE)
+        except HttpResponseError as e:
+            # Range requests fail on empty blobs
+            if e.status_code != 416:
+                raise
+            return named_buffer(b"", file_path)
+        size = content_range_size(downloader.properties.content_range)
+        if size <= FIRST_RANGE_SIZE:
+            return named_buffer(downloader.readall(), file_path)
+        if not self.is_large_blob(size):
+            return open_blob_range_reader(
+                blob_client, downloader.readall(), size=size, etag=downloader.properties.etag, name=file_path
+            )
+
+        # Keeping the blob name as a suffix lets smart_open infer the compression from the extension
+        fd, local_path = tempfile.mkstemp(suffix=f"-{os.path.basename(file_path)}", dir=self.temp_dir)
+        os.close(fd)
+        try:
+            self.logger.info(f"Downloading {file_path} to {local_path} in ranges of {self.download_chunk_size} bytes")
+            download_blob_ranges(
+                blob_client,
+                local_path,
+                size=size,
+                etag=downloader.properties.etag,
+                chunk_size=self.download_chunk_size,
+                max_concurrency=self.download_concurrency,
+            )
+        except BaseException:
+            os.unlink(local_path)
+            raise
+        return open_temporary(local_path)
+
+    def _read_small_blob(self, storage_account: str, container: str, file_path: str) -> bytes:
+        """
+        Returns the content of a blob through the memory cache, or None if the blob is over the cache's max_blob_size.
+        A miss reads at most max_blob_size + 1 bytes, so finding out a blob is too large costs one short read.
+        """
+        cache = self.memory_cache
+        client = self.get_blob_service_client(storage_account=storage_account)
+        blob_client = client.get_blob_client(container, file_path)
+        url = blob_client.url
+        if cache.is_too_large(url):
+            return None
+
+        def read(**conditions) -> tuple:
+            try:
+                downloader = blob_client.download_blob(offset=0, length=cache.max_blob_size + 1, **conditions)
+            except HttpResponseError as e:
+                # Range requests fail on empty blobs, the etag is read separately for them
+                if e.status_code != 416:
+                    raise
+                return blob_client.get_blob_properties().etag, b""
+            return downloader.properties.etag, downloader.readall()
+
+        entry = cache.get(url)
+        if entry is None:
+            cache.record("misses")
+            etag, data = read()
+            cache.put(url, etag, data)
+            return None if len(data) > cache.max_blob_size else data
+        if cache.is_fresh(entry):
+            cache.record("hits")
+            return entry.data
+
+        def revalidate():
+            try:
+                etag, data = read(etag=entry.etag, match_condition=MatchConditions.IfModified)
+            except HttpResponseError as e:
+                if e.status_code != 304:
+                    raise
+                cache.record("not_modified")
+                cache.mark_validated(url)
+                return entry.data
+            cache.record("refreshed")
+            cache.put(url, etag, data)
+            return None if len(data) > cache.max_blob_size else data
+
+        if not cache.stale_while_revalidate:
+            return revalidate()
+
+        def revalidate_in_background():
+            try:
+                revalidate()
+            except Exception as e:
+                self.logger.warning(f"Failed to revalidate the cached {file_path}: {e}")
+
+        cache.record("stale_hits")
+        cache.revalidate_in_background(url, revalidate_in_background)
+        return entry.data
+
+    def _open_cached(self, storage_account: str, container: str, file_path: str):
+        """
+        Returns the disk cache's copy of a blob, open for binary reading. The file is opened while the blob url is
+        locked, so another process can't evict or replace it first.
+        """
+        client = self.get_blob_service_client(storage_account=storage_account)
+        blob_client = client.get_blob_client(container, file_path)
+        with self.disk_cache.lock(blob_client.url):
+            return open(self._download_to_cache(blob_client, file_path), "rb")
+
+    def _download_to_cache(self, blob_client, file_path: str) -> str:
+        """
+        Returns the local path of a blob in the disk cache, hold the blob url's lock while calling this. A cached copy
+        is used if a conditional request shows the blob has not changed, or if it was checked less than the cache's
+        revalidate_after seconds ago. Otherwise the blob is downloaded into the cache.
+        """
+        url = blob_client.url
+        entry = self.disk_cache.lookup(url)
+        if entry is not None and self.disk_cache.is_fresh(entry):
+            return self.disk_cache.touch(url, entry)
+        try:
+            if entry is None:
+                properties = blob_client.get_blob_properties()
+            else:
+                properties = blob_client.get_blob_properties(
+                    etag=entry["etag"], match_condition=MatchConditions.IfModified
+                )
+        except HttpResponseError as e:
+            if entry is None or e.status_code != 304:
+                raise
+            self.logger.debug(f"Reading {file_path} from the disk cache")
+            return self.disk_cache.touch(url, entry, validated=True)
+
+        def fill(local_path):
+            self.logger.info(f"Downloading {file_path} to the disk cache")
+            if self.is_large_blob(properties.size):
+                download_blob_ranges(
+                    blob_client,
+                    local_path,
+                    size=properties.size,
+                    etag=properties.etag,
+                    chunk_size=self.download_chunk_size,
+                    max_concurrency=self.download_concurrency,
+                )
+            else:
+                with open(local_path, "wb") as f:
+                    downloader = blob_client.download_blob(
+                        etag=properties.etag, match_condition=MatchConditions.IfNotModified
+                    )
+                    downloader.readinto(f)
+
+        # Keeping the extension lets smart_open infer the compression of the cached file
+        return self.disk_cache.store(url, properties.etag, fill, suffix=os.path.splitext(file_path)[1][:16])
 
     @arguments_decorator(local_support=True)
     def open(
@@ -333,6 +1948,15 @@ class Connector:
         """
         wrapper around smart_open so we dont have to pass a blob client everywhere.
 
+        When reading an azure blob, its first FIRST_RANGE_SIZE bytes are read with one request, which is all of a
+        small blob. A blob of at least large_blob_threshold bytes is then downloaded to a temporary file in temp_dir
+        with parallel range requests and that file is opened instead, it is deleted when closed. Other blobs are
+        streamed from the end of that first range. If large_blob_threshold is None, blobs are streamed by smart_open.
+        Azure blobs opened for writing are staged in blocks of upload_block_size, upload_concurrency at a time, and
+        committed when the file is closed.
+        If the connector has a memory_cache or a disk_cache, azure blobs opened for reading are read through them, small
+        blobs from the memory_cache first.
+
         :param path: str: optional Local or azure path. Defaults to None.
         :param storage_account: str: optional name of storage account. Defaults to None.
         :param container: str: optional container name. Defaults to None.
@@ -352,6 +1976,26 @@ class Connector:
             }
         else:
             transport_params = {"client": None}
+        if storage_account and "r" in mode and "+" not in mode and self.memory_cache is not None:
+            data = self._read_small_blob(storage_account, container, file_path)
+            if data is not None:
+                kwargs.pop("transport_params", None)
+                return smart_open.open(named_buffer(data, file_path), mode, *args, **kwargs)
+        if storage_account and "r" in mode and "+" not in mode and self.disk_cache is not None:
+            kwargs.pop("transport_params", None)
+            return smart_open.open(self._open_cached(storage_account, container, file_path), mode, *args, **kwargs)
+        if storage_account and "r" in mode and "+" not in mode and self.large_blob_threshold is not None:
+            kwargs.pop("transport_params", None)
+            return smart_open.open(self._open_ranged(storage_account, container, file_path), mode, *args, **kwargs)
+        if storage_account and "w" in mode and "+" not in mode:
+            kwargs.pop("transport_params", None)
+            writer = BlockBlobWriter(
+                transport_params["client"].get_blob_client(container, file_path),
+                file_path,
+                block_size=self.upload_block_size,
+                max_concurrency=self.upload_concurrency,
+            )
+            return smart_open.open(writer, mode, *args, **kwargs)
         if "transport_params" not in kwargs:
             kwargs["transport_params"] = transport_params
         path = path if path else f"azure://{container}/{file_path}"
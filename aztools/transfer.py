@@ -0,0 +1,429 @@
+from aztools.concurrency import ordered_map
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from azure.core import MatchConditions
+from azure.storage.blob import BlobBlock
+import threading
+import hashlib
+import mmap
+import io
+import os
+
+MiB = 1024 * 1024
+
+# Blobs of at least this size are downloaded with download_blob_ranges
+DEFAULT_LARGE_BLOB_THRESHOLD = 256 * MiB
+DEFAULT_CHUNK_SIZE = 16 * MiB
+DEFAULT_BLOCK_SIZE = 16 * MiB
+DEFAULT_CONCURRENCY = 8
+# open reads this much of a blob with its first request, blobs no larger are read in memory
+FIRST_RANGE_SIZE = 4 * MiB
+
+
+class _OffsetWriter:
+    """
+    Writes data at given offsets of an open file descriptor from many threads. Uses os.pwrite where it is available,
+    otherwise seeks and writes under a lock.
+    """
+
+    def __init__(self, fd: int):
+        self.fd = fd
+        self._lock = None if hasattr(os, "pwrite") else threading.Lock()
+
+    def write(self, data, offset: int):
+        view = memoryview(data)
+        if self._lock is None:
+            while view:
+                written = os.pwrite(self.fd, view, offset)
+                view = view[written:]
+                offset += written
+        else:
+            with self._lock:
+                os.lseek(self.fd, offset, os.SEEK_SET)
+                while view:
+                    view = view[os.write(self.fd, view):]
+
+
+def preallocate(fd: int, size: int):
+    """
+    Reserves size bytes for an open file, so ranges can be written to it in any order
+    """
+    if size and hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError:
+            # Not every file system supports fallocate, truncating still gives the file its size
+            pass
+    os.ftruncate(fd, size)
+
+
+def content_range_size(content_range: str) -> int:
+    """
+    Returns the full size of a blob from the Content-Range of a range response, of the form "bytes 0-99/1000"
+    """
+    return int(content_range.rpartition("/")[2])
+
+
+def download_blob_ranges(
+    blob_client,
+    local_path: str,
+    size: int = None,
+    etag: str = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_concurrency: int = DEFAULT_CONCURRENCY,
+) -> int:
+    """
+    Downloads a blob to a local file by splitting it into byte ranges of chunk_size, which are fetched on
+    max_concurrency connections and written straight into their offsets of a preallocated file. Every range is
+    requested with the blob's etag, so a blob that changes during the download raises an error rather than
+    producing a mix of two versions.
+
+    :param blob_client: BlobClient: The client for the blob to download
+    :param local_path: str: The local file to download to, it is overwritten
+    :param size: int: optional The size of the blob, if it is not passed the blob properties are fetched. Defaults to None.
+    :param etag: str: optional The etag of the blob, if it is not passed the blob properties are fetched. Defaults to None.
+    :param chunk_size: int: optional The size of the range fetched by each request. Defaults to 16 MiB.
+    :param max_concurrency: int: optional The number of ranges fetched at once. Defaults to 8.
+
+    :return int: The number of bytes downloaded
+    """
+    if size is None or etag is None:
+        properties = blob_client.get_blob_properties()
+        size, etag = properties.size, properties.etag
+
+    fd = os.open(local_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0))
+    try:
+        preallocate(fd, size)
+        writer = _OffsetWriter(fd)
+
+        def fetch(offset):
+            length = min(chunk_size, size - offset)
+            downloader = blob_client.download_blob(
+                offset=offset,
+                length=length,
+                etag=etag,
+                match_condition=MatchConditions.IfNotModified,
+            )
+            position = offset
+            for chunk in downloader.chunks():
+                writer.write(chunk, position)
+                position += len(chunk)
+            return position - offset
+
+        downloaded = sum(ordered_map(fetch, range(0, size, chunk_size), max_workers=max_concurrency))
+    finally:
+        os.close(fd)
+    return downloaded
+
+
+class _MemoryviewReader(io.RawIOBase):
+    """
+    A seekable, read only stream over a memoryview. Reads return slices of the view rather than copies, so a
+    memory mapped block can be sent as a request body without copying it.
+    """
+
+    def __init__(self, view: memoryview):
+        self.view = view
+        self.position = 0
+
+    def __len__(self):
+        return len(self.view)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += len(self.view)
+        self.position = max(0, min(offset, len(self.view)))
+        return self.position
+
+    def read(self, size: int = -1):
+        end = len(self.view) if size is None or size < 0 else min(self.position + size, len(self.view))
+        data = self.view[self.position : end]
+        self.position = end
+        return data
+
+
+class _BlobRangeReader(io.RawIOBase):
+    """
+    A seekable, read only stream over a blob whose first bytes have already been read. Those are served from memory,
+    the rest is streamed with one range request from the current position, started again after a seek. Every request
+    is made with the blob's etag, so a blob that changes while it is read raises an error.
+    """
+
+    def __init__(self, blob_client, first: bytes, size: int, etag: str, name: str):
+        self.blob_client = blob_client
+        self.first = first
+        self.size = size
+        self.etag = etag
+        self.name = name
+        self.position = 0
+        self._chunks = None
+        # The part of the last streamed chunk not read yet
+        self._pending = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        offset = max(0, min(offset, self.size))
+        if offset != self.position:
+            self._chunks = None
+            self._pending = memoryview(b"")
+        self.position = offset
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        if self.position >= self.size:
+            return 0
+        if self.position < len(self.first):
+            data = self.first[self.position : self.position + len(buffer)]
+        else:
+            if self._chunks is None:
+                downloader = self.blob_client.download_blob(
+                    offset=self.position,
+                    length=self.size - self.position,
+                    etag=self.etag,
+                    match_condition=MatchConditions.IfNotModified,
+                )
+                self._chunks = iter(downloader.chunks())
+            while not self._pending:
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    return 0
+                self._pending = memoryview(chunk)
+            data, self._pending = self._pending[: len(buffer)], self._pending[len(buffer) :]
+        buffer[: len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+def open_blob_range_reader(blob_client, first: bytes, size: int, etag: str, name: str) -> io.BufferedReader:
+    """
+    Opens a blob for binary reading, serving its first bytes, already read by an earlier request, from memory and
+    streaming the rest. The file is named so smart_open can infer its compression from the extension.
+
+    :param blob_client: BlobClient: The client for the blob to read
+    :param first: bytes: The first bytes of the blob
+    :param size: int: The size of the blob
+    :param etag: str: The etag of the blob first was read from
+    :param name: str: The name of the file
+
+    :return io.BufferedReader: The open blob
+    """
+    return io.BufferedReader(_BlobRangeReader(blob_client, first, size, etag, name))
+
+
+def upload_file_blocks(
+    blob_client,
+    local_path: str,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    max_concurrency: int = DEFAULT_CONCURRENCY,
+    overwrite: bool = False,
+    **kwargs,
+) -> int:
+    """
+    Uploads a local file as a block blob by staging blocks of block_size on max_concurrency connections and
+    committing them with one commit_block_list. Blocks are read from a memory map of the file, so they are sent
+    without being copied into memory first.
+
+    :param blob_client: BlobClient: The client for the blob to upload to
+    :param local_path: str: The local file to upload
+    :param block_size: int: optional The size of each staged block. Defaults to 16 MiB.
+    :param max_concurrency: int: optional The number of blocks staged at once. Defaults to 8.
+    :param overwrite: bool: optional If False the commit fails with ResourceExistsError when the blob exists. Defaults to False.
+    :param kwargs: Passed to commit_block_list, for example content_settings or metadata
+
+    :return int: The number of bytes uploaded
+    """
+    if not overwrite:
+        kwargs.update(etag="*", match_condition=MatchConditions.IfMissing)
+
+    size = os.path.getsize(local_path)
+    if size == 0:
+        # An empty file can't be memory mapped and has no blocks to stage
+        blob_client.commit_block_list([], **kwargs)
+        return 0
+
+    # Block ids must all have the same length, the SDK base64 encodes them
+    offsets = range(0, size, block_size)
+    block_ids = [f"{index:08d}" for index in range(len(offsets))]
+
+    with open(local_path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+
+        def stage(index):
+            block = view[offsets[index] : offsets[index] + block_size]
+            blob_client.stage_block(block_ids[index], _MemoryviewReader(block), length=len(block))
+            return len(block)
+
+        try:
+            uploaded = sum(ordered_map(stage, range(len(offsets)), max_workers=max_concurrency))
+        finally:
+            view.release()
+            try:
+                mapped.close()
+            except BufferError:
+                # Slices of the map can outlive a failed request, the map is closed when they are collected
+                pass
+
+    blob_client.commit_block_list([BlobBlock(block_id=block_id) for block_id in block_ids], **kwargs)
+    return uploaded
+
+
+class BlockBlobWriter(io.BufferedIOBase):
+    """
+    A binary file that writes a block blob, staging a block each time block_size bytes are written. Up to
+    max_concurrency blocks are staged at once on a pool of threads, so writing only waits for the network once that
+    many are in flight. Closing the file stages the rest and commits the block list, a file closed before a whole
+    block was written is uploaded with one request instead. terminate closes it without committing anything.
+
+    :param blob_client: BlobClient: The client for the blob to write, it is overwritten
+    :param name: str: The name of the file, smart_open infers the compression from its extension
+    :param block_size: int: optional The size of each staged block. Defaults to 16 MiB.
+    :param max_concurrency: int: optional The number of blocks staged at once. Defaults to 8.
+    :param kwargs: Passed to commit_block_list or upload_blob, for example content_settings or metadata
+    """
+
+    def __init__(
+        self,
+        blob_client,
+        name: str,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        **kwargs,
+    ):
+        super().__init__()
+        self.blob_client = blob_client
+        self.name = name
+        self.block_size = block_size
+        self.max_concurrency = max(1, max_concurrency)
+        self.kwargs = kwargs
+        self._buffer = bytearray()
+        self._block_ids = []
+        self._pending = deque()
+        self._executor = None
+
+    def writable(self):
+        return True
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError("write to closed file")
+        self._buffer += data
+        while len(self._buffer) >= self.block_size:
+            self._stage(bytes(self._buffer[: self.block_size]))
+            del self._buffer[: self.block_size]
+        return len(data)
+
+    def _stage(self, block: bytes):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        self._wait(self.max_concurrency - 1)
+        # Block ids must all have the same length, the SDK base64 encodes them
+        block_id = f"{len(self._block_ids):08d}"
+        self._block_ids.append(block_id)
+        self._pending.append(self._executor.submit(self.blob_client.stage_block, block_id, block, length=len(block)))
+
+    def _wait(self, max_pending: int):
+        """
+        Waits until at most max_pending blocks are being staged. If a block failed the file is terminated, so the
+        blocks written are never committed, and the error is raised.
+        """
+        try:
+            while len(self._pending) > max_pending:
+                self._pending.popleft().result()
+        except BaseException:
+            self.terminate()
+            raise
+
+    def _shutdown(self):
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def close(self):
+        """
+        Stages what is left and commits every block written to the blob
+        """
+        if self.closed:
+            return
+        try:
+            if not self._block_ids:
+                self.blob_client.upload_blob(bytes(self._buffer), overwrite=True, **self.kwargs)
+            else:
+                if self._buffer:
+                    self._stage(bytes(self._buffer))
+                self._wait(0)
+                self.blob_client.commit_block_list(
+                    [BlobBlock(block_id=block_id) for block_id in self._block_ids], **self.kwargs
+                )
+        finally:
+            self._shutdown()
+            self._buffer = bytearray()
+            super().close()
+
+    def terminate(self):
+        """
+        Closes the file without committing anything written, leaving the blob as it was. Staged blocks that are never
+        committed are discarded by azure.
+        """
+        self._shutdown()
+        self._buffer = bytearray()
+        self._block_ids = []
+        super().close()
+
+
+def file_md5(local_path: str, chunk_size: int = 4 * MiB) -> bytes:
+    """
+    Returns the MD5 digest of a local file, read in chunks of chunk_size
+    """
+    md5 = hashlib.md5()
+    with open(local_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            md5.update(chunk)
+    return md5.digest()
+
+
+def open_temporary(local_path: str):
+    """
+    Opens a local file for binary reading and deletes it once it is closed
+    """
+    if os.name == "nt":
+        return os.fdopen(os.open(local_path, os.O_RDONLY | os.O_BINARY | os.O_TEMPORARY), "rb")
+    f = open(local_path, "rb")
+    os.unlink(local_path)
+    return f
+
+
+def named_buffer(data: bytes, name: str) -> io.BytesIO:
+    """
+    Returns an in memory binary file of data, named so smart_open can infer its compression from the extension
+    """
+    buffer = io.BytesIO(data)
+    buffer.name = name
+    return buffer
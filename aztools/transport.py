@@ -0,0 +1,133 @@
+from azure.core.pipeline.transport import RequestsTransport
+from urllib3.util.retry import Retry
+import requests
+
+try:
+    # The adapter azure-core mounts on the sessions it creates
+    from azure.core.pipeline.transport._requests_basic import BiggerBlockSizeHTTPAdapter
+except ImportError:
+    from requests.adapters import HTTPAdapter as BiggerBlockSizeHTTPAdapter
+
+# The block size request bodies are sent in by azure-core's sessions, larger than the urllib3 default
+SEND_BLOCK_SIZE = 32768
+
+
+class BlockSizeHTTPAdapter(BiggerBlockSizeHTTPAdapter):
+    """
+    azure-core's adapter, which sends request bodies in blocks of SEND_BLOCK_SIZE. azure-core only sets the block size
+    in get_connection, which requests 2.32 and later no longer call, so it is also set here in the method they do.
+    """
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        connection = super().get_connection_with_tls_context(request, verify, proxies=proxies, cert=cert)
+        if not connection.conn_kw:
+            connection.conn_kw = {}
+        connection.conn_kw["blocksize"] = SEND_BLOCK_SIZE
+        return connection
+
+
+def build_session(pool_size: int = 10, pool_connections: int = 10, keep_alive: bool = True) -> requests.Session:
+    """
+    Returns a requests session whose connection pools are sized for concurrent use
+
+    :param pool_size: int: optional The number of connections kept open per host. Defaults to 10.
+    :param pool_connections: int: optional The number of hosts to keep connection pools for. Defaults to 10.
+    :param keep_alive: bool: optional If False connections are closed after each request. Defaults to True.
+
+    :return requests.Session: The session
+    """
+    session = requests.Session()
+    # The adapter and retry settings of the session the azure transport creates itself, retries are handled by the
+    # azure pipeline
+    adapter = BlockSizeHTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=False, redirect=False, raise_on_status=False),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+
+def build_transport(
+    pool_size: int = 10,
+    pool_connections: int = 10,
+    keep_alive: bool = True,
+    connection_timeout: float = None,
+    read_timeout: float = None,
+) -> RequestsTransport:
+    """
+    Returns an azure transport that can be shared by many clients. Closing a client does not close the shared
+    transport, call close_transport once every client using it is finished with.
+
+    :param pool_size: int: optional The number of connections kept open per host. Defaults to 10.
+    :param pool_connections: int: optional The number of hosts to keep connection pools for. Defaults to 10.
+    :param keep_alive: bool: optional If False connections are closed after each request. Defaults to True.
+    :param connection_timeout: float: optional Seconds to wait for a connection. Defaults to the azure default.
+    :param read_timeout: float: optional Seconds to wait between bytes read. Defaults to the azure default.
+
+    :return RequestsTransport: The transport
+    """
+    timeouts = {}
+    if connection_timeout is not None:
+        timeouts["connection_timeout"] = connection_timeout
+    if read_timeout is not None:
+        timeouts["read_timeout"] = read_timeout
+    return RequestsTransport(
+        session=build_session(pool_size=pool_size, pool_connections=pool_connections, keep_alive=keep_alive),
+        session_owner=False,
+        **timeouts,
+    )
+
+
+def close_transport(transport: RequestsTransport):
+    """
+    Closes the session of a transport created by build_transport
+    """
+    if transport.session is not None:
+        transport.session.close()
+
+
+def build_async_transport(
+    pool_size: int = 100,
+    keep_alive: bool = True,
+    connection_timeout: float = None,
+    read_timeout: float = None,
+):
+    """
+    Returns an asyncio azure transport that can be shared by many clients. Requires aiohttp and must be called
+    while an event loop is running, call close_async_transport once every client using it is finished with.
+
+    :param pool_size: int: optional The number of connections kept open per host. Defaults to 100.
+    :param keep_alive: bool: optional If False connections are closed after each request. Defaults to True.
+    :param connection_timeout: float: optional Seconds to wait for a connection. Defaults to the azure default.
+    :param read_timeout: float: optional Seconds to wait between bytes read. Defaults to the azure default.
+
+    :return AioHttpTransport: The transport
+    """
+    import aiohttp
+    from azure.core.pipeline.transport import AioHttpTransport
+
+    timeouts = {}
+    if connection_timeout is not None:
+        timeouts["connection_timeout"] = connection_timeout
+    if read_timeout is not None:
+        timeouts["read_timeout"] = read_timeout
+    # The same session settings the azure transport uses when it creates its own session
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=0, limit_per_host=pool_size, force_close=not keep_alive),
+        cookie_jar=aiohttp.DummyCookieJar(),
+        trust_env=True,
+        auto_decompress=False,
+    )
+    return AioHttpTransport(session=session, session_owner=False, **timeouts)
+
+
+async def close_async_transport(transport):
+    """
+    Closes the session of a transport created by build_async_transport
+    """
+    if transport.session is not None:
+        await transport.session.close()
@@ -0,0 +1,50 @@
+"""
+Benchmark of the time taken to construct a Connector, eagerly and lazily.
+
+Eager connectors create their credential and clients and check the container exists before returning, lazy
+connectors do none of that until they are first used. Run against a real storage account with aztools installed:
+
+    python benchmarks/connector_startup.py --storage-account <account> --container <container>
+"""
+import argparse
+import statistics
+import time
+
+from aztools.storage import Connector
+
+
+def time_construction(repeat: int, **kwargs) -> list:
+    """
+    Returns the seconds taken to construct a Connector with kwargs, once per repeat
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        Connector(**kwargs)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name: str, timings: list):
+    print(
+        f"{name:<8} median: {statistics.median(timings) * 1e6:12.1f} us"
+        f"  min: {min(timings) * 1e6:12.1f} us  max: {max(timings) * 1e6:12.1f} us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--storage-account", required=True)
+    parser.add_argument("--container", required=True)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    for name, lazy in [("eager", False), ("lazy", True)]:
+        timings = time_construction(
+            args.repeat, storage_account=args.storage_account, container=args.container, lazy=lazy
+        )
+        report(name, timings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Microbenchmark of the per-call overhead of the argument decorators.
+
+Times a decorated method that does nothing against the same undecorated method, for already resolved arguments
+(the calls decorated methods make to each other), azure path strings, AzurePath objects and the two location
+decorator. Needs no azure account:
+
+    python benchmarks/decorator_overhead.py --number 1000000
+"""
+import argparse
+import timeit
+
+from aztools.args_handler import arguments_decorator, multi_arguments_decorator
+from aztools.paths import AzurePath
+
+
+class Target:
+    storage_account = "account"
+    container = "container"
+
+    def plain(self, path=None, storage_account=None, container=None, file_path=None):
+        return file_path
+
+    @arguments_decorator()
+    def single(self, path=None, storage_account=None, container=None, file_path=None):
+        return file_path
+
+    @multi_arguments_decorator()
+    def multi(
+        self,
+        source_path=None,
+        source_storage_account=None,
+        source_container=None,
+        source_file_path=None,
+        dest_path=None,
+        dest_storage_account=None,
+        dest_container=None,
+        dest_file_path=None,
+    ):
+        return dest_file_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=200000)
+    args = parser.parse_args()
+
+    target = Target()
+    azure_path = AzurePath("account", "container", "dir/file.txt")
+    cases = {
+        "undecorated": lambda: target.plain(storage_account="account", container="container", file_path="f"),
+        "resolved": lambda: target.single(storage_account="account", container="container", file_path="f"),
+        "path string": lambda: target.single(path="azure://container/dir/file.txt"),
+        "AzurePath": lambda: target.single(path=azure_path),
+        "two paths": lambda: target.multi(source_path="azure://container/a", dest_path="azure://container/b"),
+    }
+    baseline = None
+    for name, call in cases.items():
+        per_call = min(timeit.repeat(call, number=args.number, repeat=5)) / args.number
+        baseline = per_call if baseline is None else baseline
+        print(f"{name:<12} {per_call * 1e9:8.0f} ns/call  overhead: {(per_call - baseline) * 1e9:8.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
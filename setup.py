@@ -15,6 +15,7 @@ setup(
     author_email="george.phillips@episerver.com",
     packages=['aztools'],
     install_requires=requirements,
+    extras_require={"aio": ["aiohttp"], "columnar": ["numpy", "pyarrow"]},
     classifiers=[      
         'Programming Language :: Python :: 3.7',
     ],
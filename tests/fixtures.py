@@ -1,9 +1,20 @@
 import pytest
 from unittest.mock import patch
 from aztools.args_handler import arguments_decorator, multi_arguments_decorator
+from aztools.credentials import clear_shared_credentials
 from aztools.storage import *
 
 
+@pytest.fixture(autouse=True)
+def reset_shared_credentials():
+    """
+    Credentials are shared by the whole process, this clears them so each test creates its own (patched) credential
+    """
+    clear_shared_credentials()
+    yield
+    clear_shared_credentials()
+
+
 @pytest.fixture
 def patched_creds_connector():
     """
@@ -20,7 +31,7 @@ def patched_creds_connector():
     """
 
     def connector_factory(*args, **kwargs):
-        with patch("aztools.storage.DefaultAzureCredential", return_value="mock-cred"):
+        with patch("aztools.credentials.DefaultAzureCredential", return_value="mock-cred"):
             return Connector(*args, **kwargs)
 
     return connector_factory
@@ -41,7 +52,7 @@ def patched_connector():
     """
 
     def connector_factory(*args, **kwargs):
-        with patch("aztools.storage.DefaultAzureCredential", return_value="mock-cred"):
+        with patch("aztools.credentials.DefaultAzureCredential", return_value="mock-cred"):
             with patch("aztools.storage.BlobServiceClient") as mock_client:
                 # A fixture that has a name attribute like a container is expected to
                 def mock_container():
@@ -169,7 +180,7 @@ class MockConnector:
         )
 
     def parse_azure_path(self, path: str) -> dict:
-        with patch("aztools.storage.DefaultAzureCredential", return_value="mock-cred"):
+        with patch("aztools.credentials.DefaultAzureCredential", return_value="mock-cred"):
             with patch("aztools.storage.BlobServiceClient") as mock_client:
                 # A fixture that has a name attribute like a container is expected to
                 def mock_container():
@@ -184,7 +195,7 @@ class MockConnector:
                 return con.parse_azure_path(path)
 
     def is_azure_path(self, path: str) -> bool:
-        with patch("aztools.storage.DefaultAzureCredential", return_value="mock-cred"):
+        with patch("aztools.credentials.DefaultAzureCredential", return_value="mock-cred"):
             with patch("aztools.storage.BlobServiceClient"):
                 con = Connector()
                 return con.is_azure_path(path)
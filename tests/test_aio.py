@@ -0,0 +1,173 @@
+import asyncio
+import os
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from aztools.aio import AsyncBlobFile, Connector
+
+
+class AsyncIterator:
+    def __init__(self, items):
+        self.items = iter(items)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.items)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def mock_blob(name):
+    blob = MagicMock()
+    blob.name = name
+    return blob
+
+
+@pytest.fixture
+def mock_aio_client():
+    with patch("aztools.aio.BlobServiceClient") as mock_client, patch("aztools.aio.build_async_transport"):
+        container_client = mock_client.return_value.get_container_client.return_value
+        container_client.exists = AsyncMock(return_value=True)
+        mock_client.return_value.close = AsyncMock()
+        yield mock_client
+
+
+def test_aio_connector_init():
+    con = Connector(path="https://test-account.blob.core.windows.net/test-container/dir/file.txt", credential="cred")
+    assert con.storage_account == "test-account"
+    assert con.container == "test-container"
+    with pytest.raises(ValueError):
+        Connector(credential="cred", auth_mode="cli")
+
+
+def test_aio_close_evicted_clients(mock_aio_client):
+    closed = []
+
+    def make_client(account_url, **kwargs):
+        client = MagicMock()
+
+        async def close():
+            # The evicted client takes longer to close than the one still pooled
+            await asyncio.sleep(0.05 if "first" in account_url else 0)
+            closed.append(account_url)
+
+        client.close = close
+        return client
+
+    mock_aio_client.side_effect = make_client
+
+    async def run():
+        con = Connector(storage_account="test-account", credential="cred", max_clients=1)
+        con.get_blob_service_client(storage_account="first")
+        con.get_blob_service_client(storage_account="second")
+        with patch("aztools.aio.close_async_transport", new=AsyncMock()):
+            await con.close()
+        return con
+
+    # The evicted client is closed before the connector finishes closing
+    con = asyncio.run(run())
+    assert sorted(closed) == ["https://first.blob.core.windows.net/", "https://second.blob.core.windows.net/"]
+    assert not con._closing
+
+
+def test_aio_list_blobs(mock_aio_client):
+    container_client = mock_aio_client.return_value.get_container_client.return_value
+    container_client.list_blobs.return_value = AsyncIterator([mock_blob("dir/a.txt"), mock_blob("dir/b.txt")])
+
+    async def run():
+        con = Connector(storage_account="test-account", credential="cred")
+        return [name async for name in con.list_blobs(path="azure://test-container/dir/")]
+
+    assert asyncio.run(run()) == ["a.txt", "b.txt"]
+    container_client.list_blobs.assert_called_with(name_starts_with="dir/")
+    container_client.exists.assert_awaited_once()
+
+    # Only the leading prefix is removed from names that contain it again
+    container_client.list_blobs.return_value = AsyncIterator([mock_blob("dir/dir/a.txt"), mock_blob("dir/x/dir/b.txt")])
+    assert asyncio.run(run()) == ["dir/a.txt", "x/dir/b.txt"]
+
+
+def test_aio_download_folder(mock_aio_client, tmp_path):
+    container_client = mock_aio_client.return_value.get_container_client.return_value
+    container_client.list_blobs.return_value = AsyncIterator([mock_blob("dir/a.txt"), mock_blob("dir/b.txt")])
+
+    async def download_blob(name):
+        downloader = MagicMock()
+
+        async def readinto(f):
+            f.write(name.encode())
+
+        downloader.readinto = readinto
+        return downloader
+
+    container_client.download_blob = download_blob
+
+    async def run():
+        async with Connector(storage_account="test-account", credential="cred", max_concurrency=2) as con:
+            await con.download_folder(source_path="azure://test-container/dir/", dest_path=str(tmp_path))
+
+    with patch("aztools.aio.close_async_transport", new=AsyncMock()):
+        asyncio.run(run())
+    assert sorted(os.listdir(tmp_path)) == ["a.txt", "b.txt"]
+    assert (tmp_path / "b.txt").read_text() == "dir/b.txt"
+
+    # Blobs with the same base name are found before anything is downloaded
+    container_client.list_blobs.return_value = AsyncIterator([mock_blob("dir/a/c.txt"), mock_blob("dir/b/c.txt")])
+    with patch("aztools.aio.close_async_transport", new=AsyncMock()), pytest.raises(ValueError):
+        asyncio.run(run())
+    assert "c.txt" not in os.listdir(tmp_path)
+
+
+def test_async_blob_file_read():
+    blob_client = MagicMock()
+    downloader = MagicMock()
+    downloader.chunks.return_value = AsyncIterator([b"hello ", "wörld".encode()])
+    blob_client.download_blob = AsyncMock(return_value=downloader)
+
+    async def run():
+        async with AsyncBlobFile(blob_client, mode="r") as f:
+            return await f.read(3), await f.read()
+
+    assert asyncio.run(run()) == ("hel", "lo wörld")
+
+
+def test_async_blob_file_write():
+    blob_client = MagicMock()
+    blob_client.stage_block = AsyncMock()
+    blob_client.commit_block_list = AsyncMock()
+    blob_client.upload_blob = AsyncMock()
+
+    async def run(data, block_size):
+        async with AsyncBlobFile(blob_client, mode="wb", block_size=block_size) as f:
+            await f.write(data)
+
+    # Small files are uploaded in one request
+    asyncio.run(run(b"abc", 4))
+    blob_client.upload_blob.assert_awaited_once_with(b"abc", overwrite=True)
+
+    # Larger files are staged in blocks and committed on close
+    asyncio.run(run(b"abcdefghij", 4))
+    staged = [call.kwargs["data"] for call in blob_client.stage_block.await_args_list]
+    assert staged == [b"abcd", b"efgh", b"ij"]
+    assert len(blob_client.commit_block_list.await_args.args[0]) == 3
+
+
+def test_async_blob_file_write_error():
+    blob_client = MagicMock()
+    blob_client.stage_block = AsyncMock()
+    blob_client.commit_block_list = AsyncMock()
+    blob_client.upload_blob = AsyncMock()
+
+    async def run(data):
+        async with AsyncBlobFile(blob_client, mode="wb", block_size=4) as f:
+            await f.write(data)
+            raise RuntimeError("failed while writing")
+
+    # Nothing written is committed if the body raises
+    for data in [b"partial", b"ab"]:
+        with pytest.raises(RuntimeError):
+            asyncio.run(run(data))
+    blob_client.upload_blob.assert_not_awaited()
+    blob_client.commit_block_list.assert_not_awaited()
@@ -0,0 +1,271 @@
+from contextlib import contextmanager
+import os
+import pytest
+from unittest.mock import MagicMock, patch
+from azure.core.exceptions import HttpResponseError
+from aztools.cache import DiskCache, MemoryCache, file_lock
+from aztools.transfer import FIRST_RANGE_SIZE
+from tests.fixtures import *
+
+
+def write(data):
+    def fill(local_path):
+        with open(local_path, "wb") as f:
+            f.write(data)
+
+    return fill
+
+
+def test_store_and_lookup(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"))
+    assert cache.lookup("https://account/container/a.txt") is None
+
+    with cache.lock("https://account/container/a.txt"):
+        path = cache.store("https://account/container/a.txt", "etag-1", write(b"one"), suffix=".txt")
+    assert path.endswith(".txt") and open(path, "rb").read() == b"one"
+    entry = cache.lookup("https://account/container/a.txt")
+    assert entry["etag"] == "etag-1" and entry["size"] == 3
+
+    # A new version replaces the old file
+    new_path = cache.store("https://account/container/a.txt", "etag-2", write(b"two"))
+    assert not os.path.exists(path) and open(new_path, "rb").read() == b"two"
+
+    # A failed fill leaves the cache as it was
+    with pytest.raises(ValueError):
+        cache.store("https://account/container/a.txt", "etag-3", MagicMock(side_effect=ValueError))
+    assert cache.lookup("https://account/container/a.txt")["etag"] == "etag-2"
+    assert not [name for name in os.listdir(cache.blob_directory) if name.endswith(".tmp")]
+
+
+def test_store_json_blobs(tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=12)
+    # Cached json blobs are not mistaken for index entries
+    path = cache.store("https://account/container/config.json", "etag-1", write(b'{"a": 1}'), suffix=".json")
+    os.utime(path, (1, 1))
+    cache.store("https://account/container/b.json", "etag-1", write(b"[1]"), suffix=".json")
+    assert sorted(entry["url"] for entry in cache.entries()) == [
+        "https://account/container/b.json",
+        "https://account/container/config.json",
+    ]
+    cache.store("https://account/container/c.json", "etag-1", write(b'{"b": 2}'), suffix=".json")
+    assert not os.path.exists(path) and cache.lookup("https://account/container/config.json") is None
+
+    # Index entries that are not valid are ignored
+    with open(cache._entry_path("https://account/container/d.json"), "w") as f:
+        f.write('{"path": 1}')
+    assert cache.lookup("https://account/container/d.json") is None
+    assert len(cache.entries()) == 2
+
+
+def test_eviction(tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=10)
+    for index, name in enumerate(["a", "b", "c"]):
+        path = cache.store(name, "1", write(b"1234"))
+        os.utime(path, (index, index))
+    # a was used longest ago so it was evicted to make room for c
+    assert [cache.lookup(name) is not None for name in ["a", "b", "c"]] == [False, True, True]
+
+    cache.touch("b", cache.lookup("b"))
+    cache.store("d", "1", write(b"1234"))
+    assert [cache.lookup(name) is not None for name in ["b", "c", "d"]] == [True, False, True]
+
+    cache.clear()
+    assert cache.entries() == []
+
+
+def test_eviction_skips_locked_entries(tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=4)
+    cache.store("a", "1", write(b"1234"))
+    # a is in use by another reader, so it is kept even though the cache is over max_size
+    with cache.lock("a"):
+        cache.store("b", "1", write(b"1234"))
+    assert cache.lookup("a") is not None
+    cache.evict()
+    assert cache.lookup("a") is None
+
+    with file_lock(str(tmp_path / "other.lock")) as locked:
+        assert locked
+        with file_lock(str(tmp_path / "other.lock"), blocking=False) as locked_again:
+            assert not locked_again
+
+
+def test_connector_open_through_cache(patched_connector, tmp_path):
+    cache = DiskCache(str(tmp_path), revalidate_after=0)
+    con = patched_connector(storage_account="test-account", container="test-container", disk_cache=cache)
+    blob_client = con.blob_service_client.get_blob_client.return_value
+    blob_client.url = "https://test-account.blob.core.windows.net/test-container/vocab.txt"
+    blob_client.get_blob_properties.return_value = MagicMock(size=5, etag="etag-1")
+    blob_client.download_blob.return_value.readinto.side_effect = lambda f: f.write(b"vocab")
+
+    with con.open(path="azure://test-container/vocab.txt", mode="rb") as f:
+        assert f.read() == b"vocab"
+    assert blob_client.download_blob.call_count == 1
+
+    # The cached copy is used while a conditional request says the blob has not changed
+    blob_client.get_blob_properties.side_effect = HttpResponseError(response=MagicMock(status_code=304))
+    with con.open(path="azure://test-container/vocab.txt", mode="r") as f:
+        assert f.read() == "vocab"
+    assert blob_client.download_blob.call_count == 1
+    assert blob_client.get_blob_properties.call_args.kwargs["etag"] == "etag-1"
+
+    # A changed blob is downloaded again
+    blob_client.get_blob_properties.side_effect = None
+    blob_client.get_blob_properties.return_value = MagicMock(size=7, etag="etag-2")
+    blob_client.download_blob.return_value.readinto.side_effect = lambda f: f.write(b"changed")
+    with con.open(path="azure://test-container/vocab.txt", mode="rb") as f:
+        assert f.read() == b"changed"
+
+    # Within revalidate_after no request is made
+    cache.revalidate_after = 60
+    blob_client.get_blob_properties.reset_mock()
+    with con.open(path="azure://test-container/vocab.txt", mode="rb") as f:
+        assert f.read() == b"changed"
+    blob_client.get_blob_properties.assert_not_called()
+
+
+def test_connector_open_holds_cached_file(patched_connector, tmp_path):
+    cache = DiskCache(str(tmp_path))
+    con = patched_connector(storage_account="test-account", container="test-container", disk_cache=cache)
+    blob_client = con.blob_service_client.get_blob_client.return_value
+    blob_client.url = "https://test-account.blob.core.windows.net/test-container/vocab.txt"
+    blob_client.get_blob_properties.return_value = MagicMock(size=5, etag="etag-1")
+    blob_client.download_blob.return_value.readinto.side_effect = lambda f: f.write(b"vocab")
+    lock = cache.lock
+
+    @contextmanager
+    def lock_then_evict(url):
+        with lock(url):
+            yield
+        # Another process evicts the blob as soon as the lock is released
+        cache.clear()
+
+    with patch.object(cache, "lock", lock_then_evict):
+        with con.open(path="azure://test-container/vocab.txt", mode="rb") as f:
+            assert f.read() == b"vocab"
+    assert cache.lookup(blob_client.url) is None
+
+
+def test_memory_cache_limits():
+    cache = MemoryCache(max_entries=2, max_bytes=5, max_blob_size=4)
+    cache.put("a", "etag-a", b"aa")
+    cache.put("b", "etag-b", b"bb")
+    assert cache.get("a").data == b"aa"
+
+    # b is the least recently used
+    cache.put("c", "etag-c", b"c")
+    assert cache.get("b") is None and len(cache) == 2
+
+    # Over max_bytes, a is evicted
+    cache.put("d", "etag-d", b"ddd")
+    assert cache.get("a") is None and cache.get("d").data == b"ddd"
+    assert cache.stats["evictions"] == 2
+
+    cache.put("e", "etag-e", b"eeeee")
+    assert cache.get("e") is None and cache.is_too_large("e")
+
+    # A cached blob that grows past max_blob_size is dropped
+    cache.put("d", "etag-d2", b"ddddd")
+    assert cache.get("d") is None and cache.is_too_large("d")
+    assert len(cache) == 1 and cache._size == 1
+
+    # Blobs are only remembered as too large for the ttl, in case they shrink
+    cache.ttl = 0
+    assert not cache.is_too_large("e")
+    cache.put("e", "etag-e2", b"e")
+    assert cache.get("e").data == b"e"
+
+
+def small_blob(blob_client, data, etag):
+    blob_client.download_blob.return_value.readall.return_value = data
+    blob_client.download_blob.return_value.properties.etag = etag
+
+
+def test_connector_open_through_memory_cache(patched_connector):
+    cache = MemoryCache(max_blob_size=10, ttl=60)
+    con = patched_connector(storage_account="test-account", container="test-container", memory_cache=cache)
+    blob_client = con.blob_service_client.get_blob_client.return_value
+    blob_client.url = "https://test-account.blob.core.windows.net/test-container/config.json"
+    small_blob(blob_client, b'{"a": 1}', "etag-1")
+
+    with con.open(path="azure://test-container/config.json", mode="r") as f:
+        assert f.read() == '{"a": 1}'
+    assert blob_client.download_blob.call_args.kwargs["length"] == 11
+
+    # Within the ttl no request is made
+    with con.open(path="azure://test-container/config.json", mode="rb") as f:
+        assert f.read() == b'{"a": 1}'
+    assert blob_client.download_blob.call_count == 1
+
+    # After the ttl a conditional request checks the blob has not changed
+    cache.ttl = 0
+    blob_client.download_blob.side_effect = HttpResponseError(response=MagicMock(status_code=304))
+    with con.open(path="azure://test-container/config.json", mode="rb") as f:
+        assert f.read() == b'{"a": 1}'
+    assert blob_client.download_blob.call_args.kwargs["etag"] == "etag-1"
+
+    # A changed blob is read again
+    blob_client.download_blob.side_effect = None
+    small_blob(blob_client, b'{"a": 2}', "etag-2")
+    with con.open(path="azure://test-container/config.json", mode="rb") as f:
+        assert f.read() == b'{"a": 2}'
+    assert cache.get(blob_client.url).etag == "etag-2"
+    assert cache.stats == {
+        "hits": 1, "misses": 1, "stale_hits": 0, "not_modified": 1, "refreshed": 1, "evictions": 0
+    }
+
+
+def test_connector_open_empty_blob_through_memory_cache(patched_connector):
+    cache = MemoryCache(ttl=0)
+    con = patched_connector(storage_account="test-account", container="test-container", memory_cache=cache)
+    blob_client = con.blob_service_client.get_blob_client.return_value
+    blob_client.url = "https://test-account.blob.core.windows.net/test-container/empty.json"
+    blob_client.get_blob_properties.return_value = MagicMock(etag="etag-1")
+    # Range requests fail on empty blobs
+    blob_client.download_blob.side_effect = HttpResponseError(response=MagicMock(status_code=416))
+
+    with con.open(path="azure://test-container/empty.json", mode="r") as f:
+        assert f.read() == ""
+    assert cache.get(blob_client.url).data == b"" and cache.get(blob_client.url).etag == "etag-1"
+
+    # Revalidating an empty blob that is still empty
+    blob_client.get_blob_properties.return_value = MagicMock(etag="etag-2")
+    with con.open(path="azure://test-container/empty.json", mode="rb") as f:
+        assert f.read() == b""
+    assert cache.get(blob_client.url).etag == "etag-2"
+    assert cache.stats["misses"] == 1 and cache.stats["refreshed"] == 1
+
+
+def test_connector_open_stale_while_revalidate(patched_connector):
+    cache = MemoryCache(max_blob_size=10, ttl=0, stale_while_revalidate=True)
+    con = patched_connector(storage_account="test-account", container="test-container", memory_cache=cache)
+    blob_client = con.blob_service_client.get_blob_client.return_value
+    blob_client.url = "https://test-account.blob.core.windows.net/test-container/config.json"
+    small_blob(blob_client, b"old", "etag-1")
+    with con.open(path="azure://test-container/config.json", mode="rb") as f:
+        assert f.read() == b"old"
+
+    # The stale copy is served and refreshed in the background
+    small_blob(blob_client, b"new", "etag-2")
+    with con.open(path="azure://test-container/config.json", mode="rb") as f:
+        assert f.read() == b"old"
+    cache.close()
+    assert cache.get(blob_client.url).data == b"new"
+    assert cache.stats["stale_hits"] == 1 and cache.stats["refreshed"] == 1
+
+
+def test_connector_open_large_blob_skips_memory_cache(patched_connector):
+    cache = MemoryCache(max_blob_size=4)
+    con = patched_connector(storage_account="test-account", container="test-container", memory_cache=cache)
+    blob_client = con.blob_service_client.get_blob_client.return_value
+    blob_client.url = "https://test-account.blob.core.windows.net/test-container/large.bin"
+    small_blob(blob_client, b"12345", "etag-1")
+    blob_client.download_blob.return_value.properties.content_range = "bytes 0-4/5"
+    with con.open(path="azure://test-container/large.bin", mode="rb") as f:
+        assert f.read() == b"12345"
+    assert cache.is_too_large(blob_client.url) and len(cache) == 0
+
+    # The size is remembered, so the memory cache makes no short read again
+    blob_client.download_blob.reset_mock()
+    with con.open(path="azure://test-container/large.bin", mode="rb") as f:
+        assert f.read() == b"12345"
+    assert [call.kwargs["length"] for call in blob_client.download_blob.call_args_list] == [FIRST_RANGE_SIZE]
@@ -0,0 +1,58 @@
+import threading
+import time
+import pytest
+from aztools.concurrency import chunked, ordered_map
+
+
+def test_ordered_map_keeps_order():
+    def slow_square(x):
+        # Later items finish first, the results must still come back in order
+        time.sleep((10 - x) * 0.001)
+        return x * x
+
+    assert list(ordered_map(slow_square, range(10), max_workers=4)) == [x * x for x in range(10)]
+    assert list(ordered_map(slow_square, range(10), max_workers=1)) == [x * x for x in range(10)]
+
+
+def test_ordered_map_is_bounded():
+    in_flight = []
+    lock = threading.Lock()
+    submitted = 0
+
+    def items():
+        nonlocal submitted
+        for i in range(100):
+            submitted += 1
+            yield i
+
+    def work(x):
+        with lock:
+            in_flight.append(x)
+        return x
+
+    results = ordered_map(work, items(), max_workers=2)
+    next(results)
+    # Only a window of items is pulled from the iterable ahead of the consumer
+    assert submitted <= 5
+    assert list(results) == list(range(1, 100))
+
+
+def test_ordered_map_fails_fast():
+    started = []
+
+    def work(x):
+        started.append(x)
+        if x == 3:
+            raise ValueError("failed")
+        time.sleep(0.01)
+        return x
+
+    with pytest.raises(ValueError):
+        list(ordered_map(work, range(1000), max_workers=2))
+    # Items beyond the in flight window are never started
+    assert len(started) < 20
+
+
+def test_chunked():
+    assert list(chunked(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(chunked(iter([]), 3)) == []
@@ -1,6 +1,16 @@
+import os
+import datetime
+import gzip
+import hashlib
+import inspect
 import pytest
-from unittest.mock import patch
-from aztools.storage import Connector
+from unittest.mock import MagicMock, patch
+from azure.core import MatchConditions
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+from aztools.concurrency import ordered_map
+from aztools.paths import AzurePath
+from aztools.storage import ClientPool, ContainerCache, Connector
+from aztools.transfer import file_md5
 from tests.fixtures import *
 
 
@@ -659,10 +669,12 @@ def test_connector_init(patched_creds_connector):
         # Assert builds boblserviceclient when init with storage_account name
         con = patched_creds_connector(storage_account="test-account")
         mock_client.assert_called_with(
-            credential="mock-cred",
+            credential=con.credential,
             account_url="https://test-account.blob.core.windows.net/",
+            transport=con.transport,
         )
         mock_client.return_value.get_container_client.assert_not_called()
+        assert con.credential.credential == "mock-cred"
         assert con.storage_account == "test-account"
         assert con.container == None
 
@@ -678,8 +690,9 @@ def test_connector_init(patched_creds_connector):
             storage_account="test-account", container="test-container"
         )
         mock_client.assert_called_with(
-            credential="mock-cred",
+            credential=con.credential,
             account_url="https://test-account.blob.core.windows.net/",
+            transport=con.transport,
         )
         mock_client.return_value.get_container_client.assert_called_with(
             container="test-container"
@@ -692,8 +705,9 @@ def test_connector_init(patched_creds_connector):
             path="https://test-account.blob.core.windows.net/test-container/test-directory/test-sub-dir/test.txt"
         )
         mock_client.assert_called_with(
-            credential="mock-cred",
+            credential=con.credential,
             account_url="https://test-account.blob.core.windows.net/",
+            transport=con.transport,
         )
         mock_client.return_value.get_container_client.assert_called_with(
             container="test-container"
@@ -836,5 +850,877 @@ def test_get_blob_service_client(
             file_path=file_path,
         )
         mock_bs_client.assert_called_with(
-            credential="mock-cred", account_url=expected_blob_url
+            credential=con.credential, account_url=expected_blob_url, transport=con.transport
         )
+
+
+def test_client_pool():
+    pool = ClientPool(max_size=2)
+    clients = {key: MagicMock() for key in ["a", "b", "c"]}
+
+    assert pool.get("a", lambda: clients["a"]) is clients["a"]
+    assert pool.get("b", lambda: clients["b"]) is clients["b"]
+    # A hit does not call the factory and marks the client as recently used
+    assert pool.get("a", lambda: None) is clients["a"]
+
+    # Adding a third client evicts and closes the least recently used one
+    pool.get("c", lambda: clients["c"])
+    assert "b" not in pool
+    assert len(pool) == 2
+    clients["b"].close.assert_called_once()
+    clients["a"].close.assert_not_called()
+
+    pool.close()
+    assert len(pool) == 0
+    clients["a"].close.assert_called_once()
+    clients["c"].close.assert_called_once()
+
+    with pytest.raises(ValueError):
+        ClientPool(max_size=0)
+
+
+def test_get_blob_service_client_pools_other_accounts(patched_connector):
+    with patch("aztools.storage.BlobServiceClient") as mock_bs_client:
+        con = patched_connector()
+        first = con.get_blob_service_client(storage_account="test-account")
+        second = con.get_blob_service_client(
+            path="https://test-account.blob.core.windows.net/test-container/file.txt"
+        )
+        assert first is second
+        mock_bs_client.assert_called_once_with(
+            credential=con.credential,
+            account_url="https://test-account.blob.core.windows.net/",
+            transport=con.transport,
+        )
+
+        con.close()
+        mock_bs_client.return_value.close.assert_called_once()
+
+
+def test_container_cache():
+    cache = ContainerCache(ttl=300)
+    assert not cache.is_verified("test-account", "test-container")
+
+    cache.add("test-account", "test-container")
+    cache.add("test-account", "test-container-2")
+    cache.add("test-account-2", "test-container")
+    assert cache.is_verified("test-account", "test-container")
+
+    cache.invalidate(storage_account="test-account", container="test-container")
+    assert not cache.is_verified("test-account", "test-container")
+    assert cache.is_verified("test-account", "test-container-2")
+
+    cache.invalidate(container="test-container")
+    assert not cache.is_verified("test-account-2", "test-container")
+
+    cache.invalidate()
+    assert not cache.is_verified("test-account", "test-container-2")
+
+    # Entries expire once they are older than the ttl
+    with patch("aztools.storage.time.monotonic", side_effect=[0, 301]):
+        cache.add("test-account", "test-container")
+        assert not cache.is_verified("test-account", "test-container")
+
+
+def test_get_container_client_caches_existence(patched_connector):
+    with patch("aztools.storage.BlobServiceClient") as mock_bs_client:
+        con = patched_connector()
+        container_client = mock_bs_client.return_value.get_container_client.return_value
+        container_client.exists.return_value = True
+
+        for _ in range(3):
+            con.get_container_client(path="https://test-account.blob.core.windows.net/test-container/file.txt")
+        container_client.exists.assert_called_once()
+        mock_bs_client.return_value.list_containers.assert_not_called()
+
+        con.container_cache.invalidate()
+        container_client.exists.return_value = False
+        with pytest.raises(ValueError):
+            con.get_container_client(storage_account="test-account", container="test-container")
+
+
+def test_lazy_connector():
+    with patch("aztools.credentials.DefaultAzureCredential", return_value="mock-cred") as mock_cred:
+        with patch("aztools.storage.BlobServiceClient") as mock_client:
+            con = Connector(storage_account="test-account", container="test-container", lazy=True)
+            mock_cred.assert_not_called()
+            mock_client.assert_not_called()
+
+            # The clients are created on first use and then reused
+            assert con.container_client is mock_client.return_value.get_container_client.return_value
+            assert con.container_client is mock_client.return_value.get_container_client.return_value
+            mock_cred.assert_called_once()
+            mock_client.assert_called_once_with(
+                credential=con.credential,
+                account_url="https://test-account.blob.core.windows.net/",
+                transport=con.transport,
+            )
+            mock_client.return_value.get_container_client.return_value.exists.assert_called_once()
+
+            # A missing container is only reported when the connector is used
+            mock_client.return_value.get_container_client.return_value.exists.return_value = False
+            con = Connector(storage_account="test-account", container="missing", lazy=True)
+            with pytest.raises(ValueError):
+                con.connect()
+
+
+def mock_blob(name, size=0, **properties):
+    """
+    Returns a mock of the blob properties returned by azure listings
+    """
+    blob = MagicMock()
+    blob.name = name
+    blob.size = size
+    for key, value in properties.items():
+        setattr(blob, key, value)
+    return blob
+
+
+def test_download_folder(patched_connector, tmp_path):
+    con = patched_connector(storage_account="test-account", container="test-container")
+    container_client = con.container_client
+    container_client.list_blobs.return_value = [mock_blob(f"dir/file-{i}.txt", size=i) for i in range(20)]
+
+    def download_blob(name, max_concurrency=1):
+        downloader = MagicMock()
+        downloader.readinto.side_effect = lambda f: f.write(name.encode())
+        return downloader
+
+    container_client.download_blob.side_effect = download_blob
+
+    results = con.download_folder(source_path="azure://test-container/dir/", dest_path=str(tmp_path), max_workers=4)
+    assert [result["blob"] for result in results] == [f"dir/file-{i}.txt" for i in range(20)]
+    assert results[3] == {"blob": "dir/file-3.txt", "local_path": str(tmp_path / "file-3.txt"), "size": 3}
+    assert (tmp_path / "file-7.txt").read_text() == "dir/file-7.txt"
+
+    # The first failure is raised
+    container_client.download_blob.side_effect = Exception("failed")
+    with pytest.raises(Exception):
+        con.download_folder(source_path="azure://test-container/dir/", dest_path=str(tmp_path), max_workers=4)
+
+    # Blobs with the same base name would be written to the same file at once
+    container_client.download_blob.side_effect = download_blob
+    container_client.download_blob.reset_mock()
+    container_client.list_blobs.return_value = [mock_blob(name) for name in ["dir/a/x.txt", "dir/b/x.txt"]]
+    with pytest.raises(ValueError):
+        con.download_folder(source_path="azure://test-container/dir/", dest_path=str(tmp_path), max_workers=4)
+    assert [call.args[0] for call in container_client.download_blob.call_args_list] == ["dir/a/x.txt"]
+
+
+@pytest.mark.parametrize(
+    "dest_path, expected_prefix",
+    [
+        ("azure://test-container/models/", "models/"),
+        ("azure://test-container/models", "models/"),
+        ("azure://test-container/", ""),
+    ],
+)
+def test_upload_folder(dest_path, expected_prefix, patched_connector, tmp_path):
+    (tmp_path / "sub" / "deeper").mkdir(parents=True)
+    (tmp_path / "a.txt").write_text("a")
+    (tmp_path / "sub" / "b.txt").write_text("b")
+    (tmp_path / "sub" / "deeper" / "c.txt").write_text("c")
+
+    con = patched_connector(storage_account="test-account", container="test-container")
+    container_client = con.container_client
+
+    results = con.upload_folder(source_path=str(tmp_path), dest_path=dest_path, max_workers=2)
+    expected = [expected_prefix + name for name in ["a.txt", "sub/b.txt", "sub/deeper/c.txt"]]
+    assert [result["blob"] for result in results] == expected
+    assert sorted(call.kwargs["name"] for call in container_client.upload_blob.call_args_list) == expected
+    assert all(call.kwargs["overwrite"] is False for call in container_client.upload_blob.call_args_list)
+
+    # Blobs that already exist are skipped using one listing
+    container_client.upload_blob.reset_mock()
+    container_client.list_blobs.return_value = [mock_blob(expected[1])]
+    results = con.upload_folder(source_path=str(tmp_path), dest_path=dest_path, if_exists="skip")
+    assert [result["uploaded"] for result in results] == [True, False, True]
+    assert container_client.upload_blob.call_count == 2
+
+    with pytest.raises(ValueError):
+        con.upload_folder(source_path=str(tmp_path), dest_path=dest_path, if_exists="sometimes")
+
+
+def first_range(downloader, data: bytes, size: int, etag: str = "etag"):
+    downloader.properties.content_range = f"bytes 0-{len(data) - 1}/{size}"
+    downloader.properties.etag = etag
+    downloader.readall.return_value = data
+
+
+@patch("aztools.storage.FIRST_RANGE_SIZE", 10)
+def test_open_large_blob(patched_connector, tmp_path):
+    con = patched_connector(
+        storage_account="test-account", container="test-container", large_blob_threshold=100, temp_dir=str(tmp_path)
+    )
+    blob_client = con.blob_service_client.get_blob_client.return_value
+    downloader = blob_client.download_blob.return_value
+
+    def download_blob_ranges(client, local_path, **kwargs):
+        assert os.path.dirname(local_path) == str(tmp_path)
+        with open(local_path, "wb") as f:
+            f.write(b"large blob")
+
+    # Blobs over the threshold are downloaded in ranges then read from a temporary file
+    first_range(downloader, b"large blob", size=100)
+    with patch("aztools.storage.download_blob_ranges", side_effect=download_blob_ranges) as mock_download:
+        with con.open(path="azure://test-container/data/large.bin", mode="rb") as f:
+            assert f.read() == b"large blob"
+        assert mock_download.call_args.kwargs["size"] == 100
+        assert mock_download.call_args.kwargs["etag"] == "etag"
+    assert blob_client.download_blob.call_args.kwargs == {"offset": 0, "length": 10}
+    assert not os.listdir(tmp_path)
+
+    # Blobs that fit in the first range are read from it, without a properties request
+    first_range(downloader, b"small", size=5)
+    with patch("aztools.storage.smart_open.open") as mock_open:
+        con.open(path="azure://test-container/data/small.bin", mode="rb")
+        assert mock_open.call_args.args[0].read() == b"small"
+    blob_client.get_blob_properties.assert_not_called()
+
+    # Blobs in between are streamed after the first range, which is not requested again
+    content = bytes(range(99))
+    first_range(downloader, content[:10], size=99)
+
+    def download_blob(offset, length, **kwargs):
+        if offset == 0:
+            return downloader
+        assert kwargs == {"etag": "etag", "match_condition": MatchConditions.IfNotModified}
+        rest = MagicMock()
+        rest.chunks.return_value = [content[offset : offset + 30], content[offset + 30 : offset + length]]
+        return rest
+
+    blob_client.download_blob.side_effect = download_blob
+    with con.open(path="azure://test-container/data/medium.bin", mode="rb") as f:
+        assert f.read() == content
+        assert [call.kwargs["offset"] for call in blob_client.download_blob.call_args_list[-2:]] == [0, 10]
+        f.seek(5)
+        assert f.read(10) == content[5:15]
+        f.seek(50)
+        assert f.read() == content[50:]
+    assert blob_client.download_blob.call_args.kwargs["offset"] == 50
+
+    # Range requests fail on empty blobs
+    blob_client.download_blob.side_effect = HttpResponseError(response=MagicMock(status_code=416))
+    with con.open(path="azure://test-container/data/empty.txt", mode="r") as f:
+        assert f.read() == ""
+
+
+def test_open_write_stages_blocks(patched_connector):
+    con = patched_connector(
+        storage_account="test-account", container="test-container", upload_block_size=4, upload_concurrency=2
+    )
+    blob_client = con.blob_service_client.get_blob_client.return_value
+
+    with con.open(path="azure://test-container/data/out.txt", mode="w") as f:
+        f.write("hello world")
+    con.blob_service_client.get_blob_client.assert_called_with("test-container", "data/out.txt")
+    staged = [call.args[1] for call in blob_client.stage_block.call_args_list]
+    assert staged == [b"hell", b"o wo", b"rld"]
+    assert [block.id for block in blob_client.commit_block_list.call_args.args[0]] == ["00000000", "00000001", "00000002"]
+
+    # The compression is still inferred from the extension
+    blob_client.reset_mock()
+    with con.open(path="azure://test-container/data/out.txt.gz", mode="wb") as f:
+        f.write(b"compressed")
+    staged = b"".join(call.args[1] for call in blob_client.stage_block.call_args_list)
+    assert gzip.decompress(staged) == b"compressed"
+
+
+def test_upload_folder_large_files(patched_connector, tmp_path):
+    (tmp_path / "small.bin").write_bytes(b"x" * 99)
+    (tmp_path / "large.bin").write_bytes(b"x" * 100)
+
+    con = patched_connector(
+        storage_account="test-account", container="test-container", large_blob_threshold=100, upload_block_size=10
+    )
+    container_client = con.container_client
+    with patch("aztools.storage.upload_file_blocks") as mock_upload_blocks:
+        con.upload_folder(source_path=str(tmp_path), dest_path="azure://test-container/dir/", if_exists="overwrite")
+
+    # Files over the threshold are staged in parallel blocks, the rest are uploaded in one call
+    mock_upload_blocks.assert_called_once()
+    assert mock_upload_blocks.call_args.args[1] == str(tmp_path / "large.bin")
+    assert mock_upload_blocks.call_args.kwargs["block_size"] == 10
+    assert mock_upload_blocks.call_args.kwargs["overwrite"] is True
+    container_client.get_blob_client.assert_called_with("dir/large.bin")
+    assert [call.kwargs["name"] for call in container_client.upload_blob.call_args_list] == ["dir/small.bin"]
+
+
+def test_sync_down(patched_connector, tmp_path):
+    con = patched_connector(storage_account="test-account", container="test-container")
+    container_client = con.container_client
+
+    def listing(etags):
+        return [
+            mock_blob(f"data/{name}", size=1, etag=etag, last_modified=None, content_settings=None)
+            for name, etag in etags.items()
+        ]
+
+    def download_blob(name, max_concurrency=1):
+        downloader = MagicMock()
+        downloader.readinto.side_effect = lambda f: f.write(name[-1:].encode())
+        return downloader
+
+    container_client.download_blob.side_effect = download_blob
+    container_client.list_blobs.return_value = listing({"a": "1", "sub/b": "1", "c": "1"})
+
+    summary = con.sync_down(source_path="azure://test-container/data", dest_path=str(tmp_path), max_workers=2)
+    container_client.list_blobs.assert_called_with(name_starts_with="data/")
+    assert summary == {"downloaded": ["a", "sub/b", "c"], "unchanged": [], "deleted": []}
+    assert (tmp_path / "sub" / "b").read_text() == "b"
+
+    # Only the blob with a new etag, and the file changed locally, are downloaded again
+    (tmp_path / "c").write_text("changed")
+    container_client.list_blobs.return_value = listing({"a": "2", "sub/b": "1", "c": "1"})
+    summary = con.sync_down(source_path="azure://test-container/data", dest_path=str(tmp_path))
+    assert summary == {"downloaded": ["a", "c"], "unchanged": ["sub/b"], "deleted": []}
+    assert (tmp_path / "c").read_text() == "c"
+
+    # Local files that are no longer in azure are only deleted when asked to
+    container_client.list_blobs.return_value = listing({"a": "2"})
+    summary = con.sync_down(source_path="azure://test-container/data", dest_path=str(tmp_path))
+    assert summary["deleted"] == []
+    summary = con.sync_down(source_path="azure://test-container/data", dest_path=str(tmp_path), delete=True)
+    assert summary == {"downloaded": [], "unchanged": ["a"], "deleted": ["c", "sub/b"]}
+    assert sorted(os.listdir(tmp_path)) == [".aztools-sync.json", "a", "sub"]
+
+
+def test_sync_down_skips_names_outside_dest(patched_connector, tmp_path):
+    con = patched_connector(storage_account="test-account", container="test-container")
+    container_client = con.container_client
+    container_client.download_blob.return_value.readinto.side_effect = lambda f: f.write(b"x")
+    container_client.list_blobs.return_value = [
+        mock_blob(f"data/{name}", size=1, etag="1", last_modified=None, content_settings=None)
+        for name in ["a/../../outside", "..", "a/./b", "inside"]
+    ]
+    dest = tmp_path / "dest"
+    (tmp_path / "outside").write_text("kept")
+
+    summary = con.sync_down(source_path="azure://test-container/data", dest_path=str(dest), delete=True)
+    assert summary == {"downloaded": ["inside"], "unchanged": [], "deleted": []}
+    assert (dest / "inside").read_bytes() == b"x"
+    assert (tmp_path / "outside").read_text() == "kept"
+
+
+def test_sync_down_content_md5(patched_connector, tmp_path):
+    con = patched_connector(storage_account="test-account", container="test-container")
+    container_client = con.container_client
+    container_client.download_blob.return_value.readinto.side_effect = lambda f: f.write(b"x")
+    content_settings = MagicMock(content_md5=bytearray(b"md5"))
+
+    container_client.list_blobs.return_value = [
+        mock_blob("data/a", size=1, etag="1", last_modified=None, content_settings=content_settings)
+    ]
+    assert con.sync_down(source_path="azure://test-container/data/", dest_path=str(tmp_path))["downloaded"] == ["a"]
+
+    # A blob rewritten with the same content is not downloaded again
+    container_client.list_blobs.return_value = [
+        mock_blob("data/a", size=1, etag="2", last_modified=None, content_settings=content_settings)
+    ]
+    assert con.sync_down(source_path="azure://test-container/data/", dest_path=str(tmp_path))["unchanged"] == ["a"]
+
+
+def test_sync_up(patched_connector, tmp_path):
+    (tmp_path / "sub").mkdir()
+    for name in ["new.txt", "resized.txt", "touched.txt", "same.txt", "sub/old.txt"]:
+        (tmp_path / name).write_text("data")
+    os.utime(tmp_path / "sub" / "old.txt", (1000, 1000))
+
+    def mtime(name):
+        return {"aztools_mtime": str(os.stat(tmp_path / name).st_mtime_ns)}
+
+    con = patched_connector(storage_account="test-account", container="test-container")
+    container_client = con.container_client
+    container_client.list_blobs.return_value = [
+        mock_blob("models/resized.txt", size=3, metadata=mtime("resized.txt")),
+        mock_blob("models/touched.txt", size=4, metadata={"aztools_mtime": "1"}),
+        mock_blob("models/same.txt", size=4, metadata=mtime("same.txt")),
+        # Blobs uploaded without the metadata are compared by their last modified time
+        mock_blob("models/sub/old.txt", size=4, metadata=None, last_modified=datetime.datetime(2020, 1, 1)),
+    ]
+
+    summary = con.sync_up(source_path=str(tmp_path), dest_path="azure://test-container/models", max_workers=2)
+    container_client.list_blobs.assert_called_once_with(
+        name_starts_with="models/", include=["metadata"], results_per_page=5000
+    )
+    assert summary == {"uploaded": ["new.txt", "resized.txt", "touched.txt"], "unchanged": ["same.txt", "sub/old.txt"]}
+    uploads = {call.kwargs["name"]: call.kwargs for call in container_client.upload_blob.call_args_list}
+    assert sorted(uploads) == ["models/new.txt", "models/resized.txt", "models/touched.txt"]
+    assert uploads["models/new.txt"]["overwrite"]
+    assert uploads["models/new.txt"]["metadata"] == mtime("new.txt")
+
+
+def test_sync_up_checksum(patched_connector, tmp_path):
+    (tmp_path / "same.txt").write_text("data")
+    (tmp_path / "changed.txt").write_text("data")
+    md5 = hashlib.md5(b"data").digest()
+
+    con = patched_connector(storage_account="test-account", container="test-container")
+    container_client = con.container_client
+    container_client.list_blobs.return_value = [
+        mock_blob("same.txt", size=4, content_settings=MagicMock(content_md5=bytearray(md5))),
+        mock_blob("changed.txt", size=4, content_settings=MagicMock(content_md5=bytearray(b"other"))),
+    ]
+
+    summary = con.sync_up(source_path=str(tmp_path), dest_path="azure://test-container/", checksum=True)
+    assert summary == {"uploaded": ["changed.txt"], "unchanged": ["same.txt"]}
+    assert container_client.upload_blob.call_args.kwargs["content_settings"].content_md5 == md5
+
+    # Files with a different size are uploaded without being hashed
+    (tmp_path / "changed.txt").write_text("longer data")
+    with patch("aztools.storage.file_md5", side_effect=file_md5) as mock_md5:
+        summary = con.sync_up(source_path=str(tmp_path), dest_path="azure://test-container/", checksum=True)
+    assert summary == {"uploaded": ["changed.txt"], "unchanged": ["same.txt"]}
+    assert [os.path.basename(call.args[0]) for call in mock_md5.call_args_list] == ["same.txt"]
+    assert container_client.upload_blob.call_args.kwargs["content_settings"] is None
+
+
+def test_copy_folder(patched_connector):
+    con = patched_connector(storage_account="test-account", container="test-container")
+    source_client = con.container_client
+    source_client.container_name = "test-container"
+    source_client.list_blobs.return_value = [mock_blob(f"data/{name}") for name in ["a", "sub/b", "c"]]
+    source_client.get_blob_client.side_effect = lambda name: MagicMock(url=f"https://source/{name}")
+
+    dest_client = MagicMock()
+    con.blob_service_client.get_container_client.side_effect = lambda container: dest_client
+    copies = {}
+
+    def get_blob_client(name):
+        blob_client = MagicMock()
+        blob_client.start_copy_from_url.side_effect = lambda url, **kwargs: copies.setdefault(
+            name, {"url": url, "kwargs": kwargs, "copy_status": "success" if name.endswith("a") else "pending"}
+        )
+        return blob_client
+
+    dest_client.get_blob_client.side_effect = get_blob_client
+    # The pending copies finish over two polls of the destination listing
+    dest_client.list_blobs.side_effect = [
+        [mock_blob("promoted/sub/b", copy=MagicMock(status="success")), mock_blob("promoted/c", copy=MagicMock(status="pending"))],
+        [mock_blob("promoted/c", copy=MagicMock(status="failed"))],
+    ]
+
+    with patch("aztools.storage.generate_blob_sas", return_value="sas-token"), patch("aztools.storage.time.sleep"):
+        results = con.copy_folder(
+            source_path="azure://test-container/data", dest_path="azure://other-container/promoted/", max_workers=2
+        )
+
+    assert results == [
+        {"source": "data/a", "blob": "promoted/a", "status": "success"},
+        {"source": "data/sub/b", "blob": "promoted/sub/b", "status": "success"},
+        {"source": "data/c", "blob": "promoted/c", "status": "failed"},
+    ]
+    # Within a storage account the source is read with the connector's credential, no SAS is minted
+    assert copies["promoted/sub/b"]["url"] == "https://source/data/sub/b"
+    assert copies["promoted/a"]["kwargs"]["etag"] == "*"
+    dest_client.list_blobs.assert_called_with(name_starts_with="promoted/", include=["copy"])
+    con.blob_service_client.get_user_delegation_key.assert_not_called()
+
+    # Across storage accounts the source is read through a user delegation SAS
+    copies.clear()
+    with patch("aztools.storage.generate_blob_sas", return_value="sas-token"), patch(
+        "aztools.storage.BlobServiceClient", return_value=con.blob_service_client
+    ):
+        con.copy_folder(
+            source_path="azure://test-container/data",
+            dest_path="https://other-account.blob.core.windows.net/other-container/promoted/",
+            wait=False,
+        )
+    assert copies["promoted/sub/b"]["url"] == "https://source/data/sub/b?sas-token"
+    con.blob_service_client.get_user_delegation_key.assert_called_once()
+
+
+def test_copy_folder_skip_existing(patched_connector):
+    con = patched_connector(storage_account="test-account", container="test-container")
+    con.container_client.list_blobs.return_value = [mock_blob("data/a"), mock_blob("data/b")]
+    dest_client = MagicMock()
+    dest_client.list_blobs.return_value = [mock_blob("copy/a")]
+    dest_client.get_blob_client.return_value.start_copy_from_url.return_value = {"copy_status": "pending"}
+    con.blob_service_client.get_container_client.side_effect = lambda container: dest_client
+
+    with patch("aztools.storage.generate_blob_sas", return_value="sas-token"):
+        results = con.copy_folder(
+            source_path="azure://test-container/data", dest_path="azure://other-container/copy", if_exists="skip", wait=False
+        )
+    assert [result["status"] for result in results] == ["skipped", "pending"]
+    dest_client.get_blob_client.assert_called_once_with("copy/b")
+
+
+class FakePages:
+    """
+    Mimics the page iterator of an azure listing, pages are lists of blobs and tokens are page indexes
+    """
+
+    def __init__(self, pages, continuation_token=None):
+        self.pages = pages
+        self.continuation_token = continuation_token
+
+    def __iter__(self):
+        index = int(self.continuation_token or 0)
+        while index < len(self.pages):
+            page = self.pages[index]
+            index += 1
+            self.continuation_token = str(index) if index < len(self.pages) else None
+            yield page
+
+
+def test_iter_blobs(patched_connector):
+    con = patched_connector(storage_account="test-account", container="test-container")
+    pages = [[mock_blob(f"data/{page}-{i}") for i in range(2)] for page in range(3)]
+    listing = con.container_client.list_blobs.return_value
+    listing.by_page.side_effect = lambda continuation_token=None: FakePages(pages, continuation_token)
+
+    blobs = con.iter_blobs(path="azure://test-container/data/", results_per_page=2)
+    con.container_client.list_blobs.assert_not_called()
+    assert blobs.continuation_token is None
+
+    # Stop in the middle of the second page
+    assert [next(blobs) for _ in range(3)] == ["0-0", "0-1", "1-0"]
+    con.container_client.list_blobs.assert_called_once_with(name_starts_with="data/", results_per_page=2)
+    assert blobs.continuation_token == "1"
+
+    # Resuming yields the rest of the listing from the start of the unfinished page
+    resumed = con.iter_blobs(path="azure://test-container/data/", continuation_token=blobs.continuation_token)
+    assert list(resumed) == ["1-0", "1-1", "2-0", "2-1"]
+    assert resumed.continuation_token is None
+
+
+def test_list_dirs_and_walk(patched_connector):
+    con = patched_connector(storage_account="test-account", container="test-container")
+    tree = {
+        "data/": ["data/year=2021/", "data/year=2022/", "data/README"],
+        "data/year=2021/": ["data/year=2021/month=01/"],
+        "data/year=2021/month=01/": ["data/year=2021/month=01/part-0"],
+        "data/year=2022/": [],
+    }
+
+    def walk_blobs(name_starts_with=None, delimiter="/"):
+        return [
+            BlobPrefix(None, prefix=name) if name.endswith("/") else mock_blob(name) for name in tree[name_starts_with]
+        ]
+
+    container_client = con.container_client
+    container_client.walk_blobs.side_effect = walk_blobs
+
+    assert con.list_dirs(path="azure://test-container/data") == ["year=2021", "year=2022"]
+    container_client.walk_blobs.assert_called_once_with(name_starts_with="data/", delimiter="/")
+
+    assert list(con.walk(path="azure://test-container/data/")) == [
+        ("", ["year=2021", "year=2022"], ["README"]),
+        ("year=2021", ["month=01"], []),
+        ("year=2021/month=01", [], ["part-0"]),
+        ("year=2022", [], []),
+    ]
+    assert [level[0] for level in con.walk(path="azure://test-container/data", max_depth=1)] == [
+        "",
+        "year=2021",
+        "year=2022",
+    ]
+
+    # Directories removed from dirs are not walked
+    levels = []
+    for relative_path, dirs, files in con.walk(path="azure://test-container/data"):
+        levels.append(relative_path)
+        dirs[:] = [name for name in dirs if name != "year=2021"]
+    assert levels == ["", "year=2022"]
+
+
+def test_glob(patched_connector):
+    con = patched_connector(storage_account="test-account", container="test-container")
+    names = [
+        "data/2023-12/part-0.parquet",
+        "data/2024-01/part-0.parquet",
+        "data/2024-01/part-1.parquet",
+        "data/2024-01/_SUCCESS",
+        "data/2024-02/nested/part-0.parquet",
+        "data/2024-02/part-0.parquet",
+        "other/part-0.parquet",
+    ]
+
+    def walk_blobs(name_starts_with=None, delimiter="/"):
+        level = {}
+        for name in names:
+            if name.startswith(name_starts_with or ""):
+                rest = name[len(name_starts_with or ""):]
+                if delimiter in rest:
+                    prefix = name_starts_with + rest.split(delimiter)[0] + delimiter
+                    level[prefix] = BlobPrefix(None, prefix=prefix)
+                else:
+                    level[name] = mock_blob(name)
+        return list(level.values())
+
+    container_client = con.container_client
+    container_client.walk_blobs.side_effect = walk_blobs
+    container_client.list_blobs.side_effect = lambda name_starts_with=None: [
+        mock_blob(name) for name in names if name.startswith(name_starts_with or "")
+    ]
+
+    assert con.glob(path="azure://test-container/data/2024-*/part-*.parquet") == [
+        "data/2024-01/part-0.parquet",
+        "data/2024-01/part-1.parquet",
+        "data/2024-02/part-0.parquet",
+    ]
+    # Only the literal start of each level is listed, "data/" itself is never listed
+    assert [call.kwargs["name_starts_with"] for call in container_client.walk_blobs.call_args_list] == [
+        "data/2024-",
+        "data/2024-01/part-",
+        "data/2024-02/part-",
+    ]
+    container_client.list_blobs.assert_not_called()
+
+    assert con.glob(path="azure://test-container/data/**/part-0.parquet") == [
+        "data/2023-12/part-0.parquet",
+        "data/2024-01/part-0.parquet",
+        "data/2024-02/nested/part-0.parquet",
+        "data/2024-02/part-0.parquet",
+    ]
+    container_client.list_blobs.assert_called_once_with(name_starts_with="data/")
+    assert con.glob(path="azure://test-container/data/2024-0[!1]/*") == ["data/2024-02/part-0.parquet"]
+
+
+def test_blobs_exist(patched_connector):
+    con = patched_connector(storage_account="test-account", container="test-container")
+    existing = {f"outputs/part-{i:03d}" for i in range(0, 40, 2)} | {"models/a"}
+
+    def list_blobs(name_starts_with=None, results_per_page=None):
+        names = sorted(name for name in existing | {"outputs/zzz"} if name.startswith(name_starts_with))
+        listing = MagicMock()
+        listing.by_page.return_value = [[mock_blob(name) for name in names[i : i + 10]] for i in range(0, len(names), 10)]
+        return listing
+
+    container_client = con.container_client
+    container_client.list_blobs.side_effect = list_blobs
+    con.blob_service_client.get_blob_client.side_effect = lambda container, name: MagicMock(
+        exists=MagicMock(return_value=name in existing)
+    )
+
+    paths = [f"azure://test-container/outputs/part-{i:03d}" for i in range(32)]
+    paths += ["azure://test-container/models/a", "azure://test-container/models/b"]
+    results = con.blobs_exist(paths, max_workers=4)
+
+    assert results == {path: path.split("/", 3)[3] in existing for path in paths}
+    # The dense directory is listed from the prefix its names share, the sparse one is checked with HEAD requests
+    container_client.list_blobs.assert_called_once_with(name_starts_with="outputs/part-0", results_per_page=5000)
+    heads = sorted(call.args[1] for call in con.blob_service_client.get_blob_client.call_args_list)
+    assert heads == ["models/a", "models/b"]
+
+
+def test_blobs_exist_missing_container(patched_connector):
+    con = patched_connector(storage_account="test-account", container="test-container")
+
+    def missing_pages():
+        # Listings are lazy, the error is raised by the first page
+        raise ResourceNotFoundError("ContainerNotFound")
+        yield
+
+    con.container_client.list_blobs.return_value.by_page.side_effect = missing_pages
+    con.blob_service_client.get_blob_client.return_value.exists.return_value = False
+    con.container_client.exists.reset_mock()
+
+    # Listed and HEAD checked paths of a missing container are both reported as not existing
+    paths = [f"azure://missing/dense/{i:02d}" for i in range(16)] + ["azure://missing/sparse/a"]
+    assert con.blobs_exist(paths) == {path: False for path in paths}
+    con.container_client.exists.assert_not_called()
+
+
+def test_blobs_exist_listing_budget(patched_connector):
+    con = patched_connector(storage_account="test-account", container="test-container")
+    # Many blobs that were not asked about sit between the names, so the listing runs out of pages
+    names = sorted([f"data/{i:04d}" for i in range(0, 1000)])
+    listing = MagicMock()
+    listing.by_page.return_value = [[mock_blob(name) for name in names[i : i + 100]] for i in range(0, 1000, 100)]
+    con.container_client.list_blobs.return_value = listing
+    con.blob_service_client.get_blob_client.return_value.exists.return_value = True
+
+    paths = [f"azure://test-container/data/{i:04d}" for i in range(0, 2000, 100)]
+    results = con.blobs_exist(paths, max_workers=8)
+
+    assert all(results.values())
+    # 20 names on 8 workers is worth 3 pages, the names past the third page are checked with HEAD requests
+    heads = [call.args[1] for call in con.blob_service_client.get_blob_client.call_args_list]
+    assert sorted(heads) == [f"data/{i:04d}" for i in range(300, 2000, 100)]
+
+
+def test_connection_pool_size(patched_connector, tmp_path, caplog):
+    # The default pool fits the default 8 workers each downloading a large blob in 8 ranges
+    con = patched_connector(storage_account="test-account", container="test-container")
+    assert con.pool_size == 64
+    con = patched_connector(
+        storage_account="test-account", container="test-container", download_concurrency=1, upload_concurrency=1
+    )
+    assert con.pool_size == 10
+
+    con = patched_connector(
+        storage_account="test-account", container="test-container", pool_size=4, large_blob_threshold=100
+    )
+    con.blob_service_client.get_blob_client.return_value.exists.return_value = True
+    with patch("aztools.storage.ordered_map", side_effect=ordered_map) as mock_map:
+        con.blobs_exist(["azure://test-container/a"])
+    assert mock_map.call_args_list[-1].kwargs["max_workers"] == 4
+
+    # Workers and their ranges are not reduced to fit the pool, a warning is logged instead
+    con.container_client.list_blobs.return_value = [mock_blob("dir/large.bin", size=100, etag="etag")]
+    with patch("aztools.storage.download_blob_ranges") as mock_download:
+        con.download_folder(source_path="azure://test-container/dir", dest_path=str(tmp_path), max_workers=2)
+    assert mock_download.call_args.kwargs["max_concurrency"] == 8
+    assert "pool_size of 4" in caplog.text
+
+
+def batch_responses(*blobs, failing=(), **kwargs):
+    """
+    Mimics the sub-request responses of ContainerClient.delete_blobs
+    """
+    return iter(
+        MagicMock(status_code=403, reason="Forbidden") if name in failing else MagicMock(status_code=202, reason="Accepted")
+        for name in blobs
+    )
+
+
+def test_delete_folder(patched_connector):
+    con = patched_connector(storage_account="test-account", container="test-container")
+    container_client = con.container_client
+    container_client.list_blobs.return_value = [mock_blob(f"tmp/{i}") for i in range(600)]
+    container_client.delete_blobs.side_effect = lambda *blobs, **kwargs: batch_responses(*blobs, failing={"tmp/300"})
+
+    summary = con.delete_folder(path="azure://test-container/tmp", max_workers=2)
+
+    assert summary == {"deleted": 599, "failed": {"tmp/300": "403 Forbidden"}}
+    container_client.list_blobs.assert_called_once_with(name_starts_with="tmp/", results_per_page=5000)
+    batches = container_client.delete_blobs.call_args_list
+    assert [len(call.args) for call in batches] == [256, 256, 88]
+    assert batches[0].kwargs == {"delete_snapshots": "include", "raise_on_any_failure": False}
+
+    # Batches are limited to 256 sub-requests
+    with pytest.raises(ValueError):
+        con.delete_folder(path="azure://test-container/tmp", batch_size=257)
+
+    # Deleting a whole container has to be asked for
+    container_client.list_blobs.reset_mock()
+    with pytest.raises(ValueError):
+        con.delete_folder()
+    with pytest.raises(ValueError):
+        con.delete_folder(path="azure://test-container/")
+    container_client.list_blobs.assert_not_called()
+    con.delete_folder(allow_container_root=True)
+    container_client.list_blobs.assert_called_once_with(name_starts_with=None, results_per_page=5000)
+
+
+def test_delete_many(patched_connector):
+    con = patched_connector(storage_account="test-account", container="test-container")
+    container_clients = {}
+
+    def get_container_client(container):
+        client = container_clients.setdefault(container, MagicMock())
+        client.delete_blobs.side_effect = lambda *blobs, **kwargs: batch_responses(*blobs, failing={"b"})
+        return client
+
+    con.blob_service_client.get_container_client.side_effect = get_container_client
+    paths = ["azure://container-1/a", "azure://container-1/b", "azure://container-2/c"]
+
+    summary = con.delete_many(paths, batch_size=1)
+
+    assert summary == {"deleted": 2, "failed": {"azure://container-1/b": "403 Forbidden"}}
+    assert container_clients["container-1"].delete_blobs.call_count == 2
+    container_clients["container-2"].delete_blobs.assert_called_once_with(
+        "c", delete_snapshots="include", raise_on_any_failure=False
+    )
+    with pytest.raises(ValueError):
+        con.delete_many(paths, batch_size=500)
+
+
+def listed_blobs():
+    modified = datetime.datetime(2021, 1, 1, tzinfo=datetime.timezone.utc)
+    return [
+        mock_blob(
+            "data/data/a",
+            size=1,
+            etag="1",
+            last_modified=modified,
+            content_settings=MagicMock(content_md5=bytearray(b"md5")),
+            blob_tier="Hot",
+        ),
+        mock_blob("data/b", size=2, etag="2", last_modified=modified, content_settings=None, blob_tier=None),
+    ]
+
+
+def test_list_blobs(patched_connector):
+    con = patched_connector(storage_account="test-account", container="test-container")
+    con.container_client.list_blobs.return_value = listed_blobs()
+
+    # Only the start of the name is removed, not every occurrence of the path
+    assert con.list_blobs(path="azure://test-container/data/") == ["data/a", "b"]
+
+    records = con.list_blobs(path="azure://test-container/data/", with_properties=True)
+    assert records[0] == BlobRecord(
+        "data/a", 1, "1", datetime.datetime(2021, 1, 1, tzinfo=datetime.timezone.utc), "bWQ1", "Hot"
+    )
+    assert records[1].content_md5 is None and records[1].tier is None
+    assert not hasattr(records[0], "__dict__")
+
+    with pytest.raises(ValueError):
+        con.list_blobs(path="azure://test-container/data/", columnar="pandas")
+
+
+def test_list_blobs_numpy(patched_connector):
+    numpy = pytest.importorskip("numpy")
+    con = patched_connector(storage_account="test-account", container="test-container")
+    con.container_client.list_blobs.return_value = listed_blobs()
+
+    columns = con.list_blobs(path="azure://test-container/data/", columnar="numpy")
+    assert list(columns["name"]) == ["data/a", "b"]
+    assert columns["size"].dtype == numpy.int64 and columns["size"].sum() == 3
+    assert columns["last_modified"][0] == numpy.datetime64("2021-01-01T00:00:00", "us")
+
+
+def test_list_blobs_arrow(patched_connector):
+    pytest.importorskip("pyarrow")
+    con = patched_connector(storage_account="test-account", container="test-container")
+    con.container_client.list_blobs.return_value = listed_blobs()
+
+    table = con.list_blobs(path="azure://test-container/data/", columnar="arrow")
+    assert table.column("name").to_pylist() == ["data/a", "b"]
+    assert table.column("tier").to_pylist() == ["Hot", None]
+
+
+def test_arguments_decorator_binding():
+    con = MockConnector(storage_account="test-account", container="test-container")
+
+    # Location arguments can be passed positionally, and the wrapped function's metadata is kept
+    assert con.func("azure://other-container/a.txt") == (None, "test-account", "other-container", "a.txt")
+    assert con.func_extra_args(None, None, None, "a.txt", extra="x") == (
+        None,
+        "test-account",
+        "test-container",
+        "a.txt",
+        "x",
+    )
+    assert MockConnector.func.__name__ == "func"
+    assert list(inspect.signature(MockConnector.func).parameters) == [
+        "self",
+        "path",
+        "storage_account",
+        "container",
+        "file_path",
+    ]
+    with pytest.raises(TypeError):
+        con.func("azure://other-container/a.txt", path="azure://other-container/b.txt")
+
+    # AzurePath objects are used without parsing
+    assert con.multi_func(source_path=AzurePath(None, "a", "x"), dest_path=AzurePath("account", "b", "y")) == (
+        None,
+        "test-account",
+        "a",
+        "x",
+        None,
+        "account",
+        "b",
+        "y",
+    )
+
+
+def test_arguments_decorator_checks_parameters():
+    with pytest.raises(ValueError):
+
+        @arguments_decorator()
+        def func(self, file_path=None, path=None, storage_account=None, container=None):
+            pass
@@ -0,0 +1,94 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from azure.core.credentials import AccessToken
+from aztools.credentials import CachedTokenCredential, get_shared_credential
+from aztools.storage import Connector
+from tests.fixtures import reset_shared_credentials
+
+
+def test_cached_token_credential():
+    inner = MagicMock()
+    inner.get_token.side_effect = [AccessToken("token-1", 1000), AccessToken("token-2", 2000)]
+    credential = CachedTokenCredential(inner, refresh_margin=300)
+
+    with patch("aztools.credentials.time.time", return_value=0):
+        # Tokens are cached per scope
+        assert credential.get_token("scope").token == "token-1"
+        assert credential.get_token("scope").token == "token-1"
+        assert inner.get_token.call_count == 1
+        assert credential.get_token("other-scope").token == "token-2"
+        assert inner.get_token.call_count == 2
+
+    # Tokens are refreshed once they are within the refresh margin of expiring
+    inner.get_token.side_effect = [AccessToken("token-3", 4000)]
+    with patch("aztools.credentials.time.time", return_value=800):
+        assert credential.get_token("scope").token == "token-3"
+
+    # A failed refresh falls back to the cached token while it is still valid
+    inner.get_token.side_effect = Exception("failed")
+    with patch("aztools.credentials.time.time", return_value=3800):
+        assert credential.get_token("scope").token == "token-3"
+    with patch("aztools.credentials.time.time", return_value=4001):
+        with pytest.raises(Exception):
+            credential.get_token("scope")
+
+    # Claims challenges always go to the credential
+    inner.get_token.side_effect = [AccessToken("token-4", 5000)]
+    assert credential.get_token("scope", claims="claims").token == "token-4"
+
+
+def test_shared_credential():
+    with patch("aztools.credentials.DefaultAzureCredential") as mock_cred:
+        mock_cred.return_value.get_token.return_value = AccessToken("token", 2 ** 40)
+        assert get_shared_credential() is get_shared_credential()
+
+        # Connectors share the credential, so a second connector makes no extra token requests
+        first = Connector(storage_account="test-account", lazy=True)
+        second = Connector(storage_account="test-account-2", lazy=True)
+        assert first.credential is second.credential
+        first.credential.get_token("https://storage.azure.com/.default")
+        second.credential.get_token("https://storage.azure.com/.default")
+        mock_cred.assert_called_once()
+        mock_cred.return_value.get_token.assert_called_once()
+
+
+def test_auth_modes(monkeypatch):
+    with patch("aztools.credentials.DefaultAzureCredential") as mock_default, patch(
+        "aztools.credentials.AzureCliCredential"
+    ) as mock_cli:
+        # An explicit auth mode creates only that credential type, once per process
+        con = Connector(storage_account="test-account", auth_mode="cli", lazy=True)
+        assert con.credential.credential is mock_cli.return_value
+        assert Connector(auth_mode="cli", lazy=True).credential is con.credential
+        mock_cli.assert_called_once()
+        mock_default.assert_not_called()
+
+        # The environment variable is used when no auth mode is passed
+        monkeypatch.setenv("AZTOOLS_AUTH_MODE", "cli")
+        assert Connector(lazy=True).credential is con.credential
+        monkeypatch.delenv("AZTOOLS_AUTH_MODE")
+        assert Connector(lazy=True).credential.credential is mock_default.return_value
+
+    # Explicit credentials are used directly
+    con = Connector(credential="my-cred", lazy=True)
+    assert con.credential.credential == "my-cred"
+
+    # Unknown auth modes are rejected when the connector is created, even a lazy one
+    with pytest.raises(ValueError):
+        Connector(auth_mode="unknown", lazy=True)
+    with pytest.raises(ValueError):
+        Connector(credential="my-cred", auth_mode="cli", lazy=True)
+
+
+def test_service_principal_auth_mode(monkeypatch):
+    monkeypatch.setenv("AZURE_TENANT_ID", "tenant")
+    monkeypatch.setenv("AZURE_CLIENT_ID", "client")
+    monkeypatch.delenv("AZURE_CLIENT_SECRET", raising=False)
+    with patch("aztools.credentials.ClientSecretCredential") as mock_secret:
+        with pytest.raises(ValueError, match="AZURE_CLIENT_SECRET"):
+            Connector(auth_mode="service_principal", lazy=True).credential
+
+        monkeypatch.setenv("AZURE_CLIENT_SECRET", "secret")
+        con = Connector(auth_mode="service_principal", lazy=True)
+        assert con.credential.credential is mock_secret.return_value
+    mock_secret.assert_called_once_with(tenant_id="tenant", client_id="client", client_secret="secret")
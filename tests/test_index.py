@@ -0,0 +1,180 @@
+import datetime
+import itertools
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+from aztools.index import ListingIndex, glob_prefix, prefix_range
+from tests.fixtures import *
+
+
+def mock_blob(name, size=1, etag="1", tier="Hot"):
+    blob = MagicMock(
+        size=size,
+        etag=etag,
+        last_modified=datetime.datetime(2021, 1, 1, tzinfo=datetime.timezone.utc),
+        content_settings=MagicMock(content_md5=bytearray(b"md5")),
+        blob_tier=tier,
+    )
+    blob.name = name
+    return blob
+
+
+@pytest.fixture
+def index(tmp_path):
+    with ListingIndex(str(tmp_path / "index" / "listing.db"), max_age=60) as index:
+        yield index
+
+
+def test_prefix_range():
+    assert prefix_range("") == ("", None)
+    assert prefix_range("data/") == ("data/", "data0")
+    assert glob_prefix("data/year=*/part-?") == "data/year="
+
+
+def test_refresh_and_queries(index):
+    container_client = MagicMock()
+    container_client.list_blobs.return_value = [
+        mock_blob("data/a.csv", size=10),
+        mock_blob("data/b.json", size=20),
+        mock_blob("data/sub/c.csv", size=30),
+        mock_blob("data0", size=40),
+    ]
+    assert index.refresh(container_client, "account", "container") == 4
+    container_client.list_blobs.assert_called_once_with(name_starts_with=None, results_per_page=5000)
+
+    assert index.list_blobs("account", "container", "data/") == ["data/a.csv", "data/b.json", "data/sub/c.csv"]
+    assert index.list_blobs("other", "container", "data/") == []
+    assert index.glob("account", "container", "data/*.csv") == ["data/a.csv", "data/sub/c.csv"]
+    assert index.glob("account", "container", "data/[!a]*") == ["data/b.json", "data/sub/c.csv"]
+    assert index.total_size("account", "container", "data/") == (3, 60)
+    assert index.blobs("account", "container", "data/a") == [
+        {
+            "name": "data/a.csv",
+            "size": 10,
+            "etag": "1",
+            "last_modified": 1609459200.0,
+            "content_md5": "bWQ1",
+            "tier": "Hot",
+        }
+    ]
+
+    # Refreshing a prefix updates changed blobs and removes deleted ones under it only
+    container_client.list_blobs.return_value = [
+        mock_blob("data/a.csv", size=15, etag="2"),
+        mock_blob("data/b.json", size=20, tier="Archive"),
+        mock_blob("data/d.csv"),
+    ]
+    index.refresh(container_client, "account", "container", "data/")
+    assert index.list_blobs("account", "container") == ["data/a.csv", "data/b.json", "data/d.csv", "data0"]
+    assert index.total_size("account", "container", "data/a") == (1, 15)
+    # A tier change does not change the etag
+    assert index.blobs("account", "container", "data/b")[0]["tier"] == "Archive"
+
+
+def test_staleness(index):
+    container_client = MagicMock()
+    container_client.list_blobs.return_value = [mock_blob("data/a")]
+
+    with patch("aztools.index.time.time", return_value=1000):
+        assert index.ensure(container_client, "account", "container", "data/")
+        # A listing covers the prefixes inside it
+        assert not index.ensure(container_client, "account", "container", "data/sub/")
+        # The whole container is not covered by it
+        assert index.ensure(container_client, "account", "container", "")
+    assert container_client.list_blobs.call_count == 2
+
+    with patch("aztools.index.time.time", return_value=1059):
+        assert index.is_fresh("account", "container", "data/")
+        assert not index.is_fresh("account", "container", "data/", max_age=30)
+    with patch("aztools.index.time.time", return_value=1061):
+        assert not index.is_fresh("account", "container", "data/x")
+
+    index.invalidate(account="account")
+    assert index.refreshed_at("account", "container", "data/") is None
+
+
+def test_queries_run_while_listing(index):
+    container_client = MagicMock()
+    container_client.list_blobs.return_value = [mock_blob("other/a")]
+    index.refresh(container_client, "account", "container", "other/")
+    queried = []
+
+    def slow_listing(**kwargs):
+        yield mock_blob("data/a")
+        # Another thread queries the index while this listing is still being read
+        thread = threading.Thread(target=lambda: queried.append(index.list_blobs("account", "container", "other/")))
+        thread.start()
+        thread.join(timeout=5)
+        yield mock_blob("data/b")
+
+    container_client.list_blobs.side_effect = slow_listing
+    assert index.ensure(container_client, "account", "container", "data/")
+    assert queried == [["other/a"]]
+    assert index.list_blobs("account", "container", "data/") == ["data/a", "data/b"]
+
+
+def test_older_listings_do_not_overwrite_newer(index):
+    newer_client = MagicMock()
+
+    def slow_listing(blobs, newer_prefix, newer_blobs):
+        def list_blobs(**kwargs):
+            yield blobs[0]
+            # Another listing starts after this one and is written first
+            newer_client.list_blobs.return_value = newer_blobs
+            thread = threading.Thread(target=index.refresh, args=(newer_client, "account", "container", newer_prefix))
+            thread.start()
+            thread.join(timeout=5)
+            yield from blobs[1:]
+
+        return list_blobs
+
+    container_client = MagicMock()
+    # Ticks of a clock, so every listing starts later than the one before
+    with patch("aztools.index.time.time", side_effect=itertools.count(1000)):
+        container_client.list_blobs.side_effect = slow_listing([mock_blob("data/old")], "data/", [mock_blob("data/new")])
+        assert index.refresh(container_client, "account", "container", "data/") == 1
+        assert index.list_blobs("account", "container", "data/") == ["data/new"]
+
+        # Only the blobs under the newer, longer prefix are left as that listing found them
+        container_client.list_blobs.side_effect = slow_listing(
+            [mock_blob("data/sub/a", etag="1"), mock_blob("other/a")],
+            "data/sub/",
+            [mock_blob("data/sub/a", etag="2"), mock_blob("data/sub/b")],
+        )
+        index.refresh(container_client, "account", "container")
+    assert [(blob["name"], blob["etag"]) for blob in index.blobs("account", "container")] == [
+        ("data/sub/a", "2"),
+        ("data/sub/b", "1"),
+        ("other/a", "1"),
+    ]
+
+
+def test_refresh_locks_are_released(index):
+    container_client = MagicMock()
+    container_client.list_blobs.return_value = [mock_blob("data/a")]
+    assert index.ensure(container_client, "account", "container", "data/")
+    assert not index.ensure(container_client, "account", "container", "data/")
+    assert index._refresh_locks == {}
+
+
+def test_connector_list_blobs_from_index(patched_connector):
+    index = ListingIndex(":memory:")
+    con = patched_connector(storage_account="test-account", container="test-container", listing_index=index)
+    con.container_client.list_blobs.return_value = [mock_blob("data/a"), mock_blob("data/sub/data/b")]
+
+    assert con.list_blobs(path="azure://test-container/data/") == ["a", "sub/data/b"]
+    assert con.list_blobs(path="azure://test-container/data/sub/") == ["data/b"]
+    con.container_client.list_blobs.assert_called_once()
+
+    con.list_blobs(path="azure://test-container/data/", max_age=0)
+    assert con.container_client.list_blobs.call_count == 2
+
+
+def test_connector_records_from_index(patched_connector):
+    con = patched_connector(storage_account="test-account", container="test-container", listing_index=ListingIndex(":memory:"))
+    con.container_client.list_blobs.return_value = [mock_blob("data/a", size=5)]
+
+    records = con.list_blobs(path="azure://test-container/data/", with_properties=True)
+    assert records == [
+        BlobRecord("a", 5, "1", datetime.datetime(2021, 1, 1, tzinfo=datetime.timezone.utc), "bWQ1", "Hot")
+    ]
@@ -0,0 +1,56 @@
+import pickle
+import pytest
+from aztools.paths import AzurePath, is_azure_path, parse_path
+from tests.fixtures import *
+
+
+@pytest.mark.parametrize(
+    "path, storage_account, expected",
+    [
+        (
+            "https://test-account.blob.core.windows.net/test-container/dir/file.txt",
+            "other-account",
+            AzurePath("test-account", "test-container", "dir/file.txt"),
+        ),
+        ("azure://test-container/dir/file.txt", None, AzurePath(None, "test-container", "dir/file.txt")),
+        ("azure://test-container/dir/", "account", AzurePath("account", "test-container", "dir/")),
+        ("azure://test-container", None, AzurePath(None, "test-container", "")),
+    ],
+)
+def test_parse_path(path, storage_account, expected):
+    assert parse_path(path, storage_account) == expected
+    assert AzurePath.parse(path, storage_account) is parse_path(path, storage_account)
+
+
+def test_parse_path_rejects_local_paths():
+    with pytest.raises(ValueError):
+        parse_path("/home/user/file.txt")
+
+
+def test_azure_path_value():
+    path = AzurePath("account", "container", "dir/file.txt")
+    assert str(path) == "https://account.blob.core.windows.net/container/dir/file.txt"
+    assert str(AzurePath(None, "container", "file")) == "azure://container/file"
+    assert len({path, AzurePath("account", "container", "dir/file.txt")}) == 1
+    assert pickle.loads(pickle.dumps(path)) == path
+    assert is_azure_path(path)
+    assert path.with_storage_account("other") is path
+    assert AzurePath(None, "container").with_storage_account("other").storage_account == "other"
+    with pytest.raises(AttributeError):
+        path.container = "other"
+    with pytest.raises(AttributeError):
+        path.extra = 1
+
+
+def test_connector_accepts_azure_path(patched_connector):
+    con = patched_connector(storage_account="test-account", container="test-container")
+    path = AzurePath(None, "test-container", "data/a")
+
+    assert con.parse_azure_path(path) == {
+        "storage_account": "test-account",
+        "container": "test-container",
+        "file_path": "data/a",
+    }
+    con.container_client.list_blobs.return_value = []
+    assert con.list_blobs(path=AzurePath("test-account", "test-container", "data/")) == []
+    con.container_client.list_blobs.assert_called_once_with(name_starts_with="data/")
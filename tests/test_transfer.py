@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+from azure.core import MatchConditions
+from aztools.transfer import BlockBlobWriter, download_blob_ranges, open_temporary, upload_file_blocks
+
+
+class FakeBlobClient:
+    """
+    A blob client that serves ranges of an in memory blob, recording the ranges requested
+    """
+
+    def __init__(self, data: bytes, etag: str = "etag-1"):
+        self.data = data
+        self.etag = etag
+        self.requests = []
+
+    def get_blob_properties(self):
+        properties = MagicMock()
+        properties.size = len(self.data)
+        properties.etag = self.etag
+        return properties
+
+    def download_blob(self, offset, length, etag, match_condition):
+        assert etag == self.etag and match_condition == MatchConditions.IfNotModified
+        self.requests.append((offset, length))
+        content = self.data[offset : offset + length]
+        downloader = MagicMock()
+        # Split each range in two chunks to check they are written at the right position
+        downloader.chunks.return_value = [content[: length // 2], content[length // 2 :]]
+        return downloader
+
+
+def test_download_blob_ranges(tmp_path):
+    data = os.urandom(1000)
+    blob_client = FakeBlobClient(data)
+    local_path = str(tmp_path / "blob.bin")
+
+    assert download_blob_ranges(blob_client, local_path, chunk_size=64, max_concurrency=4) == 1000
+    with open(local_path, "rb") as f:
+        assert f.read() == data
+    assert sorted(blob_client.requests) == [(offset, min(64, 1000 - offset)) for offset in range(0, 1000, 64)]
+
+    # An existing, longer file is overwritten
+    assert download_blob_ranges(FakeBlobClient(data[:10]), local_path, size=10, etag="etag-1") == 10
+    with open(local_path, "rb") as f:
+        assert f.read() == data[:10]
+
+
+def test_download_empty_blob(tmp_path):
+    local_path = str(tmp_path / "blob.bin")
+    assert download_blob_ranges(FakeBlobClient(b""), local_path) == 0
+    assert os.path.getsize(local_path) == 0
+
+
+def test_open_temporary(tmp_path):
+    local_path = tmp_path / "temp.bin"
+    local_path.write_bytes(b"data")
+    with open_temporary(str(local_path)) as f:
+        assert f.read() == b"data"
+    assert not local_path.exists()
+
+
+def test_upload_file_blocks(tmp_path):
+    data = os.urandom(1000)
+    local_path = tmp_path / "file.bin"
+    local_path.write_bytes(data)
+
+    staged = {}
+    blob_client = MagicMock()
+
+    def stage_block(block_id, stream, length):
+        body = stream.read()
+        # Blocks are sent as views of the memory mapped file, not copies
+        assert isinstance(body, memoryview)
+        assert len(body) == length
+        staged[block_id] = bytes(body)
+
+    blob_client.stage_block.side_effect = stage_block
+
+    assert upload_file_blocks(blob_client, str(local_path), block_size=64, max_concurrency=4) == 1000
+    committed = [block.id for block in blob_client.commit_block_list.call_args.args[0]]
+    assert committed == sorted(staged)
+    assert len({len(block_id) for block_id in committed}) == 1
+    assert b"".join(staged[block_id] for block_id in committed) == data
+    # Without overwrite the commit only succeeds if the blob does not exist
+    assert blob_client.commit_block_list.call_args.kwargs["match_condition"] == MatchConditions.IfMissing
+
+    upload_file_blocks(blob_client, str(local_path), block_size=512, overwrite=True)
+    assert "match_condition" not in blob_client.commit_block_list.call_args.kwargs
+
+
+def test_block_blob_writer():
+    data = os.urandom(1000)
+    staged = {}
+    lock = threading.Lock()
+    in_flight = [0, 0]
+    blob_client = MagicMock()
+
+    def stage_block(block_id, block, length):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        time.sleep(0.01)
+        staged[block_id] = block
+        with lock:
+            in_flight[0] -= 1
+
+    blob_client.stage_block.side_effect = stage_block
+
+    with BlockBlobWriter(blob_client, "blob.bin", block_size=64, max_concurrency=4) as f:
+        for offset in range(0, 1000, 100):
+            f.write(data[offset : offset + 100])
+    committed = [block.id for block in blob_client.commit_block_list.call_args.args[0]]
+    assert committed == sorted(staged)
+    assert b"".join(staged[block_id] for block_id in committed) == data
+    # Blocks are staged in parallel, at most max_concurrency at once
+    assert 1 < in_flight[1] <= 4
+    blob_client.upload_blob.assert_not_called()
+
+    # Less than a block is uploaded with one request
+    with BlockBlobWriter(blob_client, "blob.bin", block_size=64) as f:
+        f.write(b"small")
+    blob_client.upload_blob.assert_called_once_with(b"small", overwrite=True)
+
+    # A failed block is raised, closing the file without committing anything
+    blob_client.reset_mock()
+    blob_client.stage_block.side_effect = RuntimeError("failed to stage")
+    f = BlockBlobWriter(blob_client, "blob.bin", block_size=64, max_concurrency=2)
+    with pytest.raises(RuntimeError):
+        f.write(data)
+    assert f.closed
+    f.close()
+    blob_client.commit_block_list.assert_not_called()
+
+    # Terminating commits nothing
+    blob_client.stage_block.side_effect = None
+    f = BlockBlobWriter(blob_client, "blob.bin", block_size=64)
+    f.write(data)
+    f.terminate()
+    assert f.closed
+    blob_client.commit_block_list.assert_not_called()
+    blob_client.upload_blob.assert_not_called()
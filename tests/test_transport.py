@@ -0,0 +1,51 @@
+from unittest.mock import patch
+import requests
+from azure.core.pipeline.transport._requests_basic import BiggerBlockSizeHTTPAdapter
+from aztools.transport import build_session, build_transport, close_transport
+from aztools.storage import Connector
+from tests.fixtures import reset_shared_credentials
+
+
+def test_build_session():
+    session = build_session(pool_size=32, pool_connections=4)
+    adapter = session.get_adapter("https://test-account.blob.core.windows.net/")
+    assert adapter._pool_maxsize == 32
+    assert adapter._pool_connections == 4
+    assert adapter.max_retries.total is False
+    # Large request bodies are sent in 32 KiB blocks by azure-core's adapter, as in the session azure-core creates
+    assert isinstance(adapter, BiggerBlockSizeHTTPAdapter)
+    assert adapter.get_connection_with_tls_context(
+        requests.Request("PUT", "https://test-account.blob.core.windows.net/").prepare(), verify=True
+    ).conn_kw["blocksize"] == 32768
+    assert session.headers["Connection"] == "keep-alive"
+
+    session = build_session(keep_alive=False)
+    assert session.headers["Connection"] == "close"
+
+
+def test_build_transport():
+    transport = build_transport(pool_size=16, connection_timeout=5, read_timeout=30)
+    assert transport.connection_config.timeout == 5
+    assert transport.connection_config.read_timeout == 30
+    assert transport.session.get_adapter("https://")._pool_maxsize == 16
+
+    # Closing a client's pipeline does not close the shared session
+    transport.close()
+    assert transport.session is not None
+    close_transport(transport)
+
+
+def test_connector_shares_transport():
+    with patch("aztools.storage.BlobServiceClient") as mock_client:
+        con = Connector(storage_account="test-account", pool_size=64, lazy=True)
+        con.get_blob_service_client(storage_account="test-account")
+        con.get_blob_service_client(storage_account="test-account-2")
+        transports = {call.kwargs["transport"] for call in mock_client.call_args_list}
+        assert transports == {con.transport}
+        assert con.transport.session.get_adapter("https://")._pool_maxsize == 64
+
+        transport = con.transport
+        with patch("aztools.storage.close_transport") as mock_close:
+            con.close()
+            mock_close.assert_called_once_with(transport)
+        assert con.transport is not transport